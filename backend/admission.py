@@ -0,0 +1,218 @@
+"""
+Memory-aware admission control for decodes and renders
+Each operation reserves its estimated peak bytes from a global budget before
+it allocates anything. Work that doesn't fit waits in a FIFO queue; when the
+queue is full the caller gets AdmissionRejected, which handlers turn into
+503 + Retry-After.
+
+Background work (exports, analysis, warmup, ingest) waits in a separate,
+unbounded queue that is served only while no foreground request waits, so
+a running export never fills the foreground queue or jumps ahead of it.
+"""
+import math
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from flask import jsonify
+
+import metrics
+
+# Approximate peak working bytes per pixel for each kind of operation
+BYTES_PER_PIXEL = {
+    'decode_raw': 14,   # LibRaw raw buffer + 16-bit 4-channel image + 8-bit output
+    'decode': 4,        # JPEG/PNG decode to RGB(A)
+    'render': 48,       # float32 RGB + HSV planes + masks in apply_adjustments
+    'encode': 4,        # JPEG encode of an RGB frame
+}
+
+
+class AdmissionRejected(Exception):
+    """Raised when the wait queue is full or the wait timed out"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def estimate_bytes(width, height, stages):
+    """
+    Estimate peak memory of an operation on a width x height frame
+
+    Stages run one after another, so the peak is the most expensive stage
+    plus the 8-bit RGB frame carried between them.
+    """
+    pixels = width * height
+    peak = max((BYTES_PER_PIXEL.get(stage, 0) for stage in stages), default=0)
+    return pixels * (peak + 3)
+
+
+class _Ticket:
+    __slots__ = ('controller', 'nbytes', 'label', 'admitted_at')
+
+    def __init__(self, controller, nbytes, label):
+        self.controller = controller
+        self.nbytes = nbytes
+        self.label = label
+        self.admitted_at = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.controller._release(self)
+        return False
+
+
+class AdmissionController:
+    """FIFO byte-budget semaphore"""
+
+    def __init__(self, budget_bytes, max_queue=8, queue_timeout=30.0):
+        self.budget_bytes = budget_bytes
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.admitted_total = 0
+        self.rejected_total = 0
+        self._avg_hold = 1.0
+        self._waiting = deque()
+        self._background = deque()
+        self._cond = threading.Condition()
+
+    def admit(self, nbytes, label='', block=False):
+        """
+        Reserve nbytes for the duration of a `with` block
+
+        Args:
+            nbytes: estimated peak bytes (clamped to the budget, so an
+                oversized job still runs - alone)
+            label: operation name for logs
+            block: background work - wait in the low-priority queue, without
+                queue-length limit or timeout
+        """
+        nbytes = min(int(nbytes), self.budget_bytes)
+        ticket = _Ticket(self, nbytes, label)
+        queue = self._background if block else self._waiting
+
+        with self._cond:
+            # Foreground only queues behind foreground; background behind everything
+            ahead = self._waiting or (block and self._background)
+            if not ahead and self.in_use + nbytes <= self.budget_bytes:
+                self._grant(ticket)
+                return ticket
+
+            if not block and len(self._waiting) >= self.max_queue:
+                self.rejected_total += 1
+                raise AdmissionRejected('Server busy, admission queue full', self.retry_after())
+
+            queue.append(ticket)
+            deadline = None if block else time.monotonic() + self.queue_timeout
+            try:
+                with metrics.stage('admission_wait'):
+                    while not self._may_grant(ticket, queue):
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            self.rejected_total += 1
+                            raise AdmissionRejected('Server busy, timed out waiting for memory',
+                                                    self.retry_after())
+                        self._cond.wait(remaining)
+            finally:
+                queue.remove(ticket)
+                self._cond.notify_all()
+
+            self._grant(ticket)
+            return ticket
+
+    def _may_grant(self, ticket, queue):
+        if queue[0] is not ticket or self.in_use + ticket.nbytes > self.budget_bytes:
+            return False
+        return queue is self._waiting or not self._waiting
+
+    def _grant(self, ticket):
+        ticket.admitted_at = time.monotonic()
+        self.in_use += ticket.nbytes
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        self.admitted_total += 1
+
+    def _release(self, ticket):
+        with self._cond:
+            self.in_use -= ticket.nbytes
+            held = time.monotonic() - ticket.admitted_at
+            self._avg_hold += 0.2 * (held - self._avg_hold)
+            self._cond.notify_all()
+
+    def retry_after(self):
+        """Seconds a rejected client should wait, from recent hold times"""
+        return max(1, math.ceil(self._avg_hold * (len(self._waiting) + 1)))
+
+    def stats(self):
+        with self._cond:
+            return {
+                'budgetBytes': self.budget_bytes,
+                'inUseBytes': self.in_use,
+                'peakInUseBytes': self.peak_in_use,
+                'queued': len(self._waiting),
+                'queuedBackground': len(self._background),
+                'admitted': self.admitted_total,
+                'rejected': self.rejected_total,
+            }
+
+    def register_metrics(self):
+        metrics.register_gauge('photexx_admission_budget_bytes', lambda: self.budget_bytes,
+                               'Memory budget for concurrent decodes and renders')
+        metrics.register_gauge('photexx_admission_in_use_bytes', lambda: self.in_use,
+                               'Estimated bytes reserved by running operations')
+        metrics.register_gauge('photexx_admission_peak_bytes', lambda: self.peak_in_use,
+                               'Highest reserved bytes since start')
+        metrics.register_gauge('photexx_admission_queued', lambda: len(self._waiting),
+                               'Operations waiting for memory')
+        metrics.register_gauge('photexx_admission_queued_background', lambda: len(self._background),
+                               'Background operations waiting for memory')
+        metrics.register_gauge('photexx_admission_rejected', lambda: self.rejected_total,
+                               'Operations rejected with 503 since start')
+        metrics.register_gauge('photexx_process_rss_bytes', current_rss_bytes,
+                               'Current resident set size')
+        metrics.register_gauge('photexx_process_peak_rss_bytes', peak_rss_bytes,
+                               'Peak resident set size')
+
+
+def rejected_response(error):
+    """503 response for an AdmissionRejected error"""
+    response = jsonify({'error': str(error), 'retryAfter': error.retry_after})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def peak_rss_bytes():
+    """Peak RSS of this process, or None where it can't be read"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss)
+    except ImportError:
+        return None
+
+
+def current_rss_bytes():
+    """Current RSS of this process, or None where it can't be read"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
@@ -0,0 +1,170 @@
+"""
+Batch focus, exposure and noise scoring for culling
+Scores come from the smart preview, decoded DCT-scaled to about 1024px and
+reduced to luma, so every image is scored at the same scale and RAWs are
+not decoded again once ingest has built their proxies. An image whose proxy
+is still missing gets it built first, the same RAW decode ingest would do,
+reserved from the memory admission budget like any other decode.
+Images are scored in parallel; OpenCV releases the GIL for all the heavy
+steps.
+"""
+import logging
+import math
+import threading
+import time
+
+from PIL import Image
+
+import metrics
+from lazy_imports import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_SIZE = 1024
+HIGHLIGHT_LEVEL = 250
+SHADOW_LEVEL = 5
+# Share of clipped pixels above which a frame counts as over/under exposed
+CLIPPING_LIMIT = 0.02
+
+# Immerkær's noise estimation kernel (difference of two Laplacians)
+_NOISE_KERNEL = [[1, -2, 1], [-2, 4, -2], [1, -2, 1]]
+
+SORT_KEYS = ('sharpness', 'noise', 'highlightsClipped', 'shadowsClipped', 'meanLuma')
+
+
+def load_luma(path, size=ANALYSIS_SIZE):
+    """Luma plane of an image at roughly size pixels on the long edge"""
+    with Image.open(path) as img:
+        img.draft('L', (size, size))
+        img = img.convert('L')
+        if max(img.size) > size:
+            img.thumbnail((size, size), Image.Resampling.BILINEAR)
+        return np.asarray(img)
+
+
+def score_luma(luma):
+    """Focus, clipping and noise scores of a uint8 luma plane"""
+    # Focus: variance of the Laplacian (high = crisp edges)
+    laplacian = cv2.Laplacian(luma, cv2.CV_32F)
+    _, stddev = cv2.meanStdDev(laplacian)
+    sharpness = float(stddev[0][0]) ** 2
+
+    pixels = luma.size
+    highlights = cv2.countNonZero(cv2.compare(luma, HIGHLIGHT_LEVEL, cv2.CMP_GE)) / pixels
+    shadows = cv2.countNonZero(cv2.compare(luma, SHADOW_LEVEL, cv2.CMP_LE)) / pixels
+    mean_luma = float(cv2.mean(luma)[0])
+
+    # Noise: Immerkær, sigma = sqrt(pi/2) / (6 (W-2)(H-2)) * sum |I * N|
+    height, width = luma.shape
+    response = cv2.filter2D(luma.astype(np.float32), -1, np.array(_NOISE_KERNEL, dtype=np.float32),
+                            borderType=cv2.BORDER_ISOLATED)
+    inner = np.abs(response[1:-1, 1:-1])
+    noise = math.sqrt(math.pi / 2) * float(inner.sum()) / (6 * (width - 2) * (height - 2))
+
+    if highlights > CLIPPING_LIMIT and highlights >= shadows:
+        exposure = 'over'
+    elif shadows > CLIPPING_LIMIT:
+        exposure = 'under'
+    else:
+        exposure = 'ok'
+
+    return {
+        'sharpness': round(sharpness, 2),
+        'noise': round(noise, 3),
+        'highlightsClipped': round(highlights, 5),
+        'shadowsClipped': round(shadows, 5),
+        'meanLuma': round(mean_luma, 2),
+        'exposure': exposure
+    }
+
+
+def score_image(path):
+    with metrics.stage('analyze'):
+        return score_luma(load_luma(path))
+
+
+class AnalysisJob:
+    """Background scoring of a list of items, with progress counters"""
+
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started = time.time()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def run(self, items, score, store, executor):
+        """
+        Score every item on executor
+
+        Args:
+            items: list of (key, path or callable returning a path)
+            score: function(path) -> scores dict
+            store: function(key, scores) called with each result
+        """
+        if not items:
+            self.finished = time.time()
+            return
+
+        def work(key, source):
+            try:
+                path = source() if callable(source) else source
+                store(key, score(path))
+                failed = 0
+            except Exception as e:
+                logger.error(f"Analysis failed: {str(e)}")
+                failed = 1
+            with self._lock:
+                self.done += 1
+                self.failed += failed
+                if self.done == self.total:
+                    self.finished = time.time()
+
+        for key, source in items:
+            executor.submit(work, key, source)
+
+    @property
+    def running(self):
+        return self.finished is None
+
+    def status(self):
+        with self._lock:
+            end = self.finished or time.time()
+            return {
+                'running': self.running,
+                'total': self.total,
+                'done': self.done,
+                'failed': self.failed,
+                'seconds': round(end - self.started, 2)
+            }
+
+
+def filter_and_sort(images, sort=None, descending=True, min_sharpness=None,
+                    max_clipping=None, exposure=None):
+    """Project images filtered by their scores and sorted by one score key"""
+    selected = []
+    for image in images:
+        scores = image.get('scores')
+        if scores is None:
+            if min_sharpness is None and max_clipping is None and exposure is None:
+                selected.append(image)
+            continue
+        if min_sharpness is not None and scores['sharpness'] < min_sharpness:
+            continue
+        if max_clipping is not None and max(scores['highlightsClipped'], scores['shadowsClipped']) > max_clipping:
+            continue
+        if exposure is not None and scores['exposure'] != exposure:
+            continue
+        selected.append(image)
+
+    if sort in SORT_KEYS:
+        # Unscored images go last either way
+        scored = [image for image in selected if image.get('scores')]
+        unscored = [image for image in selected if not image.get('scores')]
+        scored.sort(key=lambda image: image['scores'][sort], reverse=descending)
+        selected = scored + unscored
+    return selected
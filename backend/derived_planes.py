@@ -0,0 +1,119 @@
+"""
+Memoized derived planes per source image
+Everything apply_adjustments computes before the first slider-dependent
+step - the HSV planes, hue-band membership and the blurred tone masks and V
+planes - depends only on the source pixels plus exposure, temperature and
+tint. Caching them under that key lets a drag on any later slider skip
+straight to the adjustment itself.
+
+The HSV planes are kept as uint8 and handed out as fresh float32 copies per
+render - converting them back costs far less than the float planes would
+take in the cache. Derived planes are read-only; a stage may use one only
+while its input is still the untouched copy (checked by identity),
+otherwise it computes from its current input as before.
+"""
+import threading
+
+from lazy_imports import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+# OpenCV hue (0-180) ranges of the HSL color bands
+HUE_RANGES = {
+    'red': [(0, 10), (170, 180)],
+    'orange': [(11, 20)],
+    'yellow': [(21, 35)],
+    'green': [(36, 85)],
+    'aqua': [(86, 110)],
+    'blue': [(111, 140)],
+    'purple': [(141, 155)],
+    'magenta': [(156, 169)],
+}
+HUE_BANDS = tuple(HUE_RANGES)
+
+# Tone masks: (threshold test, blur kernel size)
+TONE_MASKS = {
+    'shadows': (lambda v: v < 85, 21),
+    'highlights': (lambda v: v > 170, 21),
+    'whites': (lambda v: v > 200, 15),
+    'blacks': (lambda v: v < 55, 15),
+}
+
+# Upper bound of the lazily derived float32 planes one entry can hold
+_MAX_FLOAT_PLANES = len(TONE_MASKS) + 2
+
+_band_lut = None
+
+
+def _hue_band_lut():
+    """uint8 hue -> band number (255 outside every band)"""
+    global _band_lut
+    if _band_lut is None:
+        lut = np.full(256, 255, dtype=np.uint8)
+        for number, band in enumerate(HUE_BANDS):
+            for low, high in HUE_RANGES[band]:
+                lut[low:high + 1] = number
+        _band_lut = lut
+    return _band_lut
+
+
+def hue_mask(h, band):
+    """Float mask of the pixels of h inside a hue band"""
+    mask = np.zeros_like(h, dtype=np.float32)
+    for low, high in HUE_RANGES[band]:
+        mask = np.maximum(mask, ((h >= low) & (h <= high)).astype(np.float32))
+    return mask
+
+
+def tone_mask(v, kind):
+    """Blurred float mask of the pixels of v selected by a tone slider"""
+    test, size = TONE_MASKS[kind]
+    return cv2.GaussianBlur(test(v).astype(np.float32), (size, size), 0)
+
+
+def _read_only(array):
+    array.setflags(write=False)
+    return array
+
+
+class DerivedPlanes:
+    """HSV planes of one (source, exposure, temperature, tint) plus lazily derived planes"""
+
+    def __init__(self, hsv):
+        h, s, v = cv2.split(hsv)
+        self._hue_index = cv2.LUT(h, _hue_band_lut())
+        self._h = _read_only(h)
+        self._s = _read_only(s)
+        self._v = _read_only(v)
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        # uint8 H, S, V and band index, plus room for every lazily derived plane,
+        # so cache accounting stays an upper bound
+        return self._h.size * (4 + 4 * _MAX_FLOAT_PLANES)
+
+    def float_planes(self):
+        """Fresh float32 (h, s, v) planes for one render"""
+        return tuple(plane.astype(np.float32) for plane in (self._h, self._s, self._v))
+
+    def _memo(self, key, compute):
+        plane = self._derived.get(key)
+        if plane is None:
+            plane = _read_only(compute())
+            with self._lock:
+                plane = self._derived.setdefault(key, plane)
+        return plane
+
+    def hue_mask(self, band):
+        """Same as hue_mask(self.h, band), from the precomputed band index"""
+        number = HUE_BANDS.index(band)
+        return (self._hue_index == number).astype(np.float32)
+
+    def tone_mask(self, kind):
+        return self._memo(('tone', kind), lambda: tone_mask(self._v, kind))
+
+    def blurred_v(self, sigma):
+        return self._memo(('blur', sigma), lambda: cv2.GaussianBlur(self._v.astype(np.float32), (0, 0), sigma))
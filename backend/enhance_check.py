@@ -0,0 +1,65 @@
+"""
+Compare fused_enhance with the ImageEnhance chain it replaced
+Runs both on an image for single and combined contrast/saturation/sharpness
+settings and reports the largest difference and the share of pixels more
+than one level apart. Vibrance is left out: it is selective by design and
+no longer matches the old Color pass. Exits non-zero when a case is off.
+
+Usage:
+    python enhance_check.py <image> [--width 1920] [--tolerance 1]
+"""
+import argparse
+import sys
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+from server import fused_enhance
+
+CASES = [
+    {'contrast': 30},
+    {'saturation': 40},
+    {'sharpness': 40},
+    {'contrast': 30, 'saturation': 20, 'sharpness': 40},
+    {'contrast': 80, 'saturation': 80},
+    {'contrast': -60, 'saturation': -50, 'sharpness': 120},
+    {'contrast': 100, 'saturation': 100, 'sharpness': 150},
+]
+
+
+def pil_chain(img, adjustments):
+    """The Contrast/Color/Sharpness chain as apply_adjustments used to run it"""
+    if adjustments.get('contrast'):
+        img = ImageEnhance.Contrast(img).enhance(float(np.clip(1.0 + adjustments['contrast'] / 100.0, 0.3, 3.0)))
+    if adjustments.get('saturation'):
+        img = ImageEnhance.Color(img).enhance(float(np.clip(1.0 + adjustments['saturation'] / 100.0, 0, 3.0)))
+    if adjustments.get('sharpness'):
+        img = ImageEnhance.Sharpness(img).enhance(float(np.clip(adjustments['sharpness'] / 40.0, 0, 4.0)))
+    return np.asarray(img)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare fused_enhance with the PIL ImageEnhance chain')
+    parser.add_argument('image', help='JPEG/PNG to compare on')
+    parser.add_argument('--width', type=int, default=1920, help='downscale to this width first')
+    parser.add_argument('--tolerance', type=int, default=1, help='largest allowed difference in levels')
+    args = parser.parse_args(argv)
+
+    img = Image.open(args.image).convert('RGB')
+    if img.width > args.width:
+        img = img.resize((args.width, round(img.height * args.width / img.width)), Image.Resampling.LANCZOS)
+    pixels = np.asarray(img)
+
+    failed = 0
+    for adjustments in CASES:
+        diff = np.abs(fused_enhance(pixels.astype(np.float32), adjustments).astype(np.int16)
+                      - pil_chain(img, adjustments).astype(np.int16))
+        off = float((diff > 1).mean())
+        ok = diff.max() <= args.tolerance
+        failed += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {adjustments}: max {diff.max()}, >1 level {off:.4%}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
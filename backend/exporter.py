@@ -0,0 +1,193 @@
+"""
+Full-resolution export to a folder or a streamed ZIP
+Each image is decoded from its original, rendered and encoded as a
+progressive JPEG on a worker pool. At most `window` images are in flight at
+once, so memory stays bounded however large the selection is, while the
+encoders keep every core busy.
+"""
+import io
+import logging
+import os
+import zipfile
+from collections import deque
+
+from PIL import Image
+
+import metrics
+from geometry import parse_geometry, apply_geometry, without_geometry
+
+logger = logging.getLogger(__name__)
+
+# Long edge in pixels (None keeps the original size)
+EXPORT_SIZES = {
+    'original': None,
+    'large': 3840,
+    'medium': 2048,
+    'small': 1080,
+}
+
+EXPORT_QUALITIES = {
+    'maximum': 100,
+    'high': 92,
+    'medium': 80,
+    'low': 65,
+}
+
+
+class ExportJob:
+    """One image to export"""
+
+    __slots__ = ('source_path', 'is_raw', 'output_name', 'adjustments')
+
+    def __init__(self, source_path, is_raw, output_name, adjustments):
+        self.source_path = source_path
+        self.is_raw = is_raw
+        self.output_name = output_name
+        self.adjustments = adjustments
+
+
+def output_names(display_names):
+    """<stem>.jpg for each display name, numbered when two stems collide"""
+    used = set()
+    names = []
+    for display_name in display_names:
+        stem = os.path.splitext(display_name)[0] or 'image'
+        name, counter = f'{stem}.jpg', 2
+        while name.lower() in used:
+            name = f'{stem}_{counter}.jpg'
+            counter += 1
+        used.add(name.lower())
+        names.append(name)
+    return names
+
+
+def render_export(job, long_edge, quality, decode, render, source_size):
+    """
+    Decode, resize, render and encode one job
+
+    Args:
+        decode: function(source_path, is_raw, min_size) -> RGB image
+        render: function(img, adjustments) -> img
+        source_size: (width, height) of the original, from its header
+
+    Returns:
+        encoded JPEG bytes
+    """
+    # A crop (explicit, or the automatic one of a straightened frame) must
+    # still reach long_edge, so decode proportionally larger
+    min_size = long_edge
+    geometry = parse_geometry(job.adjustments, *source_size)
+    if long_edge and geometry is not None:
+        min_size = round(long_edge / min(geometry.crop[2], geometry.crop[3]))
+
+    img = decode(job.source_path, job.is_raw, min_size)
+    geometry = parse_geometry(job.adjustments, img.width, img.height)
+    if geometry is not None:
+        with metrics.stage('geometry'):
+            img = apply_geometry(img, geometry, Image.Resampling.BICUBIC)
+
+    if long_edge and max(img.size) > long_edge:
+        with metrics.stage('resize'):
+            img.thumbnail((long_edge, long_edge), Image.Resampling.LANCZOS)
+
+    img = render(img, without_geometry(job.adjustments))
+
+    with metrics.stage('encode'):
+        output = io.BytesIO()
+        img.save(output, format='JPEG', quality=quality, optimize=True, progressive=True,
+                 subsampling=0 if quality >= 90 else 2)
+    return output.getvalue()
+
+
+def run_bounded(jobs, work, executor, window):
+    """
+    Run work(job) for every job, yielding (job, bytes or exception) in job order
+
+    Only `window` jobs are submitted ahead of the consumer.
+    """
+    pending = deque()
+    jobs = iter(jobs)
+
+    def submit_next():
+        job = next(jobs, None)
+        if job is not None:
+            pending.append((job, executor.submit(work, job)))
+
+    for _ in range(window):
+        submit_next()
+
+    while pending:
+        job, future = pending.popleft()
+        try:
+            result = future.result()
+        except Exception as e:
+            result = e
+        submit_next()
+        yield job, result
+
+
+def export_to_folder(jobs, target_folder, work, executor, window):
+    """Write every job into target_folder; returns (exported names, failures)"""
+    os.makedirs(target_folder, exist_ok=True)
+    exported, failed = [], []
+
+    for job, result in run_bounded(jobs, work, executor, window):
+        if isinstance(result, Exception):
+            logger.error(f"Export failed for {job.output_name}: {str(result)}")
+            failed.append({'name': job.output_name, 'error': str(result)})
+            continue
+
+        target = os.path.join(target_folder, job.output_name)
+        tmp_path = f'{target}.tmp'
+        with metrics.stage('write'):
+            with open(tmp_path, 'wb') as f:
+                f.write(result)
+            os.replace(tmp_path, target)
+        exported.append(job.output_name)
+
+    return exported, failed
+
+
+class _StreamBuffer(io.RawIOBase):
+    """Unseekable sink for ZipFile; the generator drains it between entries"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(jobs, work, executor, window, skipped=()):
+    """
+    Yield a ZIP archive of every job, entry by entry
+
+    JPEGs don't compress, so entries are stored; failed images are listed in
+    an errors.txt entry at the end instead of aborting the download, after
+    the `skipped` lines of images that never made it into a job.
+    """
+    sink = _StreamBuffer()
+    failed = list(skipped)
+
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for job, result in run_bounded(jobs, work, executor, window):
+            if isinstance(result, Exception):
+                logger.error(f"Export failed for {job.output_name}: {str(result)}")
+                failed.append(f'{job.output_name}: {str(result)}')
+                continue
+            archive.writestr(job.output_name, result)
+            yield sink.drain()
+
+        if failed:
+            archive.writestr('errors.txt', '\n'.join(failed) + '\n')
+
+    yield sink.drain()
@@ -0,0 +1,204 @@
+"""
+Non-destructive crop, straighten and rotate
+Geometry is the first stage of the pipeline, so tone, HSL and sharpening
+only ever see the pixels that survive the crop. The parameters live in the
+adjustment payload:
+
+    rotate  quarter turns clockwise: 0, 90, 180 or 270
+    angle   straighten, degrees clockwise (-45..45)
+    crop    {x, y, w, h}, normalized to the rotated frame (0..1)
+
+Being normalized, the same parameters apply to every pyramid level, proxy
+or original. A straightened frame without an explicit crop is cropped to
+the largest same-aspect rectangle that stays inside the image. Rotation and
+crop are folded into one affine map and OpenCV computes only the output
+pixels, from the bounding box of the source they need.
+"""
+import math
+
+from PIL import Image
+
+from lazy_imports import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+GEOMETRY_KEYS = ('rotate', 'angle', 'crop')
+MAX_ANGLE = 45.0
+# Crops narrower than this (normalized) are clamped, so a render never collapses to nothing
+MIN_CROP = 0.01
+
+# Clockwise quarter turns as PIL transposes
+_QUARTER_TRANSPOSE = {
+    1: Image.Transpose.ROTATE_270,
+    2: Image.Transpose.ROTATE_180,
+    3: Image.Transpose.ROTATE_90,
+}
+
+
+class Geometry:
+    """Validated geometry parameters (hashable, so usable in cache keys)"""
+
+    __slots__ = ('quarters', 'angle', 'crop')
+
+    def __init__(self, quarters, angle, crop):
+        self.quarters = quarters
+        self.angle = angle
+        self.crop = crop
+
+    def _key(self):
+        return (self.quarters, self.angle, self.crop)
+
+    def __eq__(self, other):
+        return isinstance(other, Geometry) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f'Geometry(quarters={self.quarters}, angle={self.angle}, crop={self.crop})'
+
+    @property
+    def area(self):
+        """Share of the rotated frame that survives the crop"""
+        return self.crop[2] * self.crop[3]
+
+    def frame_size(self, width, height):
+        """Size of a width x height source after the quarter turns"""
+        return (height, width) if self.quarters % 2 else (width, height)
+
+    def output_size(self, width, height):
+        frame_width, frame_height = self.frame_size(width, height)
+        x, y, w, h = self.crop
+        return max(1, round(w * frame_width)), max(1, round(h * frame_height))
+
+
+def _straighten_crop(width, height, angle):
+    """Centered crop (normalized) of the largest same-aspect rectangle inside the straightened frame"""
+    radians = math.radians(abs(angle))
+    cos, sin = math.cos(radians), math.sin(radians)
+    scale = min(width / (width * cos + height * sin), height / (width * sin + height * cos))
+    margin = (1 - scale) / 2
+    return (margin, margin, scale, scale)
+
+
+def parse_geometry(adjustments, width=None, height=None):
+    """
+    Geometry of an adjustments dict, or None when it leaves the frame untouched
+
+    width/height (of any level of the source) are needed only to size the
+    automatic crop of a straightened frame without an explicit one.
+
+    Raises:
+        ValueError: malformed parameters
+    """
+    rotate = adjustments.get('rotate', 0) or 0
+    angle = float(adjustments.get('angle', 0) or 0)
+    crop = adjustments.get('crop')
+
+    if rotate % 90:
+        raise ValueError(f'rotate must be a multiple of 90, got {rotate}')
+    quarters = int(rotate // 90) % 4
+    angle = max(-MAX_ANGLE, min(MAX_ANGLE, angle))
+
+    if crop:
+        x = min(max(float(crop.get('x', 0)), 0.0), 1.0 - MIN_CROP)
+        y = min(max(float(crop.get('y', 0)), 0.0), 1.0 - MIN_CROP)
+        w = min(max(float(crop.get('w', 1)), MIN_CROP), 1.0 - x)
+        h = min(max(float(crop.get('h', 1)), MIN_CROP), 1.0 - y)
+        crop = (x, y, w, h)
+    elif angle and width and height:
+        frame_width, frame_height = (height, width) if quarters % 2 else (width, height)
+        crop = _straighten_crop(frame_width, frame_height, angle)
+    else:
+        crop = (0.0, 0.0, 1.0, 1.0)
+
+    if quarters == 0 and angle == 0 and crop == (0.0, 0.0, 1.0, 1.0):
+        return None
+    return Geometry(quarters, angle, crop)
+
+
+def without_geometry(adjustments):
+    """adjustments minus the geometry keys (for stages that already applied them)"""
+    if not any(key in adjustments for key in GEOMETRY_KEYS):
+        return adjustments
+    return {key: value for key, value in adjustments.items() if key not in GEOMETRY_KEYS}
+
+
+def _quarter_inverse(quarters, width, height):
+    """3x3 map from the rotated frame back to source coordinates"""
+    if quarters == 1:
+        return np.array([[0, 1, 0], [-1, 0, height], [0, 0, 1]], dtype=np.float64)
+    if quarters == 2:
+        return np.array([[-1, 0, width], [0, -1, height], [0, 0, 1]], dtype=np.float64)
+    if quarters == 3:
+        return np.array([[0, -1, width], [1, 0, 0], [0, 0, 1]], dtype=np.float64)
+    return np.eye(3)
+
+
+def _crop_box(box, width, height):
+    left, top, right, bottom = box
+    return (max(0, min(width, left)), max(0, min(height, top)),
+            max(0, min(width, right)), max(0, min(height, bottom)))
+
+
+def _output_to_source(geometry, width, height):
+    """3x3 map from output coordinates to source coordinates (continuous, pixel edges at integers)"""
+    frame_width, frame_height = geometry.frame_size(width, height)
+    radians = math.radians(geometry.angle)
+    cos, sin = math.cos(radians), math.sin(radians)
+    cx, cy = frame_width / 2, frame_height / 2
+    to_frame = np.array([[1, 0, geometry.crop[0] * frame_width], [0, 1, geometry.crop[1] * frame_height], [0, 0, 1]])
+    unstraighten = (np.array([[1, 0, cx], [0, 1, cy], [0, 0, 1]])
+                    @ np.array([[cos, sin, 0], [-sin, cos, 0], [0, 0, 1]])
+                    @ np.array([[1, 0, -cx], [0, 1, -cy], [0, 0, 1]]))
+    return _quarter_inverse(geometry.quarters, width, height) @ unstraighten @ to_frame
+
+
+def frame_transform(geometry, width, height):
+    """
+    3x3 map from a width x height source's coordinates to normalized output coordinates
+
+    Lets anything defined on the output frame (local masks) be evaluated on
+    uncropped renders such as tiles. geometry may be None.
+    """
+    if geometry is None:
+        return np.diag([1.0 / width, 1.0 / height, 1.0])
+    out_width, out_height = geometry.output_size(width, height)
+    return np.diag([1.0 / out_width, 1.0 / out_height, 1.0]) @ np.linalg.inv(
+        _output_to_source(geometry, width, height))
+
+
+def apply_geometry(img, geometry, resample=Image.Resampling.BILINEAR):
+    """img rotated, straightened and cropped; only the output pixels are computed"""
+    width, height = img.size
+    frame_width, frame_height = geometry.frame_size(width, height)
+    x, y, w, h = geometry.crop
+    out_width, out_height = geometry.output_size(width, height)
+    left, top = x * frame_width, y * frame_height
+
+    if geometry.angle == 0:
+        # Axis-aligned: crop the matching source rectangle, then turn only that
+        to_source = _quarter_inverse(geometry.quarters, width, height)
+        corners = to_source @ np.array([[left, left + out_width], [top, top + out_height], [1, 1]])
+        box = (round(corners[0].min()), round(corners[1].min()), round(corners[0].max()), round(corners[1].max()))
+        img = img.crop(_crop_box(box, width, height))
+        method = _QUARTER_TRANSPOSE.get(geometry.quarters)
+        return img.transpose(method) if method is not None else img
+
+    # Output pixel -> straightened frame -> rotated frame -> source, in pixel-center coordinates
+    to_source = (np.array([[1, 0, -0.5], [0, 1, -0.5], [0, 0, 1]])
+                 @ _output_to_source(geometry, width, height)
+                 @ np.array([[1, 0, 0.5], [0, 1, 0.5], [0, 0, 1]]))
+
+    # Decode only the source region the output reads from (plus interpolation margin)
+    corners = to_source @ np.array([[0, out_width, 0, out_width], [0, 0, out_height, out_height], [1, 1, 1, 1]])
+    box = _crop_box((math.floor(corners[0].min()) - 2, math.floor(corners[1].min()) - 2,
+                     math.ceil(corners[0].max()) + 3, math.ceil(corners[1].max()) + 3), width, height)
+    region = np.asarray(img.crop(box))
+    to_region = np.array([[1, 0, -box[0]], [0, 1, -box[1]], [0, 0, 1]]) @ to_source
+
+    interpolation = cv2.INTER_CUBIC if resample == Image.Resampling.BICUBIC else cv2.INTER_LINEAR
+    out = cv2.warpAffine(region, to_region[:2], (out_width, out_height),
+                         flags=interpolation | cv2.WARP_INVERSE_MAP, borderMode=cv2.BORDER_REPLICATE)
+    return Image.fromarray(out)
@@ -0,0 +1,104 @@
+"""
+Histogram and clipping statistics for rendered previews
+Computed with cv2.calcHist on a nearest-neighbour sample of the already
+downsampled render, so the cost stays well under a millisecond per frame
+"""
+import base64
+import math
+
+from PIL import Image
+
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+cv2 = lazy_import('cv2')
+
+# ~256x256 samples are plenty for a 256-bin display histogram
+MAX_SAMPLES = 1 << 16
+
+def _sample(img, max_samples):
+    """Return (uint8 HxWx3 sample, step) picking exact pixels, never averaging"""
+    if isinstance(img, Image.Image):
+        width, height = img.size
+        step = max(1, math.ceil(math.sqrt(width * height / max_samples)))
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        if step > 1:
+            img = img.resize((max(1, width // step), max(1, height // step)), Image.Resampling.NEAREST)
+        return np.asarray(img), step
+
+    height, width = img.shape[:2]
+    step = max(1, math.ceil(math.sqrt(width * height / max_samples)))
+    return img[::step, ::step, :3], step
+
+
+def _hist(channel):
+    return cv2.calcHist([channel], [0], None, [256], [0, 256]).ravel().astype(np.int64).tolist()
+
+
+def _clip_stats(mask, total, scale):
+    count = cv2.countNonZero(mask)
+    return {
+        'count': count * scale,
+        'fraction': round(count / total, 6) if total else 0.0
+    }
+
+
+def compute_histogram(img, max_samples=MAX_SAMPLES, overlay=False):
+    """
+    Compute RGB/luma histograms and clipping counts for a rendered image
+
+    Args:
+        img: PIL image or uint8 RGB array
+        max_samples: upper bound on the number of pixels inspected
+        overlay: also return a low-res PNG clipping overlay as a data URL
+
+    Returns:
+        dict with 256-bin 'r', 'g', 'b', 'luma' lists and 'clipping' stats.
+        Clipping counts are scaled back to full-image pixel counts.
+    """
+    sample, step = _sample(img, max_samples)
+    sample = np.ascontiguousarray(sample)
+    r, g, b = cv2.split(sample)
+    total = r.size
+    scale = step * step
+
+    # Rec. 601 luma, same weights as PIL's 'L' conversion
+    luma = cv2.cvtColor(sample, cv2.COLOR_RGB2GRAY)
+
+    # A pixel clips when any channel hits the end of the range
+    highlight_mask = cv2.compare(cv2.max(cv2.max(r, g), b), 255, cv2.CMP_EQ)
+    shadow_mask = cv2.compare(cv2.min(cv2.min(r, g), b), 0, cv2.CMP_EQ)
+
+    result = {
+        'r': _hist(r),
+        'g': _hist(g),
+        'b': _hist(b),
+        'luma': _hist(luma),
+        'clipping': {
+            'highlights': _clip_stats(highlight_mask, total, scale),
+            'shadows': _clip_stats(shadow_mask, total, scale),
+        },
+        'samples': int(total),
+        'step': step
+    }
+
+    if overlay:
+        result['overlay'] = _clipping_overlay(highlight_mask, shadow_mask)
+
+    return result
+
+
+def _clipping_overlay(highlight_mask, shadow_mask):
+    """Encode clipped pixels as a transparent PNG (red = highlights, blue = shadows)"""
+    height, width = highlight_mask.shape
+    highlights = highlight_mask > 0
+    shadows = (shadow_mask > 0) & ~highlights
+    # cv2 expects BGRA
+    bgra = np.zeros((height, width, 4), dtype=np.uint8)
+    bgra[highlights] = (0, 0, 255, 255)
+    bgra[shadows] = (255, 80, 0, 255)
+    ok, png = cv2.imencode('.png', bgra)
+    if not ok:
+        return None
+    return 'data:image/png;base64,' + base64.b64encode(png.tobytes()).decode('utf-8')
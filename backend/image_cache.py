@@ -0,0 +1,92 @@
+"""
+Size-bounded LRU cache for decoded images
+Replaces the unbounded raw_cache dict so long sessions can't grow without limit
+"""
+import threading
+from collections import OrderedDict
+
+import metrics
+
+
+def estimate_nbytes(value):
+    """Approximate memory held by a cached value"""
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if hasattr(value, 'size') and hasattr(value, 'getbands'):
+        width, height = value.size
+        return width * height * len(value.getbands())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_nbytes(item) for item in value)
+    return 0
+
+
+class ImageCache:
+    """Thread-safe LRU cache with a byte budget"""
+
+    def __init__(self, name, budget_bytes):
+        self.name = name
+        self.budget_bytes = budget_bytes
+        self.bytes_used = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        metrics.register_gauge(f'photexx_cache_{name}_bytes', lambda: self.bytes_used,
+                               f'Bytes held by the {name} cache')
+        metrics.register_gauge(f'photexx_cache_{name}_budget_bytes', lambda: self.budget_bytes,
+                               f'Byte budget of the {name} cache')
+        metrics.register_gauge(f'photexx_cache_{name}_entries', lambda: len(self._entries),
+                               f'Entries in the {name} cache')
+
+    def get(self, key):
+        """Return the cached value or None, counting the lookup as hit/miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        metrics.record_cache(self.name, entry is not None)
+        return entry[0] if entry is not None else None
+
+    def peek(self, key):
+        """Return the cached value without touching LRU order or hit counters"""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, value, nbytes=None):
+        """Insert value, evicting least recently used entries to stay in budget"""
+        if nbytes is None:
+            nbytes = estimate_nbytes(value)
+        if nbytes > self.budget_bytes:
+            return False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes_used -= old[1]
+            while self._entries and self.bytes_used + nbytes > self.budget_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.bytes_used -= evicted_bytes
+            self._entries[key] = (value, nbytes)
+            self.bytes_used += nbytes
+        return True
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.bytes_used -= entry[1]
+
+    def has_room(self, nbytes):
+        """True if nbytes fit without evicting anything"""
+        with self._lock:
+            return self.bytes_used + nbytes <= self.budget_bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
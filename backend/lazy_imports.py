@@ -0,0 +1,53 @@
+"""
+Deferred imports for heavy native modules
+cv2, numpy, rawpy and imageio together cost seconds of startup in the
+PyInstaller bundle, so they are only imported on first attribute access
+"""
+import importlib
+import threading
+
+_import_lock = threading.Lock()
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first use"""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with _import_lock:
+                module = self.__dict__['_module']
+                if module is None:
+                    module = importlib.import_module(self.__dict__['_name'])
+                    self.__dict__['_module'] = module
+        return module
+
+    @property
+    def loaded(self):
+        return self.__dict__['_module'] is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_import(name):
+    """Return a proxy for module `name` that imports it on first use"""
+    return LazyModule(name)
+
+
+def preload(*modules):
+    """Import the given lazy modules now (used to warm them in the background)"""
+    for module in modules:
+        if isinstance(module, LazyModule):
+            module._load()
@@ -0,0 +1,303 @@
+"""
+Slider-drag load generator and latency SLO report
+Replays editor-like sessions against a running backend with N concurrent
+virtual users. Each drag follows editor.js: at most one interactive
+/process in flight carrying the latest slider value, then a full render
+SETTLE_DELAY after the last input. Sessions also apply presets now and
+then: the quick 'interactive' render, then the 'final' one when the routing
+offers an upgrade. The gestures (images, sliders, targets, drag and think times) come
+from --seed, so runs with the same arguments replay the same gestures in
+the same order; which drag frames get sent, and so the exact requests and
+their count, depends on server latency, as it does in the editor.
+
+Usage:
+    python loadtest.py --image <stored name> --users 4 --duration 60
+    python loadtest.py --project <id> --users 8 --duration 120 --report report.json
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+SETTLE_DELAY = 0.25
+INPUT_INTERVAL = 1 / 60
+
+# Slider ranges as in editor.html
+SLIDERS = {
+    'exposure': (-5, 5),
+    'contrast': (-100, 100),
+    'highlights': (-100, 100),
+    'shadows': (-100, 100),
+    'whites': (-100, 100),
+    'blacks': (-100, 100),
+    'vibrance': (-100, 100),
+    'saturation': (-100, 100),
+    'temperature': (-50, 50),
+    'tint': (-50, 50),
+    'sharpness': (0, 150),
+}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """Thread-safe collection of (kind, start offset, seconds, status) samples"""
+
+    def __init__(self):
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def add(self, kind, started, seconds, status):
+        with self._lock:
+            self.samples.append((kind, started, seconds, status))
+
+
+class Client:
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, payload=None):
+        """Returns (status, parsed JSON or None); network errors are status 0"""
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        req = urllib.request.Request(f'{self.base_url}{path}', data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                body = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, None
+        except (urllib.error.URLError, OSError):
+            return 0, None
+        try:
+            return status, json.loads(body)
+        except ValueError:
+            return status, None
+
+
+class VirtualUser(threading.Thread):
+    """One editor session loop"""
+
+    def __init__(self, index, client, recorder, images, presets, args, start, stop):
+        super().__init__(name=f'vu-{index}', daemon=True)
+        self.client = client
+        self.recorder = recorder
+        self.images = images
+        self.presets = presets
+        self.args = args
+        self.start_time = start
+        self.stop_event = stop
+        self.rng = random.Random(args.seed * 1000 + index)
+
+    def timed(self, kind, method, path, payload=None):
+        started = time.perf_counter()
+        status, body = self.client.request(method, path, payload)
+        self.recorder.add(kind, started - self.start_time, time.perf_counter() - started, status)
+        return status, body
+
+    def run(self):
+        filename = self.rng.choice(self.images)
+        adjustments = {}
+        while not self.stop_event.is_set():
+            if self.presets and self.rng.random() < self.args.preset_ratio:
+                self.apply_preset(filename, adjustments)
+            else:
+                self.drag(filename, adjustments)
+
+            # Think time between gestures, sometimes moving to another image
+            self.stop_event.wait(self.rng.uniform(0.2, self.args.think_time))
+            if self.rng.random() < 0.1:
+                filename = self.rng.choice(self.images)
+                adjustments = {}
+
+    def apply_preset(self, filename, adjustments):
+        """Quick preset render, the final one when routing offers an upgrade, and its slider values"""
+        preset = self.rng.choice(self.presets)
+        status, body = self.timed('preset_interactive', 'POST', '/preset/apply',
+                                  {'filename': filename, 'preset': preset, 'intent': 'interactive'})
+        if status != 200 or not body:
+            return
+        if (body.get('routing') or {}).get('upgrade'):
+            self.timed('preset_final', 'POST', '/preset/apply',
+                       {'filename': filename, 'preset': preset, 'intent': 'final'})
+        # Later drags carry the preset's values, as the editor's sliders do
+        adjustments.update({key: value for key, value in (body.get('adjustments') or {}).items()
+                            if key in SLIDERS and isinstance(value, (int, float))})
+
+    def drag(self, filename, adjustments):
+        """One slider drag: latest-value interactive renders, then the settled render"""
+        key = self.rng.choice(list(SLIDERS))
+        low, high = SLIDERS[key]
+        start_value = adjustments.get(key, 0)
+        target = self.rng.uniform(low, high)
+        duration = self.rng.uniform(0.3, 2.0)
+
+        drag_start = time.perf_counter()
+        while not self.stop_event.is_set():
+            progress = min(1.0, (time.perf_counter() - drag_start) / duration)
+            adjustments[key] = round(start_value + (target - start_value) * progress, 2)
+            # The request itself blocks, which is the editor's single in-flight slot
+            self.timed('process_interactive', 'POST', '/process',
+                       {'filename': filename, 'adjustments': adjustments, 'interactive': True})
+            if progress >= 1.0:
+                break
+            time.sleep(INPUT_INTERVAL)
+
+        if self.stop_event.wait(SETTLE_DELAY):
+            return
+        self.timed('process_final', 'POST', '/process',
+                   {'filename': filename, 'adjustments': adjustments, 'interactive': False})
+
+
+class RssSampler(threading.Thread):
+    """Polls /health for the server's memory figures once per interval"""
+
+    def __init__(self, client, start, stop, interval=1.0):
+        super().__init__(name='rss-sampler', daemon=True)
+        self.client = client
+        self.start_time = start
+        self.stop_event = stop
+        self.interval = interval
+        self.series = []
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            status, body = self.client.request('GET', '/health')
+            memory = (body or {}).get('memory') if status == 200 else None
+            if memory:
+                self.series.append({
+                    't': round(time.perf_counter() - self.start_time, 2),
+                    'rssBytes': memory.get('rssBytes'),
+                    'admissionInUseBytes': memory.get('inUseBytes'),
+                    'queued': memory.get('queued')
+                })
+
+
+def summarize(samples, elapsed, slo_ms):
+    """Per-kind and overall latency/throughput/error figures"""
+    kinds = sorted({sample[0] for sample in samples})
+    report = {}
+    for kind in kinds + ['all']:
+        rows = [s for s in samples if kind == 'all' or s[0] == kind]
+        latencies = sorted(s[2] for s in rows if 200 <= s[3] < 300)
+        rejected = sum(1 for s in rows if s[3] == 503)
+        errors = sum(1 for s in rows if not 200 <= s[3] < 300 and s[3] != 503)
+        entry = {
+            'requests': len(rows),
+            'throughputPerSecond': round(len(rows) / elapsed, 2) if elapsed else None,
+            'errors': errors,
+            'rejected': rejected,
+            'errorRate': round((errors + rejected) / len(rows), 4) if rows else 0.0,
+        }
+        for name, fraction in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99)):
+            value = percentile(latencies, fraction)
+            entry[f'{name}Ms'] = round(value * 1000, 1) if value is not None else None
+        entry['maxMs'] = round(latencies[-1] * 1000, 1) if latencies else None
+        if kind in slo_ms:
+            within = sum(1 for latency in latencies if latency * 1000 <= slo_ms[kind])
+            entry['slo'] = {
+                'targetMs': slo_ms[kind],
+                'withinFraction': round(within / len(rows), 4) if rows else None
+            }
+        report[kind] = entry
+    return report
+
+
+def print_report(report):
+    header = f"{'kind':<22}{'req':>7}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'err':>6}{'503':>6}{'slo':>8}"
+    print(header)
+    print('-' * len(header))
+    for kind, entry in report['results'].items():
+        slo = entry.get('slo', {}).get('withinFraction')
+        cells = [entry['p50Ms'], entry['p95Ms'], entry['p99Ms']]
+        print(f"{kind:<22}{entry['requests']:>7}{entry['throughputPerSecond'] or 0:>8.1f}"
+              + ''.join(f"{cell if cell is not None else '-':>9}" for cell in cells)
+              + f"{entry['errors']:>6}{entry['rejected']:>6}"
+              + f"{'-' if slo is None else f'{slo:.1%}':>8}")
+    rss = [point['rssBytes'] for point in report['rss'] if point['rssBytes']]
+    if rss:
+        print(f"server RSS: start {rss[0] / 2**20:.0f} MB, peak {max(rss) / 2**20:.0f} MB, "
+              f"end {rss[-1] / 2**20:.0f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay slider-drag sessions against a Photexx backend')
+    parser.add_argument('--url', default='http://127.0.0.1:5001')
+    parser.add_argument('--image', action='append', default=[], help='stored filename (repeatable)')
+    parser.add_argument('--project', help='use every image of this project')
+    parser.add_argument('--users', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=60.0, help='seconds')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--preset-ratio', type=float, default=0.1, help='share of gestures that apply a preset')
+    parser.add_argument('--think-time', type=float, default=1.5, help='max seconds between gestures')
+    parser.add_argument('--interactive-slo', type=float, default=100.0, help='ms target for drag renders')
+    parser.add_argument('--final-slo', type=float, default=500.0, help='ms target for settled renders')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--report', help='write the JSON report here')
+    args = parser.parse_args(argv)
+
+    client = Client(args.url, args.timeout)
+    images = list(args.image)
+    if args.project:
+        status, project = client.request('GET', f'/project/{args.project}')
+        if status != 200:
+            parser.error(f'project {args.project} not found')
+        images += [image['filename'] for image in project.get('images', [])]
+    if not images:
+        parser.error('give --image or --project')
+
+    status, body = client.request('GET', '/presets/list')
+    presets = sorted((body or {}).get('presets', [])) if status == 200 else []
+
+    recorder = Recorder()
+    stop = threading.Event()
+    start = time.perf_counter()
+    sampler = RssSampler(client, start, stop)
+    users = [VirtualUser(i, client, recorder, images, presets, args, start, stop) for i in range(args.users)]
+
+    print(f"{args.users} users, {args.duration:.0f}s, {len(images)} images, {len(presets)} presets, seed {args.seed}")
+    sampler.start()
+    for user in users:
+        user.start()
+    try:
+        stop.wait(args.duration)
+    except KeyboardInterrupt:
+        pass
+    stop.set()
+    for user in users:
+        user.join()
+    sampler.join()
+    elapsed = time.perf_counter() - start
+
+    slo_ms = {'process_interactive': args.interactive_slo, 'process_final': args.final_slo}
+    report = {
+        'config': {key: value for key, value in vars(args).items() if key != 'report'},
+        'images': images,
+        'elapsedSeconds': round(elapsed, 2),
+        'results': summarize(recorder.samples, elapsed, slo_ms),
+        'rss': sampler.series
+    }
+    print_report(report)
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Resolution-independent local adjustments
+A local adjustment is a linear gradient or a radial (elliptical) mask with
+its own exposure, contrast and saturation, described analytically in
+normalized output-frame coordinates (0..1 across the cropped image):
+
+    {"type": "linear", "x1", "y1", "x2", "y2", "exposure", "contrast", "saturation"}
+        full effect on the (x1, y1) side, fading to none at (x2, y2)
+    {"type": "radial", "cx", "cy", "rx", "ry", "feather", "invert", "exposure", ...}
+        full effect inside the ellipse, fading over the outer `feather` share
+
+Values use the editor's slider scales: exposure -5..5 (one stop at 5, as
+the global exposure slider), contrast and saturation -100..100.
+
+Masks are evaluated per render from an affine map of the rendered pixels
+into that frame, so a preview level, a tile or an export all share one
+definition and no mask ever exists at sensor resolution.
+"""
+from lazy_imports import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+MASK_TYPES = ('linear', 'radial')
+# Rec. 601 luma, as used by cv2.COLOR_RGB2GRAY
+LUMA_WEIGHTS = (0.299, 0.587, 0.114)
+MAX_MASKS = 16
+
+
+def _number(spec, key, default=0.0):
+    return float(spec.get(key, default) or 0.0)
+
+
+def parse_masks(adjustments):
+    """
+    Validated local adjustments of an adjustments dict (empty when there are none)
+
+    Raises:
+        ValueError: unknown mask type or too many masks
+    """
+    specs = adjustments.get('masks') or []
+    if len(specs) > MAX_MASKS:
+        raise ValueError(f'At most {MAX_MASKS} local masks are supported')
+
+    masks = []
+    for spec in specs:
+        kind = spec.get('type')
+        if kind not in MASK_TYPES:
+            raise ValueError(f'Unknown mask type: {kind}')
+        mask = {
+            'type': kind,
+            # Slider units to stops and factors, as apply_adjustments converts them
+            'exposure': _number(spec, 'exposure') / 5.0,
+            'contrast': _number(spec, 'contrast') / 100.0,
+            'saturation': _number(spec, 'saturation') / 100.0
+        }
+        if not (mask['exposure'] or mask['contrast'] or mask['saturation']):
+            continue
+        if kind == 'linear':
+            mask.update({key: _number(spec, key) for key in ('x1', 'y1', 'x2', 'y2')})
+            if mask['x1'] == mask['x2'] and mask['y1'] == mask['y2']:
+                continue
+        else:
+            mask.update({
+                'cx': _number(spec, 'cx', 0.5),
+                'cy': _number(spec, 'cy', 0.5),
+                'rx': max(_number(spec, 'rx', 0.25), 1e-3),
+                'ry': max(_number(spec, 'ry', 0.25), 1e-3),
+                'feather': min(max(_number(spec, 'feather', 0.5), 1e-3), 1.0),
+                'invert': bool(spec.get('invert'))
+            })
+        masks.append(mask)
+    return masks
+
+
+def _smoothstep(t):
+    return t * t * (np.float32(3.0) - np.float32(2.0) * t)
+
+
+def mask_values(mask, width, height, transform):
+    """
+    Float32 mask (height x width) of one local adjustment
+
+    Args:
+        transform: 3x3 map from the rendered region's coordinates (pixel
+            edges at integers) to normalized output-frame coordinates
+    """
+    # Pixel centers of the region, mapped into the frame (affine, so separable per axis)
+    xs = (np.arange(width, dtype=np.float32) + 0.5)[None, :]
+    ys = (np.arange(height, dtype=np.float32) + 0.5)[:, None]
+    (a, b, c), (d, e, f) = transform[0], transform[1]
+
+    if mask['type'] == 'linear':
+        # 1 - t, with t the position along (x1, y1) -> (x2, y2): one affine plane
+        dx, dy = mask['x2'] - mask['x1'], mask['y2'] - mask['y1']
+        length = dx * dx + dy * dy
+        ku, kv = -dx / length, -dy / length
+        offset = 1.0 - ku * mask['x1'] - kv * mask['y1']
+        values = (np.float32(ku * a + kv * d) * xs + np.float32(ku * c + kv * f + offset)) \
+            + np.float32(ku * b + kv * e) * ys
+    else:
+        # Ellipse-normalized offsets from the center, then (1 - distance) / feather
+        u = (np.float32(a / mask['rx']) * xs + np.float32((c - mask['cx']) / mask['rx'])) \
+            + np.float32(b / mask['rx']) * ys
+        v = (np.float32(d / mask['ry']) * xs + np.float32((f - mask['cy']) / mask['ry'])) \
+            + np.float32(e / mask['ry']) * ys
+        values = cv2.magnitude(u, v)
+        values *= np.float32(-1.0 / mask['feather'])
+        values += np.float32(1.0 / mask['feather'])
+
+    np.clip(values, 0.0, 1.0, out=values)
+    values = _smoothstep(values)
+    if mask['type'] == 'radial' and mask['invert']:
+        values = 1.0 - values
+    return values
+
+
+def apply_local_adjustments(rgb, masks, transform, white=1.0):
+    """
+    Blend each local adjustment into a float RGB array
+
+    Args:
+        rgb: H x W x 3 array, 0..white (modified in place when already float32)
+        transform: see mask_values
+    """
+    if not masks:
+        return rgb
+    height, width = rgb.shape[:2]
+    rgb = rgb.astype(np.float32, copy=False)
+
+    for mask in masks:
+        weight = mask_values(mask, width, height, transform)
+        # Work only on the bounding box of the pixels the mask touches
+        rows = np.flatnonzero(weight.max(axis=1) > 0)
+        if len(rows) == 0:
+            continue
+        cols = np.flatnonzero(weight[rows[0]:rows[-1] + 1].max(axis=0) > 0)
+        window = (slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1))
+        weight = weight[window]
+        region = np.ascontiguousarray(rgb[window])
+
+        # OpenCV arithmetic on contiguous 3-channel planes (numpy broadcasting over
+        # the channel axis is several times slower)
+        if mask['exposure']:
+            factor = np.exp2(np.float32(mask['exposure']) * weight)
+            cv2.multiply(region, cv2.merge([factor] * 3), dst=region)
+        if mask['contrast']:
+            middle = np.float32(white / 2.0)
+            factor = np.float32(mask['contrast']) * weight + np.float32(1.0)
+            region -= middle
+            cv2.multiply(region, cv2.merge([factor] * 3), dst=region)
+            region += middle
+        if mask['saturation']:
+            luma = cv2.merge([cv2.transform(region, np.array([LUMA_WEIGHTS], dtype=np.float32))] * 3)
+            factor = np.float32(mask['saturation']) * weight + np.float32(1.0)
+            cv2.subtract(region, luma, dst=region)
+            cv2.multiply(region, cv2.merge([factor] * 3), dst=region)
+            cv2.add(region, luma, dst=region)
+        np.clip(region, 0.0, white, out=region)
+        rgb[window] = region
+
+    return rgb
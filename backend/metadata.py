@@ -0,0 +1,332 @@
+"""
+Capture metadata index
+EXIF is read from the file header only: JPEGs through PIL's lazy open (no
+pixel decode), RAWs through a small TIFF IFD walker that seeks straight to
+IFD0 and the Exif sub-IFD (CR2, NEF, ARW, DNG, ORF and RW2 are all TIFF
+containers). The values land in typed columns - numeric ones in numpy
+arrays, camera/lens as dictionary codes - so sorting and filtering a project
+is an argsort/mask over the index instead of opening every file.
+
+The stored orientation is reused by the decoders, which then skip
+exif_transpose (and its full-size copy for upright images).
+"""
+import struct
+import threading
+from datetime import datetime
+
+from PIL import Image
+
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+
+TAG_MAKE = 0x010F
+TAG_MODEL = 0x0110
+TAG_ORIENTATION = 0x0112
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+TAG_EXPOSURE_TIME = 0x829A
+TAG_F_NUMBER = 0x829D
+TAG_ISO = 0x8827
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_FOCAL_LENGTH = 0x920A
+TAG_LENS_MODEL = 0xA434
+
+IFD0_TAGS = {TAG_MAKE, TAG_MODEL, TAG_ORIENTATION, TAG_DATETIME, TAG_EXIF_IFD}
+EXIF_TAGS = {TAG_EXPOSURE_TIME, TAG_F_NUMBER, TAG_ISO, TAG_DATETIME_ORIGINAL,
+             TAG_FOCAL_LENGTH, TAG_LENS_MODEL}
+
+# EXIF orientation -> transpose that makes the image upright
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+NUMERIC_COLUMNS = ('captureTime', 'iso', 'exposureTime', 'fNumber', 'focalLength')
+TEXT_COLUMNS = ('camera', 'lens')
+SORT_KEYS = NUMERIC_COLUMNS + TEXT_COLUMNS
+
+# TIFF field type -> (struct code, size); rationals are two LONGs
+_TIFF_TYPES = {1: ('B', 1), 2: ('s', 1), 3: ('H', 2), 4: ('L', 4), 5: ('L', 8),
+               7: ('B', 1), 9: ('l', 4), 10: ('l', 8), 11: ('f', 4), 12: ('d', 8)}
+# II*, MM*, plus the Olympus (IIRO/IIRS) and Panasonic (IIU) variants
+_TIFF_MAGICS = {42, 0x4F52, 0x5352, 0x55}
+_MAX_IFD_ENTRIES = 1024
+
+
+def apply_orientation(img, orientation):
+    """img made upright for an EXIF orientation (returned as is when already upright)"""
+    method = ORIENTATION_TRANSPOSE.get(orientation)
+    return img.transpose(method) if method is not None else img
+
+
+def _read_ifd(f, offset, endian, wanted):
+    """Values of the wanted tags of the IFD at offset"""
+    f.seek(offset)
+    raw_count = f.read(2)
+    if len(raw_count) < 2:
+        return {}
+    count, = struct.unpack(endian + 'H', raw_count)
+    entries = f.read(12 * min(count, _MAX_IFD_ENTRIES))
+
+    values = {}
+    for start in range(0, len(entries) - 11, 12):
+        tag, field_type, number = struct.unpack(endian + 'HHL', entries[start:start + 8])
+        if tag not in wanted or field_type not in _TIFF_TYPES:
+            continue
+        code, size = _TIFF_TYPES[field_type]
+        data = entries[start + 8:start + 12]
+        if size * number > 4:
+            f.seek(struct.unpack(endian + 'L', data)[0])
+            data = f.read(size * number)
+
+        if field_type == 2:
+            values[tag] = data[:number].split(b'\0', 1)[0].decode('ascii', 'replace').strip()
+        elif field_type in (5, 10):
+            numerator, denominator = struct.unpack(endian + code * 2, data[:8])
+            values[tag] = numerator / denominator if denominator else None
+        else:
+            values[tag] = struct.unpack(endian + code, data[:size])[0]
+    return values
+
+
+def read_tiff_tags(path):
+    """(IFD0 tags, Exif IFD tags) of a TIFF-based file, read by seeking"""
+    with open(path, 'rb') as f:
+        header = f.read(8)
+        if len(header) < 8 or header[:2] not in (b'II', b'MM'):
+            return {}, {}
+        endian = '<' if header[:2] == b'II' else '>'
+        magic, ifd_offset = struct.unpack(endian + 'HL', header[2:])
+        if magic not in _TIFF_MAGICS:
+            return {}, {}
+        ifd0 = _read_ifd(f, ifd_offset, endian, IFD0_TAGS)
+        exif = _read_ifd(f, ifd0[TAG_EXIF_IFD], endian, EXIF_TAGS) if TAG_EXIF_IFD in ifd0 else {}
+    return ifd0, exif
+
+
+def _read_pil_tags(path):
+    """(IFD0 tags, Exif IFD tags, size) through PIL, which stops before the pixel data"""
+    with Image.open(path) as img:
+        ifd0 = img.getexif()
+        exif = ifd0.get_ifd(TAG_EXIF_IFD)
+        return dict(ifd0), dict(exif), img.size
+
+
+def _number(value):
+    if isinstance(value, (tuple, list)):
+        value = value[0] if value else None
+    try:
+        value = float(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return value if value == value else None
+
+
+def _text(value):
+    if isinstance(value, bytes):
+        value = value.decode('ascii', 'replace')
+    if not isinstance(value, str):
+        return None
+    value = value.strip('\0 ').strip()
+    return value or None
+
+
+def _timestamp(value):
+    text = _text(value)
+    if text is None:
+        return None
+    try:
+        return datetime.strptime(text[:19], '%Y:%m:%d %H:%M:%S').timestamp()
+    except ValueError:
+        return None
+
+
+def read_metadata(path, is_raw):
+    """Capture metadata of an image, from its header only"""
+    size = None
+    if is_raw:
+        ifd0, exif = read_tiff_tags(path)
+    else:
+        ifd0, exif, size = _read_pil_tags(path)
+
+    make = _text(ifd0.get(TAG_MAKE))
+    model = _text(ifd0.get(TAG_MODEL))
+    # "Canon" + "Canon EOS R5" -> "Canon EOS R5"
+    if make and model and not model.lower().startswith(make.split()[0].lower()):
+        camera = f'{make} {model}'
+    else:
+        camera = model or make
+
+    orientation = ifd0.get(TAG_ORIENTATION)
+    record = {
+        'captureTime': _timestamp(exif.get(TAG_DATETIME_ORIGINAL) or ifd0.get(TAG_DATETIME)),
+        'iso': _number(exif.get(TAG_ISO)),
+        'exposureTime': _number(exif.get(TAG_EXPOSURE_TIME)),
+        'fNumber': _number(exif.get(TAG_F_NUMBER)),
+        'focalLength': _number(exif.get(TAG_FOCAL_LENGTH)),
+        'camera': camera,
+        'lens': _text(exif.get(TAG_LENS_MODEL)),
+        'orientation': orientation if orientation in ORIENTATION_TRANSPOSE else 1
+    }
+    if size is not None:
+        record['width'], record['height'] = size
+    return record
+
+
+class MetadataIndex:
+    """stored name -> capture metadata, kept as typed columns"""
+
+    def __init__(self, capacity=1024):
+        self._rows = {}
+        self._capacity = capacity
+        # Columns are allocated on the first add, so creating an index does not import numpy
+        self._numeric = None
+        # Text columns: dictionary codes (-1 = unknown) plus their vocabulary
+        self._codes = None
+        self._vocab = {name: [] for name in TEXT_COLUMNS}
+        self._vocab_codes = {name: {} for name in TEXT_COLUMNS}
+        self._orientation = None
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    def _allocate(self):
+        self._numeric = {name: np.full(self._capacity, np.nan) for name in NUMERIC_COLUMNS}
+        self._codes = {name: np.full(self._capacity, -1, dtype=np.int32) for name in TEXT_COLUMNS}
+        self._orientation = np.ones(self._capacity, dtype=np.int8)
+
+    def _grow(self):
+        capacity = len(self._orientation) * 2
+
+        def grown(array, fill):
+            bigger = np.full(capacity, fill, dtype=array.dtype)
+            bigger[:len(array)] = array
+            return bigger
+
+        self._numeric = {name: grown(column, np.nan) for name, column in self._numeric.items()}
+        self._codes = {name: grown(column, -1) for name, column in self._codes.items()}
+        self._orientation = grown(self._orientation, 1)
+
+    def _code(self, column, value):
+        if value is None:
+            return -1
+        codes = self._vocab_codes[column]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self._vocab[column])
+            self._vocab[column].append(value)
+        return code
+
+    def add(self, name, record):
+        with self._lock:
+            if self._orientation is None:
+                self._allocate()
+            row = self._rows.get(name)
+            if row is None:
+                row = len(self._rows)
+                if row == len(self._orientation):
+                    self._grow()
+                self._rows[name] = row
+            for column in NUMERIC_COLUMNS:
+                value = record.get(column)
+                self._numeric[column][row] = np.nan if value is None else value
+            for column in TEXT_COLUMNS:
+                self._codes[column][row] = self._code(column, record.get(column))
+            self._orientation[row] = record.get('orientation', 1)
+            if 'width' in record:
+                self._sizes[name] = (record['width'], record['height'])
+
+    def orientation(self, name):
+        """Stored EXIF orientation, or None for images not indexed yet"""
+        with self._lock:
+            row = self._rows.get(name)
+            return None if row is None else int(self._orientation[row])
+
+    def size(self, name):
+        """Stored (width, height) before orientation, when the header had it"""
+        return self._sizes.get(name)
+
+    def record(self, name):
+        with self._lock:
+            row = self._rows.get(name)
+            if row is None:
+                return None
+            record = {}
+            for column in NUMERIC_COLUMNS:
+                value = self._numeric[column][row]
+                record[column] = None if np.isnan(value) else float(value)
+            for column in TEXT_COLUMNS:
+                code = self._codes[column][row]
+                record[column] = self._vocab[column][code] if code >= 0 else None
+            record['orientation'] = int(self._orientation[row])
+        return record
+
+    def facets(self, names):
+        """Distinct cameras and lenses among names"""
+        with self._lock:
+            if self._orientation is None:
+                return {column: [] for column in TEXT_COLUMNS}
+            rows = np.asarray([self._rows[name] for name in names if name in self._rows], dtype=np.int64)
+            return {column: sorted(self._vocab[column][code] for code in np.unique(self._codes[column][rows])
+                                   if code >= 0)
+                    for column in TEXT_COLUMNS}
+
+    def query(self, names, sort=None, descending=False, camera=None, lens=None,
+              min_iso=None, max_iso=None):
+        """
+        Positions in names that pass the filters, in sort order
+
+        Unindexed images fail every filter and sort last, as do unknown values.
+        """
+        filtered = bool(camera or lens or min_iso is not None or max_iso is not None)
+        with self._lock:
+            if self._orientation is None:
+                # Nothing indexed yet: every filter fails, and there is nothing to sort by
+                return [] if filtered else list(range(len(names)))
+            rows = np.asarray([self._rows.get(name, -1) for name in names], dtype=np.int64)
+            known = rows >= 0
+            safe = np.where(known, rows, 0)
+            keep = known.copy() if filtered else np.ones(len(names), dtype=bool)
+
+            for column, value in (('camera', camera), ('lens', lens)):
+                if value:
+                    code = self._vocab_codes[column].get(value, -2)
+                    keep &= self._codes[column][safe] == code
+            iso = self._numeric['iso'][safe]
+            if min_iso is not None:
+                keep &= iso >= min_iso
+            if max_iso is not None:
+                keep &= iso <= max_iso
+
+            positions = np.flatnonzero(keep)
+            if sort not in SORT_KEYS:
+                return positions.tolist()
+
+            if sort in NUMERIC_COLUMNS:
+                values = np.where(known, self._numeric[sort][safe], np.nan)[positions]
+                missing = np.isnan(values)
+            else:
+                # Sort text by the alphabetical rank of each code
+                vocab = self._vocab[sort]
+                ranks = np.empty(len(vocab) + 1, dtype=np.float64)
+                ranks[:-1] = np.argsort(np.argsort(np.asarray(vocab, dtype=object)))
+                ranks[-1] = np.nan
+                codes = np.where(known, self._codes[sort][safe], -1)[positions]
+                values = ranks[codes]
+                missing = codes < 0
+
+        values = np.where(missing, 0, values)
+        if descending:
+            values = -values
+        # Stable sort keeps the project order among equal values; unknowns go last
+        order = np.lexsort((values, missing))
+        return positions[order].tolist()
+
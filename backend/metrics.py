@@ -0,0 +1,225 @@
+"""
+Lightweight timing instrumentation for the Photexx backend
+Per-stage timers feed a Server-Timing header on every response and
+Prometheus text metrics served from /metrics
+"""
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+
+# Upper bounds (seconds) for the latency histograms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_stage_histograms = {}
+_request_histograms = {}
+_request_totals = {}
+_in_flight = {}
+_cache_counters = {}
+_gauges = {}
+
+
+class Histogram:
+    """Cumulative latency histogram in Prometheus layout"""
+
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.total += seconds
+        self.count += 1
+
+
+def _observe(histograms, key, seconds):
+    with _lock:
+        hist = histograms.get(key)
+        if hist is None:
+            hist = histograms[key] = Histogram()
+        hist.observe(seconds)
+
+
+class stage:
+    """
+    Time a pipeline stage
+
+    Usage:
+        with metrics.stage('decode'):
+            ...
+
+    The duration goes into the stage histogram and, inside a request,
+    into that response's Server-Timing header.
+    """
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record_stage(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def record_stage(name, seconds):
+    """Record an already measured stage duration"""
+    _observe(_stage_histograms, name, seconds)
+    if has_request_context():
+        timings = g.setdefault('server_timing', {})
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def record_cache(cache_name, hit):
+    """Count a cache lookup as hit or miss"""
+    with _lock:
+        counters = _cache_counters.setdefault(cache_name, [0, 0])
+        counters[0 if hit else 1] += 1
+
+
+def set_gauge(name, value, help_text=''):
+    """Set a gauge to a fixed value"""
+    with _lock:
+        _gauges[name] = (value, help_text)
+
+
+def register_gauge(name, fn, help_text=''):
+    """Register a gauge whose value is read from fn() at scrape time"""
+    with _lock:
+        _gauges[name] = (fn, help_text)
+
+
+def _server_timing_header(total_seconds):
+    timings = g.get('server_timing', {})
+    parts = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in timings.items()]
+    parts.append(f'total;dur={total_seconds * 1000:.2f}')
+    return ', '.join(parts)
+
+
+def _histogram_lines(metric, label_name, histograms):
+    lines = []
+    for key, hist in sorted(histograms.items()):
+        labels = f'{label_name}="{key}"'
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, hist.counts):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {hist.count}')
+        lines.append(f'{metric}_sum{{{labels}}} {hist.total:.6f}')
+        lines.append(f'{metric}_count{{{labels}}} {hist.count}')
+    return lines
+
+
+def render_prometheus():
+    """Render all metrics in Prometheus text exposition format"""
+    with _lock:
+        lines = [
+            '# HELP photexx_stage_duration_seconds Time spent in each pipeline stage',
+            '# TYPE photexx_stage_duration_seconds histogram',
+        ]
+        lines += _histogram_lines('photexx_stage_duration_seconds', 'stage', _stage_histograms)
+
+        lines += [
+            '# HELP photexx_request_duration_seconds Request latency per endpoint',
+            '# TYPE photexx_request_duration_seconds histogram',
+        ]
+        lines += _histogram_lines('photexx_request_duration_seconds', 'endpoint', _request_histograms)
+
+        lines += [
+            '# HELP photexx_requests_total Completed requests per endpoint and status',
+            '# TYPE photexx_requests_total counter',
+        ]
+        for (endpoint, status), count in sorted(_request_totals.items()):
+            lines.append(f'photexx_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+        lines += [
+            '# HELP photexx_requests_in_flight Requests currently being handled',
+            '# TYPE photexx_requests_in_flight gauge',
+        ]
+        for endpoint, count in sorted(_in_flight.items()):
+            lines.append(f'photexx_requests_in_flight{{endpoint="{endpoint}"}} {count}')
+
+        lines += [
+            '# HELP photexx_cache_requests_total Cache lookups by result',
+            '# TYPE photexx_cache_requests_total counter',
+        ]
+        ratios = []
+        for cache_name, (hits, misses) in sorted(_cache_counters.items()):
+            lines.append(f'photexx_cache_requests_total{{cache="{cache_name}",result="hit"}} {hits}')
+            lines.append(f'photexx_cache_requests_total{{cache="{cache_name}",result="miss"}} {misses}')
+            lookups = hits + misses
+            ratios.append((cache_name, hits / lookups if lookups else 0.0))
+
+        lines += [
+            '# HELP photexx_cache_hit_ratio Cache hit ratio since start',
+            '# TYPE photexx_cache_hit_ratio gauge',
+        ]
+        for cache_name, ratio in ratios:
+            lines.append(f'photexx_cache_hit_ratio{{cache="{cache_name}"}} {ratio:.4f}')
+
+        gauges = list(_gauges.items())
+
+    # Gauge callbacks run outside the lock so they may take their own locks
+    for name, (value, help_text) in sorted(gauges):
+        if callable(value):
+            try:
+                value = value()
+            except Exception:
+                continue
+        if value is None:
+            continue
+        if help_text:
+            lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        lines.append(f'{name} {value}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    """Install request timing hooks and the /metrics endpoint on a Flask app"""
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_start = time.perf_counter()
+        g.metrics_endpoint = request.endpoint or 'unknown'
+        with _lock:
+            _in_flight[g.metrics_endpoint] = _in_flight.get(g.metrics_endpoint, 0) + 1
+
+    @app.after_request
+    def _add_server_timing(response):
+        start = g.get('request_start')
+        if start is not None:
+            elapsed = time.perf_counter() - start
+            endpoint = g.metrics_endpoint
+            response.headers['Server-Timing'] = _server_timing_header(elapsed)
+            response.headers['Timing-Allow-Origin'] = '*'
+            _observe(_request_histograms, endpoint, elapsed)
+            with _lock:
+                key = (endpoint, response.status_code)
+                _request_totals[key] = _request_totals.get(key, 0) + 1
+        return response
+
+    @app.teardown_request
+    def _finish_request(exc):
+        endpoint = g.get('metrics_endpoint')
+        if endpoint is not None:
+            with _lock:
+                _in_flight[endpoint] = max(0, _in_flight.get(endpoint, 0) - 1)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        """Prometheus scrape endpoint"""
+        return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,140 @@
+"""
+Perceptual-hash index for burst and near-duplicate grouping
+Every image gets a 64-bit difference hash (dHash) computed from its
+thumbnail at ingest, kept in a packed uint64 array. Grouping compares all
+pairs at once: the hash bits become +-1 vectors, so a single matrix product
+gives 64 - 2 * Hamming distance for a whole block of pairs, and connected
+components of the "close enough" graph are found by vectorized label
+propagation.
+"""
+import threading
+
+from PIL import Image
+
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+
+HASH_BITS = 64
+# dHash distance at or below which two frames count as the same shot
+DEFAULT_THRESHOLD = 10
+# Rows of the pair matrix computed at once (BLOCK x N float32)
+BLOCK_ROWS = 1024
+
+
+def dhash(img):
+    """64-bit difference hash: brightness gradients of a 9x8 grayscale version"""
+    small = img.convert('L').resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def hash_thumbnail(thumb_path):
+    with Image.open(thumb_path) as img:
+        img.draft('RGB', (64, 64))
+        return dhash(img)
+
+
+class HashStore:
+    """stored name -> dHash, packed in one growable uint64 array"""
+
+    def __init__(self, capacity=1024):
+        self._rows = {}
+        self._capacity = capacity
+        # Allocated on the first add, so creating a store does not import numpy
+        self._values = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    def add(self, name, value):
+        with self._lock:
+            row = self._rows.get(name)
+            if self._values is None:
+                self._values = np.zeros(self._capacity, dtype=np.uint64)
+            if row is None:
+                row = len(self._rows)
+                if row == len(self._values):
+                    grown = np.zeros(len(self._values) * 2, dtype=np.uint64)
+                    grown[:row] = self._values
+                    self._values = grown
+                self._rows[name] = row
+            self._values[row] = value
+
+    def lookup(self, names):
+        """(packed uint64 hashes of the known names, their positions in names)"""
+        with self._lock:
+            if self._values is None:
+                return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+            rows = [self._rows.get(name, -1) for name in names]
+            rows = np.asarray(rows, dtype=np.int64)
+            positions = np.flatnonzero(rows >= 0)
+            return self._values[rows[positions]], positions
+
+
+def _signs(hashes):
+    """N x 64 float32 matrix of +-1 per hash bit"""
+    bits = np.unpackbits(hashes.astype('>u8').view(np.uint8).reshape(-1, 8), axis=1)
+    return bits.astype(np.float32) * 2 - 1
+
+
+def close_pairs(hashes, threshold=DEFAULT_THRESHOLD, block_rows=BLOCK_ROWS):
+    """All index pairs (i < j) with Hamming distance <= threshold"""
+    signs = _signs(hashes)
+    min_dot = HASH_BITS - 2 * threshold
+    lefts, rights = [], []
+    for start in range(0, len(signs), block_rows):
+        block = signs[start:start + block_rows]
+        # Only the upper triangle: columns from the block's first row on
+        dots = block @ signs[start:].T
+        rows, cols = np.nonzero(dots >= min_dot)
+        cols = cols + start
+        rows = rows + start
+        keep = cols > rows
+        lefts.append(rows[keep])
+        rights.append(cols[keep])
+    if not lefts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(lefts), np.concatenate(rights)
+
+
+def connected_labels(count, lefts, rights):
+    """Component label (smallest member index) for every node of an edge list"""
+    labels = np.arange(count)
+    if len(lefts) == 0:
+        return labels
+    while True:
+        low = np.minimum(labels[lefts], labels[rights])
+        updated = labels.copy()
+        np.minimum.at(updated, lefts, low)
+        np.minimum.at(updated, rights, low)
+        # Pointer jumping: follow labels to their own labels until stable
+        while True:
+            jumped = updated[updated]
+            if np.array_equal(jumped, updated):
+                break
+            updated = jumped
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def group_similar(hashes, threshold=DEFAULT_THRESHOLD):
+    """
+    Groups of near-identical hashes
+
+    Returns:
+        list of index arrays (size >= 2, ascending), ordered by first index
+    """
+    if len(hashes) < 2:
+        return []
+    lefts, rights = close_pairs(hashes, threshold)
+    labels = connected_labels(len(hashes), lefts, rights)
+
+    order = np.argsort(labels, kind='stable')
+    sorted_labels = labels[order]
+    starts = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+    ends = np.r_[starts[1:], len(order)]
+    return [order[start:end] for start, end in zip(starts, ends) if end - start > 1]
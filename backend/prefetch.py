@@ -0,0 +1,123 @@
+"""
+Low-priority neighbor prefetch while browsing a project
+Opening image N schedules the editing pyramids of N+1, N-1, N+2 and N-2 on
+a single background worker. A newer schedule cancels whatever is still
+queued (a decode already running finishes, but nothing after it starts),
+the worker waits while foreground decodes/renders hold memory, and
+prefetched entries never take more than a share of the cache budget.
+"""
+import logging
+import os
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Offsets from the opened image, most likely next first
+NEIGHBOR_OFFSETS = (1, -1, 2, -2)
+# Prefetched entries may use at most this share of the cache budget
+PREFETCH_BUDGET_SHARE = 0.5
+# How long to wait for the foreground to go idle before skipping a job
+IDLE_WAIT = 2.0
+IDLE_POLL = 0.05
+
+
+def wait_idle(idle, timeout=IDLE_WAIT, cancelled=lambda: False):
+    """Poll idle() until it holds; False on timeout or once cancelled() is true"""
+    deadline = time.monotonic() + timeout
+    while not idle():
+        if time.monotonic() > deadline or cancelled():
+            return False
+        time.sleep(IDLE_POLL)
+    return True
+
+
+def neighbor_indices(index, count, offsets=NEIGHBOR_OFFSETS):
+    """Valid neighbor positions of index in a list of count items"""
+    return [index + offset for offset in offsets if 0 <= index + offset < count]
+
+
+class Prefetcher:
+    """Single worker that loads cache entries ahead of the user"""
+
+    def __init__(self, load, cache, idle, entry_bytes):
+        """
+        Args:
+            load: function(filepath) that loads and caches one entry
+            cache: the ImageCache the entries land in
+            idle: function() -> True when no foreground work holds memory
+            entry_bytes: estimated size of one entry
+        """
+        self.load = load
+        self.cache = cache
+        self.idle = idle
+        self.entry_bytes = entry_bytes
+        self.completed = 0
+        self.cancelled = 0
+        self.skipped = 0
+        self._jobs = []
+        self._generation = 0
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def register_metrics(self):
+        metrics.register_gauge('photexx_prefetch_completed', lambda: self.completed,
+                               'Neighbor images prefetched since start')
+        metrics.register_gauge('photexx_prefetch_cancelled', lambda: self.cancelled,
+                               'Queued prefetches dropped because the user moved on')
+        metrics.register_gauge('photexx_prefetch_skipped', lambda: self.skipped,
+                               'Prefetches skipped for memory budget or a busy foreground')
+
+    def schedule(self, jobs):
+        """Replace the queue with jobs: list of (cache_key, filepath) in priority order"""
+        with self._cond:
+            self._generation += 1
+            self.cancelled += len(self._jobs)
+            self._jobs = list(jobs)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='prefetch', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def cancel(self):
+        self.schedule([])
+
+    def _lower_priority(self):
+        # Per-thread niceness on Linux; elsewhere the idle wait is the only yielding
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+        except (AttributeError, OSError):
+            pass
+
+    def _run(self):
+        self._lower_priority()
+        while True:
+            with self._cond:
+                while not self._jobs:
+                    self._cond.wait()
+                cache_key, filepath = self._jobs.pop(0)
+                generation = self._generation
+
+            if cache_key in self.cache:
+                continue
+
+            # Evicting is fine while the opened image and all its neighbors fit in the
+            # prefetch share (LRU then only drops images outside the window); with a
+            # smaller budget, prefetch only into free room
+            window_bytes = (len(NEIGHBOR_OFFSETS) + 1) * self.entry_bytes
+            fits = (self.cache.has_room(self.entry_bytes)
+                    or window_bytes <= self.cache.budget_bytes * PREFETCH_BUDGET_SHARE)
+            if not fits or not wait_idle(self.idle, cancelled=lambda: generation != self._generation):
+                self.skipped += 1
+                continue
+            if generation != self._generation:
+                continue
+
+            try:
+                with metrics.stage('prefetch'):
+                    self.load(filepath)
+                self.completed += 1
+            except Exception as e:
+                logger.error(f"Prefetch failed for {os.path.basename(filepath)}: {str(e)}")
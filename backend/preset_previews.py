@@ -0,0 +1,94 @@
+"""
+Batched preset preview strips
+Every preset is rendered onto the same small cover-cropped cell taken from
+the image's smart preview, in parallel, and the results are packed into a
+single horizontal JPEG strip. The preset panel loads one image instead of
+calling /preset/apply (a full-size render) once per preset.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+
+from PIL import Image, ImageOps
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+PRESET_CELL = (256, 120)
+PRESET_STRIP_QUALITY = 85
+PRESET_STRIP_DIR = 'preset_strips'
+
+
+def strip_version(filename, presets):
+    """Id for an image + ordered (name, adjustments) list; changes when a preset is edited"""
+    payload = json.dumps([filename, presets], sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def preset_cell(img, cell=PRESET_CELL):
+    """Cover-crop the shared source image to the cell size"""
+    with metrics.stage('resize'):
+        return ImageOps.fit(img, cell, Image.Resampling.LANCZOS)
+
+
+def build_preset_strip(filename, source, presets, render, executor, processed_folder):
+    """
+    Render every preset onto one shared cell and pack them into a strip
+
+    Args:
+        filename: stored name of the image
+        source: decoded flat image (the smart preview)
+        presets: ordered list of (name, adjustments)
+        render: function(img, adjustments, source_key) -> img
+        executor: concurrent.futures executor for the per-preset renders
+        processed_folder: root of the processed folder
+
+    Returns:
+        index dict with the strip name, cell size and each preset's slot
+    """
+    version = strip_version(filename, presets)
+    strip_folder = os.path.join(processed_folder, PRESET_STRIP_DIR)
+    index_path = os.path.join(strip_folder, f'{filename}_{version}.json')
+
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    cell = preset_cell(source)
+    width, height = cell.size
+    strip = Image.new('RGB', (width * max(1, len(presets)), height), (51, 51, 51))
+
+    with metrics.stage('preset_strip'):
+        # One key for the shared cell, so presets with the same exposure and white
+        # balance reuse its derived planes
+        source_key = ('preset_cell', filename, cell.size)
+        futures = [executor.submit(render, cell, adjustments, source_key) for _, adjustments in presets]
+        slots = []
+        for slot, ((name, _), future) in enumerate(zip(presets, futures)):
+            try:
+                strip.paste(future.result().convert('RGB'), (slot * width, 0))
+            except Exception as e:
+                logger.error(f"Preset preview failed for {name}: {str(e)}")
+            slots.append({'name': name, 'slot': slot, 'x': slot * width})
+
+    os.makedirs(strip_folder, exist_ok=True)
+    strip_name = f'{filename}_{version}.jpg'
+    output = io.BytesIO()
+    strip.save(output, format='JPEG', quality=PRESET_STRIP_QUALITY, optimize=True)
+    with open(os.path.join(strip_folder, strip_name), 'wb') as f:
+        f.write(output.getvalue())
+
+    index = {
+        'version': version,
+        'strip': strip_name,
+        'cell': {'width': width, 'height': height},
+        'presets': slots
+    }
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+
+    logger.info(f"Preset strip built for {filename}: {len(presets)} presets")
+    return index
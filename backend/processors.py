@@ -0,0 +1,150 @@
+"""
+Cost-aware routing between render engines
+Every engine (darktable-cli, the built-in processor) records its latency and
+failures here. Interactive requests go to the fastest capable engine, final
+renders to the best one; an engine that keeps failing is skipped until a
+cooldown has passed. The decision is returned so callers can report it.
+
+Policies:
+    auto     interactive -> fastest, final -> highest quality
+    quality  always the highest quality engine (the old darktable-first behaviour)
+    speed    always the fastest engine
+"""
+import logging
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ('auto', 'quality', 'speed')
+INTENTS = ('interactive', 'final')
+
+# Weight of the newest sample in the moving averages
+EWMA_ALPHA = 0.3
+# Engines failing more often than this are skipped...
+FAILURE_LIMIT = 0.5
+# ...until this long after their last failure
+RETRY_AFTER = 60.0
+
+
+class Processor:
+    """One render engine and its running latency/failure estimates"""
+
+    def __init__(self, name, quality, expected_seconds, available, accepts):
+        """
+        Args:
+            quality: rank, higher renders better
+            expected_seconds: latency assumed before the first measurement
+            available: function() -> True while the engine can be used
+            accepts: function(filename) -> True for files the engine handles
+        """
+        self.name = name
+        self.quality = quality
+        self.latency = expected_seconds
+        self.failure_rate = 0.0
+        self.available = available
+        self.accepts = accepts
+        self.runs = 0
+        self.failures = 0
+        self.last_failure = None
+
+    def capable(self, filename):
+        return self.available() and self.accepts(filename)
+
+    def healthy(self, now):
+        if self.failure_rate <= FAILURE_LIMIT:
+            return True
+        return self.last_failure is None or now - self.last_failure > RETRY_AFTER
+
+    def stats(self):
+        return {
+            'quality': self.quality,
+            'latencyMs': round(self.latency * 1000, 1),
+            'failureRate': round(self.failure_rate, 3),
+            'runs': self.runs,
+            'failures': self.failures
+        }
+
+
+class ProcessorRegistry:
+    """Registered engines plus the routing policy"""
+
+    def __init__(self, policy='auto'):
+        # A misconfigured policy must not keep the server from starting
+        if policy not in POLICIES:
+            logger.warning(f"Unknown processor policy '{policy}', using 'auto' (expected one of {', '.join(POLICIES)})")
+            policy = 'auto'
+        self.policy = policy
+        self._processors = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, quality, expected_seconds, available=lambda: True, accepts=lambda filename: True):
+        processor = Processor(name, quality, expected_seconds, available, accepts)
+        self._processors[name] = processor
+        metrics.register_gauge(f'photexx_processor_{name}_latency_seconds', lambda: processor.latency,
+                               f'Moving average render latency of {name}')
+        metrics.register_gauge(f'photexx_processor_{name}_failure_rate', lambda: processor.failure_rate,
+                               f'Moving average failure rate of {name}')
+        return processor
+
+    def record(self, name, seconds, ok):
+        """Fold one run into the engine's estimates (latency only counts successful runs)"""
+        with self._lock:
+            processor = self._processors[name]
+            processor.runs += 1
+            if ok:
+                processor.latency += EWMA_ALPHA * (seconds - processor.latency)
+            else:
+                processor.failures += 1
+                processor.last_failure = time.monotonic()
+            processor.failure_rate += EWMA_ALPHA * ((0.0 if ok else 1.0) - processor.failure_rate)
+
+    def route(self, filename, intent='final'):
+        """
+        Engines to try for one render, best first
+
+        Returns:
+            (list of engine names, decision dict for the response)
+        """
+        if intent not in INTENTS:
+            raise ValueError(f'Unknown render intent: {intent}')
+        now = time.monotonic()
+        with self._lock:
+            capable = [p for p in self._processors.values() if p.capable(filename)]
+            healthy = [p for p in capable if p.healthy(now)]
+            skipped = [p.name for p in capable if p not in healthy]
+
+            by_speed = self.policy == 'speed' or (self.policy == 'auto' and intent == 'interactive')
+            if by_speed:
+                order = sorted(healthy, key=lambda p: p.latency)
+                reason = 'fastest'
+            else:
+                order = sorted(healthy, key=lambda p: (-p.quality, p.latency))
+                reason = 'highest quality'
+            # Unhealthy engines stay as a last resort
+            order += sorted((p for p in capable if p not in healthy), key=lambda p: p.latency)
+
+            names = [p.name for p in order]
+            best_quality = max((p.quality for p in healthy), default=None)
+            upgrade = None
+            if order and by_speed and best_quality is not None and order[0].quality < best_quality:
+                upgrade = max(healthy, key=lambda p: p.quality).name
+
+        decision = {
+            'intent': intent,
+            'policy': self.policy,
+            'reason': reason,
+            'candidates': names,
+            'skipped': skipped,
+            'upgrade': upgrade
+        }
+        return names, decision
+
+    def stats(self):
+        with self._lock:
+            return {
+                'policy': self.policy,
+                'processors': {name: p.stats() for name, p in self._processors.items()}
+            }
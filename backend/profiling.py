@@ -0,0 +1,166 @@
+"""
+On-demand profiling of single requests
+With PHOTEXX_PROFILING enabled, a request to one of the profiled endpoints
+that carries an `X-Photexx-Profile` header or a `?profile=` flag runs under a
+profiler:
+
+    cprofile  deterministic cProfile, saved as <id>.prof (pstats)
+    sample    stack sampler on the handler thread, saved as <id>.folded
+              (collapsed stacks, ready for flamegraph.pl / speedscope)
+
+The profile ID comes back in the `X-Photexx-Profile-Id` response header and
+the file is served from /profiles/<id>.
+"""
+import cProfile
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = 'profiles'
+PROFILE_HEADER = 'X-Photexx-Profile'
+PROFILE_ID_HEADER = 'X-Photexx-Profile-Id'
+MODES = ('cprofile', 'sample')
+EXTENSIONS = {'cprofile': '.prof', 'sample': '.folded'}
+DEFAULT_INTERVAL = 0.005
+
+_PROFILE_ID = re.compile(r'^[0-9]{8}-[0-9]{6}-[a-z_]+-[0-9a-f]{8}$')
+
+# Only one deterministic profiler can be active per process
+_cprofile_lock = threading.Lock()
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval"""
+
+    def __init__(self, thread_id, interval=DEFAULT_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            stack = ';'.join(reversed(names))
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f'{stack} {count}\n')
+
+
+def new_profile_id(endpoint):
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint}-{uuid.uuid4().hex[:8]}"
+
+
+def profile_file(folder, profile_id):
+    """Path of a saved profile, or None for unknown/invalid IDs"""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    for extension in EXTENSIONS.values():
+        path = os.path.join(folder, f'{profile_id}{extension}')
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _requested_mode():
+    value = request.headers.get(PROFILE_HEADER) or request.args.get('profile')
+    if not value or value in ('0', 'false'):
+        return None
+    return value if value in MODES else 'cprofile'
+
+
+def init_app(app, folder, endpoints):
+    """
+    Install the profiling hooks on a Flask app
+
+    Args:
+        folder: directory the profiles are written to
+        endpoints: names of the view functions that may be profiled
+    """
+
+    @app.before_request
+    def _start_profile():
+        if not app.config.get('PROFILING_ENABLED') or request.endpoint not in endpoints:
+            return
+        mode = _requested_mode()
+        if mode is None:
+            return
+
+        # A second concurrent deterministic profile falls back to sampling
+        if mode == 'cprofile' and _cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            mode = 'sample'
+            interval = app.config.get('PROFILE_INTERVAL_MS', DEFAULT_INTERVAL * 1000) / 1000
+            profiler = StackSampler(threading.get_ident(), interval)
+            profiler.start()
+        g.profile = (mode, profiler, new_profile_id(request.endpoint))
+
+    @app.after_request
+    def _finish_profile(response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+        mode, profiler, profile_id = profile
+
+        if mode == 'cprofile':
+            profiler.disable()
+            _cprofile_lock.release()
+        else:
+            profiler.stop()
+
+        try:
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f'{profile_id}{EXTENSIONS[mode]}')
+            if mode == 'cprofile':
+                profiler.dump_stats(path)
+            else:
+                profiler.write(path)
+            response.headers[PROFILE_ID_HEADER] = profile_id
+            response.headers['Access-Control-Expose-Headers'] = PROFILE_ID_HEADER
+            logger.info(f"Profile saved: {profile_id} ({mode})")
+        except Exception as e:
+            logger.error(f"Could not save profile {profile_id}: {str(e)}")
+        return response
+
+    @app.teardown_request
+    def _abandon_profile(exc):
+        # after_request is skipped when the handler raised; never leave a profiler running
+        profile = g.pop('profile', None)
+        if profile is None:
+            return
+        mode, profiler, _ = profile
+        if mode == 'cprofile':
+            profiler.disable()
+            _cprofile_lock.release()
+        else:
+            profiler.stop()
@@ -0,0 +1,129 @@
+"""
+Working-image pyramid and latency-budgeted level selection
+During a slider drag the server renders the largest pyramid level that the
+recent render cost of the same adjustment profile says will fit in the
+latency budget; the client then asks for a full-size refinement once the
+input settles.
+"""
+import threading
+import time
+
+from PIL import Image
+
+import metrics
+
+# Level widths below the base editing width (each roughly halves the pixels)
+PYRAMID_WIDTHS = (1440, 1080, 800, 640, 480)
+
+# Weight of the newest sample in the per-profile cost average
+EWMA_ALPHA = 0.3
+
+
+class Pyramid:
+    """Base editing image plus progressively smaller copies"""
+
+    def __init__(self, base, widths=PYRAMID_WIDTHS):
+        self.levels = [base]
+        current = base
+        for width in widths:
+            if width >= current.width:
+                continue
+            height = max(1, round(current.height * width / current.width))
+            # Resample from the previous level; cheap and close enough for previews
+            current = current.resize((width, height), Image.Resampling.BILINEAR, reducing_gap=2.0)
+            self.levels.append(current)
+
+    @property
+    def base(self):
+        return self.levels[0]
+
+    @property
+    def nbytes(self):
+        return sum(level.width * level.height * len(level.getbands()) for level in self.levels)
+
+    def pixel_counts(self):
+        return [level.width * level.height for level in self.levels]
+
+    def level_for_width(self, width):
+        """Index of the smallest level at least `width` pixels wide"""
+        for index in range(len(self.levels) - 1, -1, -1):
+            if self.levels[index].width >= width:
+                return index
+        return 0
+
+
+def adjustment_profile(adjustments):
+    """Key describing which adjustments are active (their values don't matter for cost)"""
+    active = sorted(key for key, value in adjustments.items()
+                    if isinstance(value, (int, float)) and value != 0)
+    return '+'.join(active) or 'none'
+
+
+class LatencyTracker:
+    """Per-profile moving average of render cost in seconds per megapixel"""
+
+    def __init__(self, alpha=EWMA_ALPHA):
+        self.alpha = alpha
+        self._cost = {}
+        self._overall = None
+        self._lock = threading.Lock()
+
+    def record(self, profile, pixels, seconds):
+        if pixels <= 0:
+            return
+        cost = seconds / (pixels / 1e6)
+        with self._lock:
+            previous = self._cost.get(profile)
+            self._cost[profile] = cost if previous is None else previous + self.alpha * (cost - previous)
+            self._overall = cost if self._overall is None else self._overall + self.alpha * (cost - self._overall)
+
+    def cost_per_megapixel(self, profile):
+        with self._lock:
+            return self._cost.get(profile, self._overall)
+
+    def choose_level(self, profile, pixel_counts, budget_seconds):
+        """
+        Pick the largest level predicted to render within budget_seconds
+
+        Returns:
+            (level index, predicted seconds or None when nothing is known yet)
+        """
+        cost = self.cost_per_megapixel(profile)
+        if cost is None:
+            # No history at all: render a middle level and learn from it
+            index = len(pixel_counts) // 2
+            return index, None
+
+        for index, pixels in enumerate(pixel_counts):
+            predicted = cost * pixels / 1e6
+            if predicted <= budget_seconds:
+                return index, predicted
+
+        last = len(pixel_counts) - 1
+        return last, cost * pixel_counts[last] / 1e6
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._cost)
+
+
+class render_timer:
+    """Time a render: feeds the 'render' stage and the tracker's cost average"""
+
+    __slots__ = ('tracker', 'profile', 'pixels', 'start')
+
+    def __init__(self, tracker, profile, pixels):
+        self.tracker = tracker
+        self.profile = profile
+        self.pixels = pixels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        metrics.record_stage('render', elapsed)
+        if exc_type is None:
+            self.tracker.record(self.profile, self.pixels, elapsed)
+        return False
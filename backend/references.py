@@ -0,0 +1,142 @@
+"""
+Import-by-reference for files on the local disk
+The desktop app runs the backend on the same machine, so local folders can
+be registered in place instead of being copied into the uploads folder.
+A referenced file gets the same <digest>.<ext> stored name as an upload, so
+every cache and derivative works unchanged; only reading the source goes to
+the original path.
+
+Each reference remembers size, mtime and content hash. A changed size or
+mtime triggers a re-hash, and a file whose content no longer matches its
+stored name is reported as stale instead of being read.
+"""
+import json
+import mmap
+import os
+import threading
+
+from storage import new_hasher, stored_name_for, CHUNK_SIZE
+
+REFERENCES_FILE = 'references.json'
+# Hash through the page cache in large slices; hashlib releases the GIL for these
+MMAP_SLICE = 16 * CHUNK_SIZE
+
+
+class StaleReference(Exception):
+    """A referenced file is missing or its content changed since import"""
+
+
+def hash_file(path):
+    """Content digest of path, read through mmap (no copies into Python buffers)"""
+    hasher = new_hasher()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return hasher.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, size, MMAP_SLICE):
+                    hasher.update(view[offset:offset + MMAP_SLICE])
+            finally:
+                view.release()
+    return hasher.hexdigest()
+
+
+def scan_folder(folder, accept, recursive=True):
+    """Absolute paths of accepted files under folder, sorted by name"""
+    found = []
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.')) if recursive else []
+        found.extend(os.path.join(root, name) for name in sorted(files)
+                     if not name.startswith('.') and accept(name))
+    return found
+
+
+class ReferenceRegistry:
+    """stored name -> referenced original, persisted as JSON"""
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self._entries = {}
+        self._by_path = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        with self._lock:
+            self._entries = entries
+            self._by_path = {entry['path']: name for name, entry in entries.items()}
+
+    def _save(self):
+        tmp_path = f'{self.index_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.index_path)
+
+    def save(self):
+        """Persist the index (once per import, after all its files are registered)"""
+        with self._lock:
+            self._save()
+
+    def register(self, path):
+        """
+        Hash path and record it in memory; save() persists the index
+
+        Returns:
+            (stored_name, digest)
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        digest = hash_file(path)
+        extension = path.rsplit('.', 1)[1] if '.' in os.path.basename(path) else ''
+        stored_name = stored_name_for(digest, extension)
+
+        with self._lock:
+            previous = self._entries.get(stored_name)
+            if previous is not None:
+                self._by_path.pop(previous['path'], None)
+            self._entries[stored_name] = {
+                'path': path,
+                'size': stat.st_size,
+                'mtimeNs': stat.st_mtime_ns,
+                'hash': digest
+            }
+            self._by_path[path] = stored_name
+        return stored_name, digest
+
+    def path_for(self, stored_name):
+        """
+        Verified original path of a referenced stored name, or None
+
+        Raises:
+            StaleReference: the file is gone or its content changed
+        """
+        with self._lock:
+            entry = self._entries.get(stored_name)
+        if entry is None:
+            return None
+
+        path = entry['path']
+        try:
+            stat = os.stat(path)
+        except OSError:
+            raise StaleReference(f'Referenced file is missing: {path}')
+
+        if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtimeNs']:
+            return path
+
+        # Touched on disk: only a content change invalidates the reference
+        if stat.st_size != entry['size'] or hash_file(path) != entry['hash']:
+            raise StaleReference(f'Referenced file changed since import: {path}')
+        with self._lock:
+            entry['mtimeNs'] = stat.st_mtime_ns
+            self._save()
+        return path
+
+    def stored_name_for_path(self, path):
+        with self._lock:
+            return self._by_path.get(path)
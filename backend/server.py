@@ -3,7 +3,7 @@ from flask_cors import CORS
 import os
 import io
 import base64
-from PIL import Image, ImageEnhance, ImageFilter
+from PIL import Image, ImageFilter
 import cv2
 import numpy as np
 import rawpy
@@ -12,9 +12,14 @@ from werkzeug.utils import secure_filename
 import json
 import xml.etree.ElementTree as ET
 import re
+import metrics
+from admission import AdmissionController, AdmissionRejected, estimate_bytes, rejected_response
+from local_masks import parse_masks, apply_local_adjustments
+from storage import save_content_addressed, register_project_file
 
 app = Flask(__name__)
 CORS(app)
+metrics.init_app(app)
 
 # Configuration
 UPLOAD_FOLDER = 'uploads'
@@ -31,6 +36,10 @@ app.config['PROCESSED_FOLDER'] = PROCESSED_FOLDER
 app.config['PRESETS_FOLDER'] = PRESETS_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max
 
+# Memory budget shared by concurrent renders
+admission = AdmissionController(int(os.environ.get('PHOTEXX_MEMORY_BUDGET_MB', '2048')) * 1024 * 1024)
+admission.register_metrics()
+
 # Store projects in memory (you can later move to database)
 projects = {}
 
@@ -203,35 +212,100 @@ def apply_adjustments(image, adjustments):
             img_array[:,:,0] = np.clip(img_array[:,:,0] * (1 - tint * 0.12), 0, 255)
             img_array[:,:,2] = np.clip(img_array[:,:,2] * (1 - tint * 0.12), 0, 255)
     
-    # Convert back to PIL Image for remaining adjustments
-    img = Image.fromarray(img_array.astype(np.uint8))
-    
-    # Contrast (LR: -100 to +100)
-    if 'contrast' in adjustments and adjustments['contrast'] != 0:
-        contrast_value = 1.0 + (adjustments['contrast'] / 100.0)
-        contrast_value = np.clip(contrast_value, 0.3, 3.0)
-        enhancer = ImageEnhance.Contrast(img)
-        img = enhancer.enhance(contrast_value)
-    
-    # Vibrance (LR: -100 to +100) - selective saturation boost
-    if 'vibrance' in adjustments and adjustments['vibrance'] != 0:
-        vibrance_value = 1.0 + (adjustments['vibrance'] / 150.0)  # More subtle
-        enhancer = ImageEnhance.Color(img)
-        img = enhancer.enhance(vibrance_value)
-    
-    # Saturation (LR: -100 to +100)
-    if 'saturation' in adjustments and adjustments['saturation'] != 0:
-        saturation_value = 1.0 + (adjustments['saturation'] / 100.0)
-        saturation_value = np.clip(saturation_value, 0, 3.0)
-        enhancer = ImageEnhance.Color(img)
-        img = enhancer.enhance(saturation_value)
-    
-    # Sharpness (LR: 0 to 150)
-    if 'sharpness' in adjustments and adjustments['sharpness'] != 0:
-        sharpness_value = adjustments['sharpness'] / 40.0
-        sharpness_value = np.clip(sharpness_value, 0, 4.0)
-        enhancer = ImageEnhance.Sharpness(img)
-        img = enhancer.enhance(sharpness_value)
+    # Local gradients/radials, normalized to this image
+    masks = parse_masks(adjustments)
+    if masks:
+        frame = np.diag([1.0 / img_array.shape[1], 1.0 / img_array.shape[0], 1.0])
+        img_array = apply_local_adjustments(img_array, masks, frame, 255.0)
+    
+    # Contrast, vibrance, saturation and sharpness in one pass on the array
+    return Image.fromarray(fused_enhance(img_array, adjustments))
+
+# PIL's ImageFilter.SMOOTH kernel (the Sharpness enhancer's degenerate image)
+SMOOTH_KERNEL = np.array([[1, 1, 1],
+                          [1, 5, 1],
+                          [1, 1, 1]], dtype=np.float32) / 13.0
+
+# PIL's L conversion: (R * 19595 + G * 38470 + B * 7471 + 0x8000) >> 16
+PIL_LUMA = np.array([[19595, 38470, 7471]], dtype=np.float32) / 65536.0
+
+_LEVELS = np.arange(256, dtype=np.float32)
+
+def pil_luma(rgb):
+    """uint8 L plane of a uint8 RGB array, as Image.convert('L') computes it"""
+    return cv2.transform(rgb, PIL_LUMA)
+
+def blend_table(alpha):
+    """
+    Image.blend(degenerate, image, alpha) for every (degenerate, image) level pair
+    
+    PIL computes degenerate + alpha * (image - degenerate) in float32 and
+    truncates to 0..255; the 64K-entry table reproduces that exactly.
+    """
+    alpha = np.float32(alpha)
+    blended = _LEVELS[:, None] + alpha * (_LEVELS[None, :] - _LEVELS[:, None])
+    return np.clip(blended, 0, 255).astype(np.uint8).ravel()
+
+def blend_levels(degenerate, img, alpha):
+    """Blend two uint8 arrays through blend_table"""
+    index = degenerate.astype(np.uint16)
+    index <<= 8
+    index |= img
+    return blend_table(alpha)[index]
+
+def fused_enhance(img_array, adjustments):
+    """
+    Contrast, vibrance, saturation and sharpness on uint8 data, returning uint8 RGB
+    
+    Reproduces the ImageEnhance Contrast/Color/Sharpness chain it replaces
+    (enhance_check.py compares the two) without PIL images: contrast is a
+    256-entry LUT around PIL's mean grey, saturation and sharpness are one
+    table lookup per pixel against the same degenerate images PIL uses.
+    Vibrance is selective (it boosts muted pixels more than already
+    saturated ones), so it is the one float blend.
+    """
+    contrast = adjustments.get('contrast', 0)
+    vibrance = adjustments.get('vibrance', 0)
+    saturation = adjustments.get('saturation', 0)
+    sharpness = adjustments.get('sharpness', 0)
+    
+    img = img_array.astype(np.uint8)
+    if not any([contrast, vibrance, saturation, sharpness]):
+        return img
+    
+    # Contrast (LR: -100 to +100): blend towards the mean grey level
+    if contrast != 0:
+        contrast_value = np.float32(np.clip(1.0 + contrast / 100.0, 0.3, 3.0))
+        histogram = cv2.calcHist([pil_luma(img)], [0], None, [256], [0, 256]).ravel()
+        mean = np.float32(int((histogram * _LEVELS).sum() / histogram.sum() + 0.5))
+        lut = np.clip(mean + contrast_value * (_LEVELS - mean), 0, 255).astype(np.uint8)
+        img = cv2.LUT(img, lut)
+    
+    # Vibrance + saturation (LR: -100 to +100): one blend towards luma
+    if vibrance != 0 or saturation != 0:
+        color_factor = float(np.clip(1.0 + saturation / 100.0, 0, 3.0))
+        luma = cv2.cvtColor(pil_luma(img), cv2.COLOR_GRAY2RGB)
+        if vibrance != 0:
+            # HSV saturation per pixel: 0 for greys, 1 for pure colours
+            pixel_sat = cv2.cvtColor(img, cv2.COLOR_RGB2HSV)[:, :, 1].astype(np.float32) / 255.0
+            factor = (1.0 - pixel_sat) * (color_factor * vibrance / 100.0) + color_factor
+            factor = cv2.merge([factor, factor, factor])
+            luma = luma.astype(np.float32)
+            blended = cv2.add(cv2.multiply(cv2.subtract(img.astype(np.float32), luma), factor), luma)
+            img = np.clip(blended, 0, 255).astype(np.uint8)
+        else:
+            img = blend_levels(luma, img, color_factor)
+    
+    # Sharpness (LR: 0 to 150): blend away from the SMOOTH-filtered image
+    if sharpness != 0:
+        sharpness_value = float(np.clip(sharpness / 40.0, 0, 4.0))
+        smooth = cv2.filter2D(img, -1, SMOOTH_KERNEL, borderType=cv2.BORDER_REPLICATE)
+        # PIL leaves the outermost pixels unfiltered
+        smooth[0, :] = img[0, :]
+        smooth[-1, :] = img[-1, :]
+        smooth[:, 0] = img[:, 0]
+        smooth[:, -1] = img[:, -1]
+        img = blend_levels(smooth, img, sharpness_value)
     
     return img
 
@@ -257,6 +331,14 @@ def create_project():
     
     return jsonify({'success': True, 'project': projects[project_id]})
 
+def source_dimensions(filepath):
+    """(width, height) of an original from its header (LibRaw sizes for RAWs)"""
+    if is_raw_file(filepath):
+        with rawpy.imread(filepath) as raw:
+            return raw.sizes.width, raw.sizes.height
+    with Image.open(filepath) as probe:
+        return probe.size
+
 @app.route('/upload', methods=['POST'])
 def upload_files():
     """Upload multiple files"""
@@ -270,25 +352,41 @@ def upload_files():
         return jsonify({'error': 'Project not found'}), 404
     
     uploaded_files = []
+    project = projects[project_id]
     
     for file in files:
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
+            original_name = secure_filename(file.filename)
+            
+            # Stored under its content hash; identical content is kept once
+            filename, digest, created = save_content_addressed(
+                file.stream, app.config['UPLOAD_FOLDER'], original_name.rsplit('.', 1)[1])
             filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
             
-            # Convert RAW to JPG for preview
+            display_name, is_new = register_project_file(project, original_name, filename)
+            if not is_new:
+                print(f"Already in project: {original_name}")
+                continue
+            
+            # Convert RAW to JPG for preview (once per content)
             try:
                 if is_raw_file(filename):
-                    rgb = convert_raw_to_rgb(filepath)
                     preview_path = os.path.join(app.config['PROCESSED_FOLDER'], f'preview_{filename}.jpg')
-                    imageio.imsave(preview_path, rgb)
+                    if not os.path.exists(preview_path):
+                        # The upload is already stored, so wait for memory instead of failing it
+                        width, height = source_dimensions(filepath)
+                        with admission.admit(estimate_bytes(width, height, ['decode_raw', 'encode']),
+                                             'upload_preview', block=True):
+                            rgb = convert_raw_to_rgb(filepath)
+                            imageio.imsave(preview_path, rgb)
                     preview_url = f'/preview/{os.path.basename(preview_path)}'
                 else:
                     preview_url = f'/preview/{filename}'
                 
                 file_info = {
                     'filename': filename,
+                    'originalName': display_name,
+                    'hash': digest,
                     'originalPath': filepath,
                     'previewUrl': preview_url,
                     'type': 'raw' if is_raw_file(filename) else 'jpg'
@@ -297,6 +395,8 @@ def upload_files():
                 projects[project_id]['images'].append(file_info)
                 uploaded_files.append(file_info)
             except Exception as e:
+                # Unmapped again, so a retried upload of the same file isn't taken for a duplicate
+                project['files'].pop(display_name, None)
                 print(f"Error processing {filename}: {str(e)}")
                 continue
     
@@ -337,43 +437,56 @@ def process_image():
     try:
         # Check if we have cached RAW data
         cache_key = filename
+        metrics.record_cache('raw', cache_key in raw_cache)
         
         if cache_key in raw_cache:
             # Use cached image
             image = raw_cache[cache_key].copy()
             print(f"Using cached image for {filename}")
         else:
-            # Load image (first time)
-            if is_raw_file(filename):
-                image_array = convert_raw_to_rgb(original_path)
-                image = Image.fromarray(image_array.astype('uint8'))
-                # Cache the original for faster subsequent adjustments
-                raw_cache[cache_key] = image.copy()
-                print(f"Cached RAW image: {filename}")
-            else:
-                image = Image.open(original_path)
-                raw_cache[cache_key] = image.copy()
+            # Load image (first time), reserving the full-size decode up front
+            width, height = source_dimensions(original_path)
+            stage = 'decode_raw' if is_raw_file(filename) else 'decode'
+            with admission.admit(estimate_bytes(width, height, [stage]), 'decode'):
+                with metrics.stage('decode'):
+                    if is_raw_file(filename):
+                        image_array = convert_raw_to_rgb(original_path)
+                        image = Image.fromarray(image_array.astype('uint8'))
+                        # Cache the original for faster subsequent adjustments
+                        raw_cache[cache_key] = image.copy()
+                        print(f"Cached RAW image: {filename}")
+                    else:
+                        image = Image.open(original_path)
+                        raw_cache[cache_key] = image.copy()
         
         # Resize for faster processing (max 1920px width)
         max_width = 1920
         if image.width > max_width:
-            ratio = max_width / image.width
-            new_size = (max_width, int(image.height * ratio))
-            image = image.resize(new_size, Image.Resampling.LANCZOS)
+            with metrics.stage('resize'):
+                ratio = max_width / image.width
+                new_size = (max_width, int(image.height * ratio))
+                image = image.resize(new_size, Image.Resampling.LANCZOS)
             print(f"Resized to {new_size} for faster processing")
         
-        # Apply adjustments
-        processed = apply_adjustments(image, adjustments)
-        
-        # Convert to base64 for transmission
-        buffered = io.BytesIO()
-        processed.save(buffered, format="JPEG", quality=85, optimize=True)
-        img_str = base64.b64encode(buffered.getvalue()).decode()
+        with admission.admit(estimate_bytes(image.width, image.height, ['render', 'encode']), 'process'):
+            # Apply adjustments
+            with metrics.stage('adjust'):
+                processed = apply_adjustments(image, adjustments)
+            
+            # Convert to base64 for transmission
+            with metrics.stage('encode'):
+                buffered = io.BytesIO()
+                processed.save(buffered, format="JPEG", quality=85, optimize=True)
+        with metrics.stage('base64'):
+            img_str = base64.b64encode(buffered.getvalue()).decode()
         
         return jsonify({
             'success': True,
             'image': f'data:image/jpeg;base64,{img_str}'
         })
+    except AdmissionRejected as e:
+        print(f"Process rejected: {str(e)}")
+        return rejected_response(e)
     except Exception as e:
         print(f"Error processing image: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -412,21 +525,30 @@ def apply_preset():
         if not os.path.exists(file_path):
             return jsonify({'error': 'File not found'}), 404
         
-        # Load image
-        if is_raw_file(filename):
-            image = convert_raw_to_rgb(file_path)
-            img = Image.fromarray(image.astype('uint8'))
-        else:
-            img = Image.open(file_path)
-        
-        # Apply preset adjustments
-        adjustments = presets[preset_name]
-        img = apply_adjustments(img, adjustments)
+        # Full-resolution decode + render, reserved up front from the header size
+        width, height = source_dimensions(file_path)
+        stages = ['decode_raw' if is_raw_file(filename) else 'decode', 'render', 'encode']
         
-        # Convert to base64
-        buffered = io.BytesIO()
-        img.save(buffered, format="JPEG", quality=90)
-        img_str = base64.b64encode(buffered.getvalue()).decode()
+        with admission.admit(estimate_bytes(width, height, stages), 'preset'):
+            # Load image
+            with metrics.stage('decode'):
+                if is_raw_file(filename):
+                    image = convert_raw_to_rgb(file_path)
+                    img = Image.fromarray(image.astype('uint8'))
+                else:
+                    img = Image.open(file_path)
+            
+            # Apply preset adjustments
+            adjustments = presets[preset_name]
+            with metrics.stage('adjust'):
+                img = apply_adjustments(img, adjustments)
+            
+            # Convert to base64
+            with metrics.stage('encode'):
+                buffered = io.BytesIO()
+                img.save(buffered, format="JPEG", quality=90)
+        with metrics.stage('base64'):
+            img_str = base64.b64encode(buffered.getvalue()).decode()
         
         return jsonify({
             'success': True,
@@ -435,6 +557,9 @@ def apply_preset():
             'adjustments': adjustments
         })
         
+    except AdmissionRejected as e:
+        print(f"Preset rejected: {str(e)}")
+        return rejected_response(e)
     except Exception as e:
         print(f"Error applying preset: {str(e)}")
         return jsonify({'error': str(e)}), 500
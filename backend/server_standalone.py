@@ -2,30 +2,58 @@
 Standalone version of Flask server for PyInstaller packaging
 This version is optimized to run as a bundled executable
 """
+import time
+
+# Reference point for startup timing, taken before any other import
+PROCESS_START = time.perf_counter()
+
 from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
 import os
 import io
 import base64
 from PIL import Image, ImageEnhance, ImageFilter, ImageOps
-import cv2
-import numpy as np
-import rawpy
-import imageio
 from werkzeug.utils import secure_filename
 import json
 import xml.etree.ElementTree as ET
 import re
 import sys
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+import metrics
+import profiling
+from admission import (AdmissionController, AdmissionRejected, estimate_bytes, rejected_response,
+                       current_rss_bytes, peak_rss_bytes)
+from analysis import AnalysisJob, score_image, filter_and_sort
+from derived_planes import DerivedPlanes, hue_mask, tone_mask
+from exporter import (ExportJob, EXPORT_SIZES, EXPORT_QUALITIES, output_names, render_export,
+                      export_to_folder, stream_zip)
+from geometry import parse_geometry, apply_geometry, without_geometry, frame_transform
+from histogram import compute_histogram
+from image_cache import ImageCache
+from local_masks import parse_masks, apply_local_adjustments
+from lazy_imports import lazy_import, preload
+from pyramid import Pyramid, LatencyTracker, adjustment_profile, render_timer
+from smart_preview import smart_preview_path, ensure_smart_preview, open_smart_preview, decode_scaled
+from references import ReferenceRegistry, StaleReference, scan_folder
+from sidecars import SidecarStore, SIDECAR_DIR
+from storage import save_content_addressed, register_project_file
+from metadata import MetadataIndex, read_metadata, SORT_KEYS as METADATA_SORT_KEYS
+from phash import HashStore, hash_thumbnail, group_similar, DEFAULT_THRESHOLD
+from processors import ProcessorRegistry, INTENTS
+from profiling import PROFILE_DIR, profile_file
+from prefetch import Prefetcher, neighbor_indices, wait_idle
+from preset_previews import build_preset_strip, PRESET_STRIP_DIR
+from thumbnails import thumbnail_path, ensure_thumbnail, generate_thumbnails, build_atlas, ATLAS_DIR
+from tiles import (AdjustmentRegistry, oriented_size, tile_grid, level_size, tile_box, render_tile,
+                   TILE_SIZE, TILE_QUALITY, TILE_MARGIN)
 
-# Try to import darktable processor
-try:
-    from darktable_processor import check_darktable, process_with_darktable, get_darktable_version
-    DARKTABLE_AVAILABLE = check_darktable()
-except ImportError:
-    DARKTABLE_AVAILABLE = False
-    logger.warning("Darktable processor module not available")
+# Heavy native modules are imported on first use
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+rawpy = lazy_import('rawpy')
+imageio = lazy_import('imageio')
 
 # Configure logging for standalone mode
 logging.basicConfig(
@@ -34,8 +62,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Try to import darktable processor; availability is probed in the background
+try:
+    from darktable_processor import check_darktable, process_with_darktable, get_darktable_version
+    DARKTABLE_MODULE = True
+except ImportError:
+    DARKTABLE_MODULE = False
+    logger.warning("Darktable processor module not available")
+
+DARKTABLE_AVAILABLE = False
+DARKTABLE_VERSION = None
+DARKTABLE_PROBED = threading.Event()
+
+# Startup milestones (seconds since PROCESS_START)
+startup_times = {'listening': None, 'first_health': None, 'warm': None}
+
 app = Flask(__name__)
 CORS(app)
+metrics.init_app(app)
 
 # Get base path for PyInstaller
 def get_base_path():
@@ -55,21 +99,90 @@ PROCESSED_FOLDER = os.path.join(os.path.expanduser('~'), '.photexx', 'processed'
 PRESETS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'presets')
 ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'raw', 'cr2', 'nef', 'arw', 'dng', 'orf'}
 
-# Create directories
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(PROCESSED_FOLDER, exist_ok=True)
-os.makedirs(PRESETS_FOLDER, exist_ok=True)
+REFERENCES_INDEX = os.path.join(os.path.expanduser('~'), '.photexx', 'references.json')
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['PROCESSED_FOLDER'] = PROCESSED_FOLDER
 app.config['PRESETS_FOLDER'] = PRESETS_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max
+# Target render time for interactive (slider drag) previews
+app.config['PREVIEW_LATENCY_BUDGET_MS'] = float(os.environ.get('PHOTEXX_LATENCY_BUDGET_MS', '60'))
+# Opt-in per-request profiling (header X-Photexx-Profile or ?profile=cprofile|sample)
+app.config['PROFILING_ENABLED'] = os.environ.get('PHOTEXX_PROFILING', '0') == '1'
+app.config['PROFILE_INTERVAL_MS'] = float(os.environ.get('PHOTEXX_PROFILE_INTERVAL_MS', '5'))
+profiling.init_app(app, os.path.join(PROCESSED_FOLDER, PROFILE_DIR), {'adjust_image', 'apply_preset'})
 
 # Store projects in memory
 projects = {}
 
-# Cache for processed RAW files
-raw_cache = {}
+# Working-resolution images for editing, bounded by PHOTEXX_CACHE_MB
+PREVIEW_MAX_WIDTH = 1920
+CACHE_BUDGET_BYTES = int(os.environ.get('PHOTEXX_CACHE_MB', '1024')) * 1024 * 1024
+image_cache = ImageCache('image', CACHE_BUDGET_BYTES)
+
+# Encoded full-size renders of each image's last settled adjustments
+RENDER_CACHE_BYTES = int(os.environ.get('PHOTEXX_RENDER_CACHE_MB', '64')) * 1024 * 1024
+render_cache = ImageCache('renders', RENDER_CACHE_BYTES)
+
+# Saved adjustments per image; the most recently edited are warmed on startup
+sidecar_store = SidecarStore(os.path.join(PROCESSED_FOLDER, SIDECAR_DIR))
+WARMUP_IMAGES = int(os.environ.get('PHOTEXX_WARMUP_IMAGES', '16'))
+# Warmup gives up when the foreground stays busy this long before an image
+WARMUP_IDLE_WAIT = 10.0
+# HSV planes, hue bands and blurred masks per (source, exposure, white balance)
+PLANE_CACHE_BYTES = int(os.environ.get('PHOTEXX_PLANE_CACHE_MB', '384')) * 1024 * 1024
+plane_cache = ImageCache('planes', PLANE_CACHE_BYTES)
+# Recent render cost per adjustment profile, drives interactive level choice
+latency_tracker = LatencyTracker()
+
+# Global memory budget for concurrent decodes and renders
+MEMORY_BUDGET_BYTES = int(os.environ.get('PHOTEXX_MEMORY_BUDGET_MB', '2048')) * 1024 * 1024
+admission = AdmissionController(
+    MEMORY_BUDGET_BYTES,
+    max_queue=int(os.environ.get('PHOTEXX_ADMISSION_QUEUE', '8'))
+)
+admission.register_metrics()
+
+# Rendered deep-zoom tiles (encoded JPEG bytes) and the adjustment sets they refer to
+TILE_CACHE_BYTES = int(os.environ.get('PHOTEXX_TILE_CACHE_MB', '256')) * 1024 * 1024
+tile_cache = ImageCache('tiles', TILE_CACHE_BYTES)
+adjustment_registry = AdjustmentRegistry()
+tile_geometry = {}
+tile_level_locks = {}
+tile_level_locks_guard = threading.Lock()
+
+# Full-resolution export encoders; each worker holds at most one image
+EXPORT_WORKERS = int(os.environ.get('PHOTEXX_EXPORT_WORKERS', str(os.cpu_count() or 4)))
+export_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix='export')
+
+# Local files imported in place (stored name -> original path)
+reference_registry = ReferenceRegistry(REFERENCES_INDEX)
+
+# Culling scores: one background job per project on its own pool
+analysis_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix='analysis')
+analysis_jobs = {}
+
+# Render engines: darktable-cli for RAWs when installed, the built-in processor always
+processor_registry = ProcessorRegistry(os.environ.get('PHOTEXX_PROCESSOR_POLICY', 'auto'))
+processor_registry.register('darktable', quality=2, expected_seconds=8.0,
+                            available=lambda: DARKTABLE_AVAILABLE, accepts=lambda name: is_raw_file(name))
+processor_registry.register('custom', quality=1, expected_seconds=1.0)
+
+# Perceptual hashes of every ingested image (stored name -> dHash)
+hash_store = HashStore()
+
+# Capture metadata (EXIF) of every ingested image, read from the headers only
+metadata_index = MetadataIndex()
+metadata_executor = ThreadPoolExecutor(max_workers=min(8, 2 * (os.cpu_count() or 2)),
+                                       thread_name_prefix='metadata')
+
+# Parsed XMP presets: path -> (mtime, adjustments)
+preset_cache = {}
+
+# Background work at ingest (thumbnails, smart previews)
+ingest_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='ingest')
+# Parallel thumbnail generation for project grids
+thumbnail_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix='thumbs')
 
 def parse_xmp_preset(xmp_path):
     """Parse XMP file and extract Lightroom adjustments - keep original LR values"""
@@ -156,6 +269,76 @@ def parse_xmp_preset(xmp_path):
         logger.error(f"Error parsing XMP: {str(e)}")
         return {}
 
+def load_preset(preset_path):
+    """Parsed preset adjustments, re-parsed only when the XMP file changes"""
+    mtime = os.path.getmtime(preset_path)
+    cached = preset_cache.get(preset_path)
+    if cached is not None and cached[0] == mtime:
+        return dict(cached[1])
+    
+    adjustments = parse_xmp_preset(preset_path)
+    preset_cache[preset_path] = (mtime, adjustments)
+    return dict(adjustments)
+
+def list_preset_files():
+    """Sorted XMP preset file names"""
+    if not os.path.exists(app.config['PRESETS_FOLDER']):
+        return []
+    return sorted(file for file in os.listdir(app.config['PRESETS_FOLDER']) if file.endswith('.xmp'))
+
+def ensure_folders():
+    """Create the upload, processed and presets folders"""
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    os.makedirs(PROCESSED_FOLDER, exist_ok=True)
+    os.makedirs(PRESETS_FOLDER, exist_ok=True)
+
+def probe_darktable():
+    """Check for darktable-cli and cache its version (runs in the background)"""
+    global DARKTABLE_AVAILABLE, DARKTABLE_VERSION
+    try:
+        if DARKTABLE_MODULE and check_darktable():
+            DARKTABLE_VERSION = get_darktable_version()
+            DARKTABLE_AVAILABLE = True
+            logger.info(f"Darktable available: {DARKTABLE_VERSION}")
+    except Exception as e:
+        logger.warning(f"Darktable probe failed: {str(e)}")
+    finally:
+        DARKTABLE_PROBED.set()
+
+def warm_imports():
+    """Import the heavy modules after the server is listening"""
+    try:
+        with metrics.stage('warm_imports'):
+            preload(np, cv2, rawpy, imageio)
+        startup_times['warm'] = time.perf_counter() - PROCESS_START
+        metrics.set_gauge('photexx_startup_warm_seconds', round(startup_times['warm'], 4),
+                          'Seconds from process start until heavy imports finished')
+        logger.info(f"Heavy modules loaded in background ({startup_times['warm']:.2f}s since start)")
+    except Exception as e:
+        logger.error(f"Background import failed: {str(e)}")
+
+def histogram_payload(img, data):
+    """Histogram/clipping data for a render when the request asked for it"""
+    if not data.get('histogram'):
+        return None
+    with metrics.stage('histogram'):
+        return compute_histogram(img, overlay=bool(data.get('clippingOverlay')))
+
+def encode_jpeg(img, quality):
+    """JPEG bytes of a rendered image"""
+    with metrics.stage('encode'):
+        output = io.BytesIO()
+        if img.mode == 'RGBA':
+            img = img.convert('RGB')
+        img.save(output, format='JPEG', quality=quality)
+        return output.getvalue()
+
+def start_background_tasks():
+    """Run startup work that must not delay the first response"""
+    threading.Thread(target=probe_darktable, name='darktable-probe', daemon=True).start()
+    threading.Thread(target=warm_imports, name='warm-imports', daemon=True).start()
+    threading.Thread(target=warm_recent_edits, name='warm-edits', daemon=True).start()
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -163,48 +346,270 @@ def is_raw_file(filename):
     ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
     return ext in {'cr2', 'nef', 'arw', 'dng', 'orf', 'raw'}
 
-def load_image(filepath):
-    """Load image - handle RAW files with caching"""
+def resize_to_width(img, max_width):
+    """Downscale img to max_width if it is wider"""
+    if img.width <= max_width:
+        return img
+    with metrics.stage('resize'):
+        ratio = max_width / img.width
+        new_height = int(img.height * ratio)
+        return img.resize((max_width, new_height), Image.Resampling.LANCZOS)
+
+def source_path(filename):
+    """Path to read a stored image from: the uploads folder, or its referenced original"""
+    upload_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if os.path.exists(upload_path):
+        return upload_path
+    return reference_registry.path_for(filename) or upload_path
+
+def stored_name(filepath):
+    """Stored name (<digest>.<ext>) of a source path"""
+    return reference_registry.stored_name_for_path(filepath) or os.path.basename(filepath)
+
+def index_metadata(filepath):
+    """Read an image's EXIF header into metadata_index (runs on the metadata pool)"""
+    filename = stored_name(filepath)
+    if filename in metadata_index:
+        return
     try:
-        if is_raw_file(filepath):
-            if filepath in raw_cache:
-                logger.info(f"Using cached RAW image: {filepath}")
-                return raw_cache[filepath]
-            
-            logger.info(f"Loading RAW file: {filepath}")
-            with rawpy.imread(filepath) as raw:
-                rgb = raw.postprocess(
-                    use_camera_wb=True,
-                    half_size=False,
-                    no_auto_bright=True,
-                    output_bps=8
-                )
-            
-            img = Image.fromarray(rgb)
-            img = ImageOps.exif_transpose(img)
-            
-            max_width = 1920
-            if img.width > max_width:
-                ratio = max_width / img.width
-                new_height = int(img.height * ratio)
-                img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-            
-            raw_cache[filepath] = img
-            logger.info(f"RAW file loaded and cached: {img.size}")
-            return img
-        else:
-            img = Image.open(filepath)
-            img = ImageOps.exif_transpose(img)
-            return img
+        metadata_index.add(filename, read_metadata(filepath, is_raw_file(filename)))
+    except Exception as e:
+        logger.error(f"Metadata read failed for {os.path.basename(filepath)}: {str(e)}")
+
+def image_orientation(filepath):
+    """Indexed EXIF orientation of a source file (None if not indexed yet)"""
+    return metadata_index.orientation(stored_name(filepath))
+
+def decode_source(filepath, is_raw, min_size):
+    """decode_scaled with the indexed orientation"""
+    return decode_scaled(filepath, is_raw, min_size, image_orientation(filepath))
+
+def probe_dimensions(filepath):
+    """Image size from the file header, without decoding pixels"""
+    size = metadata_index.size(stored_name(filepath))
+    if size is not None:
+        return size
+    if is_raw_file(filepath):
+        with rawpy.imread(filepath) as raw:
+            return raw.sizes.width, raw.sizes.height
+    with Image.open(filepath) as img:
+        return img.size
+
+def get_smart_preview(filepath, block=False):
+    """Path to the smart preview of an uploaded file, building it if missing"""
+    filename = stored_name(filepath)
+    preview_path = smart_preview_path(app.config['PROCESSED_FOLDER'], filename)
+    if os.path.exists(preview_path):
+        return preview_path
+    
+    # Building decodes the original, so it needs a memory reservation
+    width, height = probe_dimensions(filepath)
+    stage = 'decode_raw' if is_raw_file(filename) else 'decode'
+    with admission.admit(estimate_bytes(width, height, [stage]), 'smart_preview', block=block):
+        return ensure_smart_preview(filepath, preview_path, is_raw_file(filename), image_orientation(filepath))
+
+def get_thumbnail(filepath):
+    """Path to the thumbnail of an uploaded file, building it if missing"""
+    filename = stored_name(filepath)
+    thumb_path = thumbnail_path(app.config['PROCESSED_FOLDER'], filename)
+    return ensure_thumbnail(filepath, thumb_path, is_raw_file(filename), image_orientation(filepath))
+
+def index_perceptual_hash(filepath):
+    """dHash of an image from its thumbnail, stored in hash_store"""
+    filename = stored_name(filepath)
+    if filename not in hash_store:
+        hash_store.add(filename, hash_thumbnail(get_thumbnail(filepath)))
+
+def ingest_derivatives(filepath):
+    """Build the thumbnail, perceptual hash and smart preview of a newly ingested file"""
+    try:
+        get_thumbnail(filepath)
+        index_perceptual_hash(filepath)
+        get_smart_preview(filepath, block=True)
+    except Exception as e:
+        logger.error(f"Ingest failed for {os.path.basename(filepath)}: {str(e)}")
+
+def load_pyramid(filepath):
+    """Load the editing pyramid - rendered from the smart preview, with caching"""
+    try:
+        cache_key = ('pyramid', filepath)
+        pyramid = image_cache.get(cache_key)
+        if pyramid is not None:
+            return pyramid
+        
+        img = open_smart_preview(get_smart_preview(filepath))
+        img = resize_to_width(img, PREVIEW_MAX_WIDTH)
+        with metrics.stage('pyramid'):
+            pyramid = Pyramid(img)
+        
+        image_cache.put(cache_key, pyramid)
+        logger.info(f"Editing pyramid loaded and cached: {os.path.basename(filepath)} {img.size}, {len(pyramid.levels)} levels")
+        return pyramid
             
     except Exception as e:
         logger.error(f"Error loading image: {str(e)}")
         raise
 
-def apply_adjustments(img, adjustments):
-    """Apply Lightroom-style adjustments to image with full HSL support"""
+def load_image(filepath):
+    """Load the full-size editing image (base of the pyramid)"""
+    return load_pyramid(filepath).base
+
+# Neighbors' pyramids load in the background while the user looks at an image
+prefetcher = Prefetcher(
+    load_pyramid,
+    image_cache,
+    idle=lambda: admission.in_use == 0,
+    # 1920x1440 RGB base plus its smaller levels
+    entry_bytes=PREVIEW_MAX_WIDTH * 1440 * 3 * 2
+)
+prefetcher.register_metrics()
+
+def prefetch_neighbors(project_id, filename):
+    """Schedule N±1, N±2 of the opened image in the project's order"""
+    project = projects.get(project_id)
+    if project is None:
+        return
+    names = [image['filename'] for image in project['images']]
+    if filename not in names:
+        return
+    
+    jobs = []
+    for index in neighbor_indices(names.index(filename), len(names)):
+        try:
+            filepath = source_path(names[index])
+        except StaleReference:
+            continue
+        jobs.append((('pyramid', filepath), filepath))
+    prefetcher.schedule(jobs)
+
+def warm_edited_image(filepath, record):
+    """Load an edited image's pyramid and cache the full-size render of its saved adjustments"""
+    pyramid = load_pyramid(filepath)
+    cache_key = ('render', filepath, record['hash'])
+    if cache_key in render_cache:
+        return
+    img = pyramid.base
+    with admission.admit(estimate_bytes(img.width, img.height, ['render', 'encode']), 'warmup', block=True):
+        img = apply_adjustments(img, record['adjustments'], ('level', filepath, 0))
+        render_cache.put(cache_key, (encode_jpeg(img, 95), img.width, img.height))
+
+def warm_recent_edits():
+    """
+    Warm the caches for the most recently edited images (runs in the background)
+    
+    Images go most recent first and stop at WARMUP_IMAGES, or earlier once
+    another pyramid would no longer fit the cache budget without evicting,
+    or when foreground work keeps memory busy for WARMUP_IDLE_WAIT.
+    """
+    warmed = 0
+    start = time.perf_counter()
+    for name in sidecar_store.recent()[:WARMUP_IMAGES]:
+        if not image_cache.has_room(prefetcher.entry_bytes):
+            break
+        # Foreground requests go first
+        if not wait_idle(prefetcher.idle, WARMUP_IDLE_WAIT):
+            logger.info(f"Warmup stopped after {warmed} images: foreground busy for {WARMUP_IDLE_WAIT:.0f}s")
+            break
+        try:
+            filepath = source_path(name)
+            if not os.path.exists(filepath):
+                continue
+            with metrics.stage('warmup'):
+                warm_edited_image(filepath, sidecar_store.get(name))
+            warmed += 1
+        except Exception as e:
+            logger.warning(f"Warmup skipped {name}: {str(e)}")
+    if warmed:
+        logger.info(f"Warmed {warmed} recently edited images in {time.perf_counter() - start:.2f}s")
+
+def load_original(filepath):
+    """Decode the original at full resolution (exports, 1:1 tiles), with caching"""
+    cache_key = ('original', filepath)
+    img = image_cache.get(cache_key)
+    if img is not None:
+        return img
+    
+    width, height = probe_dimensions(filepath)
+    stage = 'decode_raw' if is_raw_file(filepath) else 'decode'
+    with admission.admit(estimate_bytes(width, height, [stage]), 'original'):
+        with metrics.stage('decode_original'):
+            img = decode_source(filepath, is_raw_file(filepath), None)
+    
+    image_cache.put(cache_key, img)
+    logger.info(f"Original decoded and cached: {os.path.basename(filepath)} {img.size}")
+    return img
+
+def get_tile_geometry(filepath):
+    """Full-resolution size and level layout of an image's tile pyramid"""
+    geometry = tile_geometry.get(filepath)
+    if geometry is None:
+        filename = stored_name(filepath)
+        width, height = oriented_size(filepath, is_raw_file(filepath),
+                                      metadata_index.size(filename), metadata_index.orientation(filename))
+        geometry = {'width': width, 'height': height, 'levels': tile_grid(width, height)}
+        tile_geometry[filepath] = geometry
+    return geometry
+
+def load_tile_level(filepath, level):
+    """
+    Flat (unadjusted) image of one tile level
+    
+    Levels the smart preview is large enough for are resampled from it;
+    only the levels above that decode the original.
+    """
+    cache_key = ('tile_level', filepath, level)
+    img = image_cache.get(cache_key)
+    if img is not None:
+        return img
+    
+    with tile_level_locks_guard:
+        lock = tile_level_locks.setdefault(cache_key, threading.Lock())
+    with lock:
+        img = image_cache.peek(cache_key)
+        if img is None:
+            geometry = get_tile_geometry(filepath)
+            size = level_size(geometry['width'], geometry['height'], level)
+            
+            preview_path = get_smart_preview(filepath)
+            with Image.open(preview_path) as proxy:
+                proxy_size = proxy.size
+            
+            if level > 0 and max(proxy_size) >= max(size):
+                source = open_smart_preview(preview_path)
+            else:
+                source = load_original(filepath)
+            
+            img = source
+            if source.size != size:
+                with metrics.stage('resize'):
+                    img = source.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+            image_cache.put(cache_key, img)
+    with tile_level_locks_guard:
+        tile_level_locks.pop(cache_key, None)
+    return img
+
+def apply_adjustments(img, adjustments, source_key=None, frame=None):
+    """
+    Apply Lightroom-style adjustments to image with full HSL support
+    
+    source_key identifies img's pixels (e.g. a pyramid level); when given,
+    the planes derived before the first slider-dependent step are reused
+    from plane_cache.
+    
+    Crop/straighten/rotate run first, so every later stage only sees the
+    pixels that survive the crop. Local masks are evaluated through frame, a
+    3x3 map from img's (post-geometry) coordinates to the normalized output
+    frame; by default img is the whole frame.
+    """
     try:
-        img_array = np.array(img).astype(np.float32) / 255.0
+        geometry = parse_geometry(adjustments, img.width, img.height)
+        if geometry is not None:
+            with metrics.stage('geometry'):
+                img = apply_geometry(img, geometry)
+            if source_key is not None:
+                source_key = (source_key, geometry)
+        if frame is None:
+            frame = frame_transform(None, img.width, img.height)
         
         # Basic parameters
         exposure = adjustments.get('exposure', 0) / 5.0
@@ -223,48 +628,62 @@ def apply_adjustments(img, adjustments):
         whites = adjustments.get('whites', 0) / 100.0
         blacks = adjustments.get('blacks', 0) / 100.0
         
-        # Apply exposure
-        if exposure != 0:
-            img_array = np.clip(img_array * (2.0 ** exposure), 0, 1)
-        
-        # Apply temperature
-        if temperature != 0:
-            temp_factor = temperature / 100.0
-            img_array[:, :, 0] = np.clip(img_array[:, :, 0] * (1 + temp_factor * 0.3), 0, 1)
-            img_array[:, :, 2] = np.clip(img_array[:, :, 2] * (1 - temp_factor * 0.3), 0, 1)
-        
-        # Apply tint
-        if tint != 0:
-            tint_factor = tint / 100.0
-            img_array[:, :, 1] = np.clip(img_array[:, :, 1] * (1 + tint_factor * 0.2), 0, 1)
-        
-        # Convert to HSV for tone/color adjustments
-        img_uint8 = (img_array * 255).astype(np.uint8)
-        img_hsv = cv2.cvtColor(img_uint8, cv2.COLOR_RGB2HSV).astype(np.float32)
-        h, s, v = cv2.split(img_hsv)
-        
-        # Tone adjustments
-        if shadows != 0:
-            shadow_mask = (v < 85).astype(np.float32)
-            shadow_mask = cv2.GaussianBlur(shadow_mask, (21, 21), 0)
-            v = v + (shadows * 50 * shadow_mask)
-        
-        if highlights != 0:
-            highlight_mask = (v > 170).astype(np.float32)
-            highlight_mask = cv2.GaussianBlur(highlight_mask, (21, 21), 0)
-            v = v + (highlights * 50 * highlight_mask)
-        
-        if whites != 0:
-            white_mask = (v > 200).astype(np.float32)
-            white_mask = cv2.GaussianBlur(white_mask, (15, 15), 0)
-            v = v + (whites * 30 * white_mask)
-        
-        if blacks != 0:
-            black_mask = (v < 55).astype(np.float32)
-            black_mask = cv2.GaussianBlur(black_mask, (15, 15), 0)
-            v = v + (blacks * 30 * black_mask)
-        
-        v = np.clip(v, 0, 255)
+        # Everything up to the HSV planes depends only on the source and exposure/white balance
+        planes_key = None if source_key is None else (source_key, exposure, temperature, tint)
+        planes = plane_cache.get(planes_key) if planes_key is not None else None
+        
+        if planes is None:
+            with metrics.stage('to_float'):
+                img_array = np.array(img).astype(np.float32) / 255.0
+            
+            # Apply exposure
+            if exposure != 0:
+                with metrics.stage('exposure'):
+                    img_array = np.clip(img_array * (2.0 ** exposure), 0, 1)
+            
+            # Apply temperature
+            if temperature != 0:
+                with metrics.stage('temperature'):
+                    temp_factor = temperature / 100.0
+                    img_array[:, :, 0] = np.clip(img_array[:, :, 0] * (1 + temp_factor * 0.3), 0, 1)
+                    img_array[:, :, 2] = np.clip(img_array[:, :, 2] * (1 - temp_factor * 0.3), 0, 1)
+            
+            # Apply tint
+            if tint != 0:
+                with metrics.stage('tint'):
+                    tint_factor = tint / 100.0
+                    img_array[:, :, 1] = np.clip(img_array[:, :, 1] * (1 + tint_factor * 0.2), 0, 1)
+            
+            # Convert to HSV for tone/color adjustments
+            with metrics.stage('to_hsv'):
+                img_uint8 = (img_array * 255).astype(np.uint8)
+                planes = DerivedPlanes(cv2.cvtColor(img_uint8, cv2.COLOR_RGB2HSV))
+            if planes_key is not None:
+                plane_cache.put(planes_key, planes)
+        
+        h, s, v = planes.float_planes()
+        base_h, base_v = h, v
+        
+        # Tone adjustments (cached masks are valid while v is still the untouched plane)
+        with metrics.stage('tone'):
+            if shadows != 0:
+                shadow_mask = planes.tone_mask('shadows') if v is base_v else tone_mask(v, 'shadows')
+                v = v + (shadows * 50 * shadow_mask)
+            
+            if highlights != 0:
+                highlight_mask = planes.tone_mask('highlights') if v is base_v else tone_mask(v, 'highlights')
+                v = v + (highlights * 50 * highlight_mask)
+            
+            if whites != 0:
+                white_mask = planes.tone_mask('whites') if v is base_v else tone_mask(v, 'whites')
+                v = v + (whites * 30 * white_mask)
+            
+            if blacks != 0:
+                black_mask = planes.tone_mask('blacks') if v is base_v else tone_mask(v, 'blacks')
+                v = v + (blacks * 30 * black_mask)
+            
+            if v is not base_v:
+                v = np.clip(v, 0, 255)
         
         # HSL Color Adjustments - Apply to specific hue ranges
         # Red: 0-10, 350-360 (wrap around)
@@ -287,80 +706,73 @@ def apply_adjustments(img, adjustments):
             'magenta': (adjustments.get('hue_magenta', 0), adjustments.get('sat_magenta', 0), adjustments.get('lum_magenta', 0)),
         }
         
-        color_ranges = {
-            'red': [(0, 10), (170, 180)],  # HSV hue 0-10, 170-180 (wraps)
-            'orange': [(11, 20)],
-            'yellow': [(21, 35)],
-            'green': [(36, 85)],
-            'aqua': [(86, 110)],
-            'blue': [(111, 140)],
-            'purple': [(141, 155)],
-            'magenta': [(156, 169)],
-        }
-        
-        for color_name, (hue_shift, sat_shift, lum_shift) in hsl_adjustments.items():
-            if hue_shift == 0 and sat_shift == 0 and lum_shift == 0:
-                continue
-            
-            ranges = color_ranges[color_name]
-            mask = np.zeros_like(h, dtype=np.float32)
-            
-            for hue_min, hue_max in ranges:
-                mask_range = ((h >= hue_min) & (h <= hue_max)).astype(np.float32)
-                mask = np.maximum(mask, mask_range)
-            
-            # Apply adjustments MUCH more gently (Lightroom uses subtle changes)
-            if hue_shift != 0:
-                h = np.where(mask > 0, h + (hue_shift * mask * 0.1), h)  # Reduced from 0.5 to 0.1
-                h = np.clip(h, 0, 180)
-            
-            if sat_shift != 0:
-                s = np.where(mask > 0, s * (1 + sat_shift / 100.0 * mask * 0.3), s)  # Added 0.3 factor
-                s = np.clip(s, 0, 255)
-            
-            if lum_shift != 0:
-                v = np.where(mask > 0, v + (lum_shift * 0.3 * mask), v)  # Reduced from 1.5 to 0.3
-                v = np.clip(v, 0, 255)
+        with metrics.stage('hsl'):
+            for color_name, (hue_shift, sat_shift, lum_shift) in hsl_adjustments.items():
+                if hue_shift == 0 and sat_shift == 0 and lum_shift == 0:
+                    continue
+                
+                # Band masks come from HUE_RANGES (red wraps around 0/180)
+                mask = planes.hue_mask(color_name) if h is base_h else hue_mask(h, color_name)
+                
+                # Apply adjustments MUCH more gently (Lightroom uses subtle changes)
+                if hue_shift != 0:
+                    h = np.where(mask > 0, h + (hue_shift * mask * 0.1), h)  # Reduced from 0.5 to 0.1
+                    h = np.clip(h, 0, 180)
+                
+                if sat_shift != 0:
+                    s = np.where(mask > 0, s * (1 + sat_shift / 100.0 * mask * 0.3), s)  # Added 0.3 factor
+                    s = np.clip(s, 0, 255)
+                
+                if lum_shift != 0:
+                    v = np.where(mask > 0, v + (lum_shift * 0.3 * mask), v)  # Reduced from 1.5 to 0.3
+                    v = np.clip(v, 0, 255)
         
         # Contrast
         if contrast != 0:
-            v = ((v / 255.0 - 0.5) * (1 + contrast) + 0.5) * 255.0
-            v = np.clip(v, 0, 255)
+            with metrics.stage('contrast'):
+                v = ((v / 255.0 - 0.5) * (1 + contrast) + 0.5) * 255.0
+                v = np.clip(v, 0, 255)
         
         # Clarity (midtone contrast)
         if clarity != 0:
-            v_blur = cv2.GaussianBlur(v, (0, 0), 10)
-            v = v + (v - v_blur) * clarity
-            v = np.clip(v, 0, 255)
+            with metrics.stage('clarity'):
+                v_blur = planes.blurred_v(10) if v is base_v else cv2.GaussianBlur(v, (0, 0), 10)
+                v = v + (v - v_blur) * clarity
+                v = np.clip(v, 0, 255)
         
         # Texture (fine detail contrast)
         if texture != 0:
-            v_blur = cv2.GaussianBlur(v, (0, 0), 2)
-            v = v + (v - v_blur) * texture * 0.5
-            v = np.clip(v, 0, 255)
+            with metrics.stage('texture'):
+                v_blur = planes.blurred_v(2) if v is base_v else cv2.GaussianBlur(v, (0, 0), 2)
+                v = v + (v - v_blur) * texture * 0.5
+                v = np.clip(v, 0, 255)
         
         # Dehaze (increase contrast in hazy areas)
         if dehaze != 0:
-            v = v * (1 + dehaze * 0.3)
-            v = np.clip(v, 0, 255)
-            s = s * (1 + dehaze * 0.2)
-            s = np.clip(s, 0, 255)
+            with metrics.stage('dehaze'):
+                v = v * (1 + dehaze * 0.3)
+                v = np.clip(v, 0, 255)
+                s = s * (1 + dehaze * 0.2)
+                s = np.clip(s, 0, 255)
         
         # Saturation
         if saturation != 0:
-            s = s * (1 + saturation)
-            s = np.clip(s, 0, 255)
+            with metrics.stage('saturation'):
+                s = s * (1 + saturation)
+                s = np.clip(s, 0, 255)
         
         # Vibrance (selective saturation)
         if vibrance != 0:
-            s_normalized = s / 255.0
-            vibrance_mask = 1.0 - s_normalized
-            s = s + (vibrance * 100 * vibrance_mask)
-            s = np.clip(s, 0, 255)
+            with metrics.stage('vibrance'):
+                s_normalized = s / 255.0
+                vibrance_mask = 1.0 - s_normalized
+                s = s + (vibrance * 100 * vibrance_mask)
+                s = np.clip(s, 0, 255)
         
         # Merge back to RGB
-        img_hsv = cv2.merge([h, s, v]).astype(np.uint8)
-        img_array = cv2.cvtColor(img_hsv, cv2.COLOR_HSV2RGB)
+        with metrics.stage('to_rgb'):
+            img_hsv = cv2.merge([h, s, v]).astype(np.uint8)
+            img_array = cv2.cvtColor(img_hsv, cv2.COLOR_HSV2RGB)
         
         # Calibration adjustments (primary color calibration)
         cal_red_hue = adjustments.get('cal_red_hue', 0)
@@ -371,36 +783,45 @@ def apply_adjustments(img, adjustments):
         cal_blue_sat = adjustments.get('cal_blue_sat', 0)
         
         if any([cal_red_hue, cal_red_sat, cal_green_hue, cal_green_sat, cal_blue_hue, cal_blue_sat]):
-            img_hsv = cv2.cvtColor(img_array, cv2.COLOR_RGB2HSV).astype(np.float32)
-            h, s, v = cv2.split(img_hsv)
+            with metrics.stage('calibration'):
+                img_hsv = cv2.cvtColor(img_array, cv2.COLOR_RGB2HSV).astype(np.float32)
+                h, s, v = cv2.split(img_hsv)
             
-            # Apply calibration (simplified version)
-            if cal_red_hue != 0 or cal_red_sat != 0:
-                red_mask = ((h < 10) | (h > 170)).astype(np.float32)
-                h = np.where(red_mask > 0, h + cal_red_hue * 0.5, h)
-                s = np.where(red_mask > 0, s * (1 + cal_red_sat / 100.0), s)
+                # Apply calibration (simplified version)
+                if cal_red_hue != 0 or cal_red_sat != 0:
+                    red_mask = ((h < 10) | (h > 170)).astype(np.float32)
+                    h = np.where(red_mask > 0, h + cal_red_hue * 0.5, h)
+                    s = np.where(red_mask > 0, s * (1 + cal_red_sat / 100.0), s)
             
-            if cal_green_hue != 0 or cal_green_sat != 0:
-                green_mask = ((h >= 36) & (h <= 85)).astype(np.float32)
-                h = np.where(green_mask > 0, h + cal_green_hue * 0.5, h)
-                s = np.where(green_mask > 0, s * (1 + cal_green_sat / 100.0), s)
+                if cal_green_hue != 0 or cal_green_sat != 0:
+                    green_mask = ((h >= 36) & (h <= 85)).astype(np.float32)
+                    h = np.where(green_mask > 0, h + cal_green_hue * 0.5, h)
+                    s = np.where(green_mask > 0, s * (1 + cal_green_sat / 100.0), s)
             
-            if cal_blue_hue != 0 or cal_blue_sat != 0:
-                blue_mask = ((h >= 111) & (h <= 140)).astype(np.float32)
-                h = np.where(blue_mask > 0, h + cal_blue_hue * 0.5, h)
-                s = np.where(blue_mask > 0, s * (1 + cal_blue_sat / 100.0), s)
+                if cal_blue_hue != 0 or cal_blue_sat != 0:
+                    blue_mask = ((h >= 111) & (h <= 140)).astype(np.float32)
+                    h = np.where(blue_mask > 0, h + cal_blue_hue * 0.5, h)
+                    s = np.where(blue_mask > 0, s * (1 + cal_blue_sat / 100.0), s)
             
-            h = np.clip(h, 0, 180)
-            s = np.clip(s, 0, 255)
-            img_hsv = cv2.merge([h, s, v]).astype(np.uint8)
-            img_array = cv2.cvtColor(img_hsv, cv2.COLOR_HSV2RGB)
+                h = np.clip(h, 0, 180)
+                s = np.clip(s, 0, 255)
+                img_hsv = cv2.merge([h, s, v]).astype(np.uint8)
+                img_array = cv2.cvtColor(img_hsv, cv2.COLOR_HSV2RGB)
+        
+        # Local gradients/radials, generated at this render's resolution
+        masks = parse_masks(adjustments)
+        if masks:
+            with metrics.stage('local'):
+                img_array = apply_local_adjustments(img_array.astype(np.float32), masks, frame, 255.0)
+                img_array = img_array.astype(np.uint8)
         
         img = Image.fromarray(img_array)
         
         # Sharpness
         if sharpness > 0:
-            sharpness_factor = sharpness / 100.0
-            img = img.filter(ImageFilter.UnsharpMask(radius=2, percent=int(sharpness_factor * 150), threshold=3))
+            with metrics.stage('sharpen'):
+                sharpness_factor = sharpness / 100.0
+                img = img.filter(ImageFilter.UnsharpMask(radius=2, percent=int(sharpness_factor * 150), threshold=3))
         
         return img
         
@@ -411,16 +832,65 @@ def apply_adjustments(img, adjustments):
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
+    if startup_times['first_health'] is None:
+        startup_times['first_health'] = time.perf_counter() - PROCESS_START
+        metrics.set_gauge('photexx_startup_first_health_seconds', round(startup_times['first_health'], 4),
+                          'Seconds from process start until the first health response')
+        logger.info(f"First health response {startup_times['first_health']:.2f}s after start")
+    
     status = {
         'status': 'ok',
         'message': 'Photexx Backend is running',
         'darktable': {
             'available': DARKTABLE_AVAILABLE,
-            'version': get_darktable_version() if DARKTABLE_AVAILABLE else None
-        }
+            'probed': DARKTABLE_PROBED.is_set(),
+            'version': DARKTABLE_VERSION
+        },
+        'memory': {
+            **admission.stats(),
+            'rssBytes': current_rss_bytes(),
+            'peakRssBytes': peak_rss_bytes()
+        },
+        'processors': processor_registry.stats()
     }
     return jsonify(status)
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint - answers as soon as the server accepts requests"""
+    return jsonify({
+        'ready': True,
+        'warm': startup_times['warm'] is not None,
+        'darktableProbed': DARKTABLE_PROBED.is_set(),
+        'startup': {name: round(value, 4) if value is not None else None
+                    for name, value in startup_times.items()}
+    })
+
+def add_project_image(project, original_name, filename, digest, filepath):
+    """Add a stored image to a project and queue its derivatives; None if already there"""
+    display_name, is_new = register_project_file(project, original_name, filename)
+    if not is_new:
+        return None
+    
+    # Headers first (cheap, parallel), then thumbnail and smart preview, off the request thread
+    if filename not in metadata_index:
+        metadata_executor.submit(index_metadata, filepath)
+    preview_path = smart_preview_path(app.config['PROCESSED_FOLDER'], filename)
+    if not os.path.exists(preview_path):
+        ingest_executor.submit(ingest_derivatives, filepath)
+    
+    file_info = {
+        'filename': filename,
+        'originalName': display_name,
+        'hash': digest,
+        'path': filepath,
+        'smartPreview': preview_path,
+        'previewUrl': f'/image/{filename}',
+        'type': 'raw' if is_raw_file(filename) else 'jpg'
+    }
+    project['images'].append(file_info)
+    return file_info
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """Upload multiple files for a project"""
@@ -441,31 +911,36 @@ def upload_file():
             return jsonify({'error': 'Project not found'}), 404
         
         logger.info(f'Uploading {len(files)} files for project {project_id}')
+        project = projects[project_id]
         uploaded_files = []
+        duplicates = 0
         
         for file in files:
             if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
+                original_name = secure_filename(file.filename)
+                extension = original_name.rsplit('.', 1)[1]
                 
-                logger.info(f"File uploaded: {filename}")
+                # Stored under its content hash; identical content is kept once
+                with metrics.stage('store'):
+                    filename, digest, created = save_content_addressed(
+                        file.stream, app.config['UPLOAD_FOLDER'], extension)
+                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
                 
-                file_info = {
-                    'filename': filename,
-                    'path': filepath,
-                    'previewUrl': f'/image/{filename}',
-                    'type': 'raw' if is_raw_file(filename) else 'jpg'
-                }
+                file_info = add_project_image(project, original_name, filename, digest, filepath)
+                if file_info is None:
+                    duplicates += 1
+                    logger.info(f"Already in project: {original_name} ({filename})")
+                    continue
                 
-                projects[project_id]['images'].append(file_info)
+                logger.info(f"File uploaded: {original_name} -> {filename}" + ('' if created else ' (existing content)'))
                 uploaded_files.append(file_info)
         
-        logger.info(f'✅ Uploaded {len(uploaded_files)} files')
+        logger.info(f'✅ Uploaded {len(uploaded_files)} files ({duplicates} already in project)')
         
         return jsonify({
             'success': True,
             'uploaded': len(uploaded_files),
+            'duplicates': duplicates,
             'files': uploaded_files
         })
         
@@ -473,6 +948,69 @@ def upload_file():
         logger.error(f"Upload error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/import/reference', methods=['POST'])
+def import_reference():
+    """Register local files (paths and/or a folder) in place, without copying them"""
+    try:
+        data = request.json or {}
+        project_id = data.get('projectId')
+        if project_id not in projects:
+            return jsonify({'error': 'Project not found'}), 404
+        
+        paths = [os.path.abspath(path) for path in data.get('paths', [])]
+        folder = data.get('folder')
+        if folder:
+            if not os.path.isdir(folder):
+                return jsonify({'error': 'Folder not found'}), 404
+            paths += scan_folder(os.path.abspath(folder), allowed_file, data.get('recursive', True))
+        
+        paths = [path for path in paths if allowed_file(path) and os.path.isfile(path)]
+        if not paths:
+            return jsonify({'error': 'No supported files found'}), 400
+        
+        # Hashing is I/O bound and releases the GIL, so files are hashed in parallel
+        logger.info(f'Referencing {len(paths)} files for project {project_id}')
+        futures = [thumbnail_executor.submit(reference_registry.register, path) for path in paths]
+        # Wall time of the parallel hashing, not of the submits
+        with metrics.stage('hash'):
+            wait(futures)
+        
+        project = projects[project_id]
+        imported, duplicates, failed = [], 0, []
+        try:
+            for path, future in zip(paths, futures):
+                try:
+                    filename, digest = future.result()
+                except OSError as e:
+                    logger.error(f"Reference failed for {path}: {str(e)}")
+                    failed.append({'path': path, 'error': str(e)})
+                    continue
+                
+                file_info = add_project_image(project, os.path.basename(path), filename, digest,
+                                              source_path(filename))
+                if file_info is None:
+                    duplicates += 1
+                    continue
+                file_info['reference'] = True
+                imported.append(file_info)
+        finally:
+            # One index write for the whole import, not one per file
+            reference_registry.save()
+        
+        logger.info(f'✅ Referenced {len(imported)} files ({duplicates} already in project, {len(failed)} failed)')
+        
+        return jsonify({
+            'success': True,
+            'uploaded': len(imported),
+            'duplicates': duplicates,
+            'failed': failed,
+            'files': imported
+        })
+        
+    except Exception as e:
+        logger.error(f"Reference import error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/adjust', methods=['POST'])
 @app.route('/process', methods=['POST'])
 def adjust_image():
@@ -485,26 +1023,81 @@ def adjust_image():
         if not filename:
             return jsonify({'error': 'No filename provided'}), 400
         
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        filepath = source_path(filename)
         if not os.path.exists(filepath):
             return jsonify({'error': 'File not found'}), 404
         
-        img = load_image(filepath)
-        img = apply_adjustments(img, adjustments)
-        
-        output = io.BytesIO()
-        if img.mode == 'RGBA':
-            img = img.convert('RGB')
-        img.save(output, format='JPEG', quality=95)
-        output.seek(0)
-        
-        img_base64 = base64.b64encode(output.getvalue()).decode('utf-8')
-        
-        return jsonify({
+        pyramid = load_pyramid(filepath)
+        profile = adjustment_profile(adjustments)
+        interactive = bool(data.get('interactive'))
+        try:
+            geometry = parse_geometry(adjustments, pyramid.base.width, pyramid.base.height)
+            parse_masks(adjustments)
+        except (AttributeError, TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid geometry or masks: {str(e)}'}), 400
+        
+        # Render cost scales with the pixels that survive the crop
+        pixel_counts = pyramid.pixel_counts()
+        if geometry is not None:
+            pixel_counts = [int(pixels * geometry.area) for pixels in pixel_counts]
+        
+        # During a drag, pick the largest level expected to fit the latency budget
+        level, predicted = 0, None
+        if interactive:
+            budget_ms = float(data.get('budgetMs', app.config['PREVIEW_LATENCY_BUDGET_MS']))
+            level, predicted = latency_tracker.choose_level(profile, pixel_counts, budget_ms / 1000.0)
+        img = pyramid.levels[level]
+        digest = adjustment_registry.register(adjustments)
+        
+        # A settled render is the image's current state: save it, and reuse its encoded
+        # result (warmed on startup for recent edits) unless a histogram is needed
+        cache_key = None
+        if not interactive:
+            sidecar_store.save(stored_name(filepath), adjustments)
+            cache_key = ('render', filepath, digest)
+        cached = render_cache.get(cache_key) if cache_key is not None and not data.get('histogram') else None
+        
+        if cached is not None:
+            jpeg, width, height = cached
+        else:
+            with admission.admit(estimate_bytes(img.width, img.height, ['render', 'encode']), 'render'):
+                with render_timer(latency_tracker, profile, pixel_counts[level]):
+                    img = apply_adjustments(img, adjustments, ('level', filepath, level))
+                    jpeg = encode_jpeg(img, 80 if interactive else 95)
+            width, height = img.size
+            if cache_key is not None:
+                render_cache.put(cache_key, (jpeg, width, height))
+        
+        with metrics.stage('base64'):
+            img_base64 = base64.b64encode(jpeg).decode('utf-8')
+        
+        response = {
             'success': True,
-            'image': f'data:image/jpeg;base64,{img_base64}'
-        })
-        
+            'image': f'data:image/jpeg;base64,{img_base64}',
+            'level': {
+                'index': level,
+                'width': width,
+                'height': height,
+                'count': len(pyramid.levels),
+                'predictedMs': round(predicted * 1000, 1) if predicted is not None else None
+            },
+            # A reduced level should be followed by a full-size render once input settles
+            'refine': level > 0,
+            # Tiles for zoomed views are requested with this hash
+            'adjustmentHash': digest
+        }
+        histogram = histogram_payload(img, data)
+        if histogram is not None:
+            response['histogram'] = histogram
+        
+        return jsonify(response)
+        
+    except AdmissionRejected as e:
+        logger.warning(f"Adjustment rejected: {str(e)}")
+        return rejected_response(e)
+    except StaleReference as e:
+        logger.warning(str(e))
+        return jsonify({'error': str(e), 'stale': True}), 409
     except Exception as e:
         logger.error(f"Adjustment error: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -514,12 +1107,7 @@ def adjust_image():
 def list_presets():
     """List all available XMP presets"""
     try:
-        presets = []
-        if os.path.exists(app.config['PRESETS_FOLDER']):
-            for file in os.listdir(app.config['PRESETS_FOLDER']):
-                if file.endswith('.xmp'):
-                    presets.append(file)
-        return jsonify({'presets': presets})
+        return jsonify({'presets': list_preset_files()})
     except Exception as e:
         logger.error(f"Error listing presets: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -530,28 +1118,35 @@ def get_image(filename):
     """Get image file"""
     try:
         # Try upload folder first
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        filepath = source_path(filename)
         if os.path.exists(filepath):
-            # Load and return as JPEG
-            img = load_image(filepath)
+            # Opening an image from a project warms its neighbors
+            project_id = request.args.get('projectId')
+            if project_id:
+                prefetch_neighbors(project_id, filename)
             
-            # Resize for preview
-            max_width = 1920
-            if img.width > max_width:
-                ratio = max_width / img.width
-                new_height = int(img.height * ratio)
-                img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
+            # Load and return as JPEG (?width= picks a smaller pyramid level)
+            pyramid = load_pyramid(filepath)
+            width = request.args.get('width', type=int)
+            img = pyramid.levels[pyramid.level_for_width(width)] if width else pyramid.base
             
-            output = io.BytesIO()
-            if img.mode == 'RGBA':
-                img = img.convert('RGB')
-            img.save(output, format='JPEG', quality=85)
-            output.seek(0)
+            with metrics.stage('encode'):
+                output = io.BytesIO()
+                if img.mode == 'RGBA':
+                    img = img.convert('RGB')
+                img.save(output, format='JPEG', quality=85)
+                output.seek(0)
             
             return send_file(output, mimetype='image/jpeg')
         
         return jsonify({'error': 'File not found'}), 404
         
+    except AdmissionRejected as e:
+        logger.warning(f"Image request rejected: {str(e)}")
+        return rejected_response(e)
+    except StaleReference as e:
+        logger.warning(str(e))
+        return jsonify({'error': str(e), 'stale': True}), 409
     except Exception as e:
         logger.error(f"Error serving image: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -565,7 +1160,7 @@ def get_preset(preset_name):
         if not os.path.exists(preset_path):
             return jsonify({'error': 'Preset not found'}), 404
         
-        adjustments = parse_xmp_preset(preset_path)
+        adjustments = load_preset(preset_path)
         
         return jsonify({
             'success': True,
@@ -577,9 +1172,132 @@ def get_preset(preset_name):
         logger.error(f"Error loading preset: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/presets/preview', methods=['POST'])
+def preview_presets():
+    """Render a list of presets (default: all) onto one small proxy, returned as a strip"""
+    try:
+        data = request.json or {}
+        filename = data.get('filename')
+        if not filename:
+            return jsonify({'error': 'No filename provided'}), 400
+        
+        filepath = source_path(secure_filename(filename))
+        if not os.path.exists(filepath):
+            return jsonify({'error': 'File not found'}), 404
+        
+        names = data.get('presets') or list_preset_files()
+        presets = []
+        for name in names:
+            preset_path = os.path.join(app.config['PRESETS_FOLDER'], secure_filename(name))
+            if os.path.exists(preset_path):
+                presets.append((name, load_preset(preset_path)))
+        
+        # The smallest pyramid level that still covers the cell is decoded once and shared
+        pyramid = load_pyramid(filepath)
+        source = pyramid.levels[-1]
+        with admission.admit(estimate_bytes(source.width, source.height, ['render', 'encode']), 'preset_strip'):
+            index = build_preset_strip(
+                stored_name(filepath),
+                source,
+                presets,
+                apply_adjustments,
+                thumbnail_executor,
+                app.config['PROCESSED_FOLDER']
+            )
+        
+        return jsonify({'success': True, 'url': f"/presets/strip/{index['strip']}", **index})
+        
+    except AdmissionRejected as e:
+        logger.warning(f"Preset preview rejected: {str(e)}")
+        return rejected_response(e)
+    except Exception as e:
+        logger.error(f"Error rendering preset previews: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/presets/strip/<name>', methods=['GET'])
+def get_preset_strip(name):
+    """Get a preset preview strip (names are versioned, so cache forever)"""
+    filepath = os.path.join(app.config['PROCESSED_FOLDER'], PRESET_STRIP_DIR, secure_filename(name))
+    if not os.path.exists(filepath):
+        return jsonify({'error': 'Strip not found'}), 404
+    
+    response = send_file(filepath, mimetype='image/jpeg')
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+def render_preset_darktable(filepath, filename, preset_path, data):
+    """Preset render through darktable-cli, or None when darktable fails"""
+    logger.info(f"Using darktable-cli for {filename} with preset {os.path.basename(preset_path)}")
+    
+    output_path = os.path.join(app.config['PROCESSED_FOLDER'], f'dt_{filename}.jpg')
+    
+    with metrics.stage('darktable'):
+        processed = process_with_darktable(filepath, output_path, preset_path)
+    if not processed:
+        return None
+    
+    # Read processed image
+    with open(output_path, 'rb') as f:
+        img_data = f.read()
+    
+    with metrics.stage('base64'):
+        img_base64 = base64.b64encode(img_data).decode('utf-8')
+    
+    response = {
+        'success': True,
+        'image': f'data:image/jpeg;base64,{img_base64}',
+        # Parse adjustments for UI update
+        'adjustments': load_preset(preset_path)
+    }
+    if data.get('histogram'):
+        # DCT-scaled decode of darktable's JPEG is enough for a histogram
+        dt_img = Image.open(io.BytesIO(img_data))
+        dt_img.draft('RGB', (512, 512))
+        response['histogram'] = histogram_payload(dt_img, data)
+    return response
+
+def render_preset_custom(filepath, filename, preset_path, data):
+    """Preset render through the built-in processor"""
+    adjustments = load_preset(preset_path)
+    logger.info(f"Using custom processor for {filename}")
+    
+    img = load_image(filepath)
+    with admission.admit(estimate_bytes(img.width, img.height, ['render', 'encode']), 'preset'):
+        img = apply_adjustments(img, adjustments, ('level', filepath, 0))
+        
+        # Return processed image
+        with metrics.stage('encode'):
+            output = io.BytesIO()
+            if img.mode == 'RGBA':
+                img = img.convert('RGB')
+            img.save(output, format='JPEG', quality=85)
+            output.seek(0)
+    
+    with metrics.stage('base64'):
+        img_base64 = base64.b64encode(output.getvalue()).decode('utf-8')
+    
+    response = {
+        'success': True,
+        'image': f'data:image/jpeg;base64,{img_base64}',
+        'adjustments': adjustments
+    }
+    histogram = histogram_payload(img, data)
+    if histogram is not None:
+        response['histogram'] = histogram
+    return response
+
+PRESET_RENDERERS = {
+    'darktable': render_preset_darktable,
+    'custom': render_preset_custom
+}
+
 @app.route('/preset/apply', methods=['POST'])
 def apply_preset():
-    """Apply preset to current image using darktable if available"""
+    """
+    Apply preset to current image with the processor the routing policy picks
+    
+    `intent` is 'interactive' (fastest processor) or 'final' (best quality, default).
+    """
     try:
         data = request.json
         preset_name = data.get('preset')
@@ -593,62 +1311,54 @@ def apply_preset():
         if not os.path.exists(preset_path):
             return jsonify({'error': 'Preset not found'}), 404
         
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        filepath = source_path(filename)
         if not os.path.exists(filepath):
             return jsonify({'error': 'File not found'}), 404
         
-        # Try darktable first for RAW files
-        if DARKTABLE_AVAILABLE and is_raw_file(filename):
-            logger.info(f"Using darktable-cli for {filename} with preset {preset_name}")
-            
-            output_path = os.path.join(app.config['PROCESSED_FOLDER'], f'dt_{filename}.jpg')
+        intent = data.get('intent', 'final')
+        if intent not in INTENTS:
+            return jsonify({'error': f'Unknown intent: {intent}'}), 400
+        names, decision = processor_registry.route(filename, intent)
+        
+        for name in names:
+            started = time.perf_counter()
+            try:
+                response = PRESET_RENDERERS[name](filepath, filename, preset_path, data)
+            except AdmissionRejected:
+                raise
+            except Exception as e:
+                logger.warning(f"{name} failed for {filename}: {str(e)}")
+                response = None
+            processor_registry.record(name, time.perf_counter() - started, response is not None)
             
-            if process_with_darktable(filepath, output_path, preset_path):
-                # Read processed image
-                with open(output_path, 'rb') as f:
-                    img_data = f.read()
-                
-                img_base64 = base64.b64encode(img_data).decode('utf-8')
-                
-                # Parse adjustments for UI update
-                adjustments = parse_xmp_preset(preset_path)
-                
-                return jsonify({
-                    'success': True,
-                    'image': f'data:image/jpeg;base64,{img_base64}',
-                    'adjustments': adjustments,
-                    'processor': 'darktable'
-                })
-            else:
-                logger.warning("Darktable processing failed, falling back to custom processor")
-        
-        # Fallback to custom processing
-        adjustments = parse_xmp_preset(preset_path)
-        logger.info(f"Using custom processor for {filename}")
-        
-        img = load_image(filepath)
-        img = apply_adjustments(img, adjustments)
-        
-        # Return processed image
-        output = io.BytesIO()
-        if img.mode == 'RGBA':
-            img = img.convert('RGB')
-        img.save(output, format='JPEG', quality=85)
-        output.seek(0)
-        
-        img_base64 = base64.b64encode(output.getvalue()).decode('utf-8')
-        
-        return jsonify({
-            'success': True,
-            'image': f'data:image/jpeg;base64,{img_base64}',
-            'adjustments': adjustments,
-            'processor': 'custom'
-        })
-        
+            if response is not None:
+                response['processor'] = name
+                response['routing'] = {**decision, 'processor': name, 'fallback': name != names[0]}
+                return jsonify(response)
+            logger.warning(f"{name} processing failed, trying the next processor")
+        
+        return jsonify({'error': 'No processor could apply the preset', 'routing': decision}), 500
+        
+    except AdmissionRejected as e:
+        logger.warning(f"Preset rejected: {str(e)}")
+        return rejected_response(e)
+    except StaleReference as e:
+        logger.warning(str(e))
+        return jsonify({'error': str(e), 'stale': True}), 409
     except Exception as e:
         logger.error(f"Error applying preset: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Download a saved request profile (.prof pstats or .folded collapsed stacks)"""
+    if not app.config['PROFILING_ENABLED']:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    path = profile_file(os.path.join(app.config['PROCESSED_FOLDER'], PROFILE_DIR), profile_id)
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(path, as_attachment=True, download_name=os.path.basename(path))
+
 @app.route('/project', methods=['POST'])
 @app.route('/project/create', methods=['POST'])
 def create_project():
@@ -685,8 +1395,446 @@ def get_project(project_id):
         return jsonify(projects[project_id])
     return jsonify({'error': 'Project not found'}), 404
 
+def announce_ready(port):
+    """Print the readiness handshake line the Electron process waits for"""
+    # Windowed PyInstaller builds have no stdout; Electron then polls /health
+    if sys.stdout is None:
+        return
+    try:
+        print(f"PHOTEXX_READY port={port}", flush=True)
+    except Exception:
+        pass
+
+@app.route('/thumbnail/<filename>', methods=['GET'])
+def get_thumbnail_file(filename):
+    """Get the small thumbnail of a single image"""
+    try:
+        filepath = source_path(secure_filename(filename))
+        if not os.path.exists(filepath):
+            return jsonify({'error': 'File not found'}), 404
+        
+        response = send_file(get_thumbnail(filepath), mimetype='image/jpeg')
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+        
+    except StaleReference as e:
+        logger.warning(str(e))
+        return jsonify({'error': str(e), 'stale': True}), 409
+    except Exception as e:
+        logger.error(f"Error serving thumbnail: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/project/<project_id>/thumbnails', methods=['GET'])
+def get_project_thumbnails(project_id):
+    """Build (or reuse) the project's thumbnail atlas and return its index"""
+    try:
+        if project_id not in projects:
+            return jsonify({'error': 'Project not found'}), 404
+        
+        images = projects[project_id]['images']
+        jobs, stale = [], []
+        for image in images:
+            filename = image['filename']
+            try:
+                filepath = source_path(filename)
+            except StaleReference as e:
+                logger.warning(str(e))
+                stale.append(filename)
+                continue
+            jobs.append((
+                filename,
+                filepath,
+                thumbnail_path(app.config['PROCESSED_FOLDER'], filename),
+                is_raw_file(filename)
+            ))
+        
+        with metrics.stage('thumbnails'):
+            thumbs = generate_thumbnails(jobs, thumbnail_executor)
+        
+        entries = [(image['filename'], thumbs[image['filename']])
+                   for image in images if image['filename'] in thumbs]
+        index = build_atlas(secure_filename(project_id), entries, app.config['PROCESSED_FOLDER'])
+        
+        return jsonify({'success': True, **index, 'stale': stale})
+        
+    except Exception as e:
+        logger.error(f"Error building thumbnails: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/project/<project_id>/bursts', methods=['GET'])
+def get_project_bursts(project_id):
+    """Groups of near-duplicate frames (bursts) by perceptual-hash distance"""
+    try:
+        if project_id not in projects:
+            return jsonify({'error': 'Project not found'}), 404
+        
+        threshold = request.args.get('threshold', DEFAULT_THRESHOLD, type=int)
+        names = [image['filename'] for image in projects[project_id]['images']]
+        
+        # Images whose ingest hasn't reached hashing yet are hashed now, in parallel
+        missing = [name for name in names if name not in hash_store]
+        paths, stale = {}, []
+        for name in missing:
+            try:
+                paths[name] = source_path(name)
+            except StaleReference as e:
+                logger.warning(str(e))
+                stale.append(name)
+        if paths:
+            with metrics.stage('phash'):
+                futures = [thumbnail_executor.submit(index_perceptual_hash, path) for path in paths.values()]
+                for name, future in zip(paths, futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error(f"Perceptual hash failed for {name}: {str(e)}")
+        
+        with metrics.stage('bursts'):
+            hashes, positions = hash_store.lookup(names)
+            groups = group_similar(hashes, threshold)
+        
+        bursts = [
+            {'id': index, 'size': len(group), 'images': [names[positions[member]] for member in group]}
+            for index, group in enumerate(groups)
+        ]
+        
+        return jsonify({
+            'success': True,
+            'threshold': threshold,
+            'hashed': len(positions),
+            'total': len(names),
+            'grouped': sum(burst['size'] for burst in bursts),
+            'stale': stale,
+            'bursts': bursts
+        })
+        
+    except Exception as e:
+        logger.error(f"Error grouping bursts: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/project/<project_id>/analyze', methods=['POST'])
+def analyze_project(project_id):
+    """Start scoring focus, exposure and noise of a project's images in the background"""
+    try:
+        if project_id not in projects:
+            return jsonify({'error': 'Project not found'}), 404
+        
+        job = analysis_jobs.get(project_id)
+        if job is not None and job.running:
+            return jsonify({'success': True, **job.status()})
+        
+        # Already scored images are skipped unless a rescore is forced
+        force = bool((request.json or {}).get('force')) if request.is_json else False
+        images = [image for image in projects[project_id]['images'] if force or 'scores' not in image]
+        
+        # A missing proxy is built on the spot; get_smart_preview reserves its RAW decode
+        # from the admission budget, so parallel workers queue instead of exhausting memory
+        def proxy_of(name):
+            return lambda: get_smart_preview(source_path(name), block=True)
+        
+        def store(image, scores):
+            image['scores'] = scores
+        
+        job = AnalysisJob(len(images))
+        analysis_jobs[project_id] = job
+        job.run([(image, proxy_of(image['filename'])) for image in images],
+                score_image, store, analysis_executor)
+        logger.info(f"Analysis started for {project_id}: {len(images)} images")
+        
+        return jsonify({'success': True, **job.status()})
+        
+    except Exception as e:
+        logger.error(f"Error starting analysis: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/project/<project_id>/analysis', methods=['GET'])
+def get_analysis_status(project_id):
+    """Progress of a project's analysis job"""
+    if project_id not in projects:
+        return jsonify({'error': 'Project not found'}), 404
+    job = analysis_jobs.get(project_id)
+    if job is None:
+        return jsonify({'success': True, 'running': False, 'total': 0, 'done': 0, 'failed': 0})
+    return jsonify({'success': True, **job.status()})
+
+@app.route('/project/<project_id>/images', methods=['GET'])
+def get_project_images(project_id):
+    """
+    Project images filtered/sorted by capture metadata and culling scores
+    
+    Metadata sorts (captureTime, iso, camera, ...) default to ascending order,
+    score sorts (sharpness, noise, ...) to descending.
+    """
+    if project_id not in projects:
+        return jsonify({'error': 'Project not found'}), 404
+    
+    sort = request.args.get('sort')
+    images = projects[project_id]['images']
+    
+    # Metadata filters and sorts are answered from the index columns
+    positions = metadata_index.query(
+        [image['filename'] for image in images],
+        sort=sort,
+        descending=request.args.get('order', 'asc') == 'desc',
+        camera=request.args.get('camera'),
+        lens=request.args.get('lens'),
+        min_iso=request.args.get('isoMin', type=float),
+        max_iso=request.args.get('isoMax', type=float)
+    )
+    images = [{**images[position], 'metadata': metadata_index.record(images[position]['filename'])}
+              for position in positions]
+    
+    images = filter_and_sort(
+        images,
+        sort=sort,
+        descending=request.args.get('order', 'desc') != 'asc',
+        min_sharpness=request.args.get('minSharpness', type=float),
+        max_clipping=request.args.get('maxClipping', type=float),
+        exposure=request.args.get('exposure')
+    )
+    return jsonify({'success': True, 'count': len(images), 'images': images})
+
+@app.route('/project/<project_id>/metadata', methods=['GET'])
+def get_project_metadata(project_id):
+    """Cameras and lenses present in a project, for the listing filters"""
+    if project_id not in projects:
+        return jsonify({'error': 'Project not found'}), 404
+    names = [image['filename'] for image in projects[project_id]['images']]
+    return jsonify({
+        'success': True,
+        'indexed': sum(1 for name in names if name in metadata_index),
+        'total': len(names),
+        'sortKeys': list(METADATA_SORT_KEYS),
+        **metadata_index.facets(names)
+    })
+
+@app.route('/edits/<filename>', methods=['GET'])
+def get_saved_edits(filename):
+    """Saved adjustments of an image (adjustments is null when it was never edited)"""
+    record = sidecar_store.get(secure_filename(filename))
+    if record is None:
+        return jsonify({'filename': filename, 'adjustments': None})
+    return jsonify({'filename': filename, **record})
+
+@app.route('/edits/<filename>', methods=['DELETE'])
+def delete_saved_edits(filename):
+    """Forget an image's saved adjustments (reset to defaults)"""
+    try:
+        sidecar_store.remove(secure_filename(filename))
+        return jsonify({'success': True})
+    except Exception as e:
+        logger.error(f"Error deleting edits: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/atlas/<name>', methods=['GET'])
+def get_atlas_sheet(name):
+    """Get one thumbnail atlas sheet (names are versioned, so cache forever)"""
+    filepath = os.path.join(app.config['PROCESSED_FOLDER'], ATLAS_DIR, secure_filename(name))
+    if not os.path.exists(filepath):
+        return jsonify({'error': 'Atlas not found'}), 404
+    
+    response = send_file(filepath, mimetype='image/jpeg')
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.route('/tiles/register', methods=['POST'])
+def register_tile_adjustments():
+    """Register an adjustment set and return the hash tile URLs refer to it by"""
+    data = request.json or {}
+    adjustments = data.get('adjustments', {})
+    return jsonify({'success': True, 'hash': adjustment_registry.register(adjustments)})
+
+@app.route('/tiles/<filename>/info', methods=['GET'])
+def get_tile_info(filename):
+    """Tile pyramid layout of an image (level 0 is full resolution)"""
+    try:
+        filepath = source_path(secure_filename(filename))
+        if not os.path.exists(filepath):
+            return jsonify({'error': 'File not found'}), 404
+        
+        geometry = get_tile_geometry(filepath)
+        response = jsonify({'success': True, 'tileSize': TILE_SIZE, **geometry})
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+        
+    except StaleReference as e:
+        logger.warning(str(e))
+        return jsonify({'error': str(e), 'stale': True}), 409
+    except Exception as e:
+        logger.error(f"Error reading tile info: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/tiles/<filename>/<int:level>/<int:x>/<int:y>', methods=['GET'])
+def get_tile(filename, level, x, y):
+    """Render one deep-zoom tile with the adjustments named by ?adjustments=<hash>"""
+    try:
+        filename = secure_filename(filename)
+        filepath = source_path(filename)
+        if not os.path.exists(filepath):
+            return jsonify({'error': 'File not found'}), 404
+        
+        key = request.args.get('adjustments') or adjustment_registry.register({})
+        adjustments = adjustment_registry.get(key)
+        if adjustments is None:
+            return jsonify({'error': 'Unknown adjustment hash, register it via /tiles/register'}), 404
+        
+        geometry = get_tile_geometry(filepath)
+        if level >= len(geometry['levels']):
+            return jsonify({'error': 'Level out of range'}), 404
+        level_info = geometry['levels'][level]
+        box = tile_box(level_info['width'], level_info['height'], x, y)
+        if box is None:
+            return jsonify({'error': 'Tile out of range'}), 404
+        
+        # Stored names are content hashes, so (file, adjustments, position) never changes
+        etag = f'"{filename}-{key}-{level}-{x}-{y}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = app.response_class(status=304)
+        else:
+            cache_key = (filename, key, level, x, y)
+            data = tile_cache.get(cache_key)
+            if data is None:
+                img = load_tile_level(filepath, level)
+                width = box[2] - box[0] + 2 * TILE_MARGIN
+                height = box[3] - box[1] + 2 * TILE_MARGIN
+                with admission.admit(estimate_bytes(width, height, ['render', 'encode']), 'tile'):
+                    # Tiles cover the whole frame (the loupe shows it uncropped); local
+                    # masks are still placed through the crop's frame
+                    to_frame = frame_transform(parse_geometry(adjustments, img.width, img.height),
+                                               img.width, img.height)
+                    tile = render_tile(img, box, lambda region, offset: apply_adjustments(
+                        region, without_geometry(adjustments), ('tile', filepath, level, x, y),
+                        to_frame @ np.array([[1, 0, offset[0]], [0, 1, offset[1]], [0, 0, 1]])))
+                    with metrics.stage('encode'):
+                        output = io.BytesIO()
+                        tile.save(output, format='JPEG', quality=TILE_QUALITY)
+                data = output.getvalue()
+                tile_cache.put(cache_key, data)
+            response = app.response_class(data, mimetype='image/jpeg')
+        
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+        
+    except AdmissionRejected as e:
+        logger.warning(f"Tile rejected: {str(e)}")
+        return rejected_response(e)
+    except StaleReference as e:
+        logger.warning(str(e))
+        return jsonify({'error': str(e), 'stale': True}), 409
+    except Exception as e:
+        logger.error(f"Error rendering tile: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def export_work(long_edge, quality):
+    """Per-image export function for the export pool, reserving memory first"""
+    def work(job):
+        width, height = probe_dimensions(job.source_path)
+        scale = min(1.0, long_edge / max(width, height)) if long_edge else 1.0
+        decode_stage = 'decode_raw' if job.is_raw else 'decode'
+        nbytes = max(estimate_bytes(width, height, [decode_stage]),
+                     estimate_bytes(int(width * scale), int(height * scale), ['render', 'encode']))
+        
+        with admission.admit(nbytes, 'export', block=True):
+            return render_export(job, long_edge, quality, decode_source, apply_adjustments, (width, height))
+    return work
+
+@app.route('/export', methods=['POST'])
+def export_images():
+    """
+    Export a project (or a selection of it) at full resolution
+    
+    Writes into `destination` when given, otherwise streams a ZIP response.
+    """
+    try:
+        data = request.json or {}
+        project_id = data.get('projectId')
+        if project_id not in projects:
+            return jsonify({'error': 'Project not found'}), 404
+        
+        size = data.get('size', 'original')
+        quality = data.get('quality', 'high')
+        if size not in EXPORT_SIZES or quality not in EXPORT_QUALITIES:
+            return jsonify({'error': 'Unknown size or quality preset'}), 400
+        
+        images = projects[project_id]['images']
+        selection = data.get('files')
+        if selection:
+            selected = set(selection)
+            images = [image for image in images if image['filename'] in selected]
+        if not images:
+            return jsonify({'error': 'Nothing to export'}), 400
+        
+        # Per-image edits win over the saved sidecars, which win over the shared adjustments
+        shared = data.get('adjustments', {})
+        edits = data.get('edits', {})
+        
+        def image_adjustments(filename):
+            if filename in edits:
+                return edits[filename]
+            saved = sidecar_store.adjustments(filename)
+            return saved if saved is not None else shared
+        
+        # Referenced originals that moved or changed are skipped and reported as stale
+        paths, stale = {}, []
+        for image in images:
+            try:
+                paths[image['filename']] = source_path(image['filename'])
+            except StaleReference as e:
+                logger.warning(str(e))
+                stale.append(image['filename'])
+        images = [image for image in images if image['filename'] in paths]
+        if not images:
+            return jsonify({'error': 'Every selected image is stale', 'stale': stale}), 409
+        
+        names = output_names([image.get('originalName') or image['filename'] for image in images])
+        jobs = [
+            ExportJob(
+                paths[image['filename']],
+                is_raw_file(image['filename']),
+                name,
+                image_adjustments(image['filename'])
+            )
+            for image, name in zip(images, names)
+        ]
+        
+        work = export_work(EXPORT_SIZES[size], EXPORT_QUALITIES[quality])
+        destination = data.get('destination')
+        logger.info(f"Exporting {len(jobs)} images ({size}, {quality}) to {destination or 'ZIP stream'}")
+        
+        if destination:
+            start = time.perf_counter()
+            exported, failed = export_to_folder(jobs, destination, work, export_executor, EXPORT_WORKERS)
+            return jsonify({
+                'success': not failed,
+                'destination': destination,
+                'exported': exported,
+                'failed': failed,
+                'stale': stale,
+                'seconds': round(time.perf_counter() - start, 2)
+            })
+        
+        archive_name = secure_filename(projects[project_id].get('albumName') or project_id) or 'export'
+        response = app.response_class(
+            stream_zip(jobs, work, export_executor, EXPORT_WORKERS,
+                       skipped=[f'{name}: stale reference' for name in stale]),
+            mimetype='application/zip'
+        )
+        response.headers['Content-Disposition'] = f'attachment; filename="{archive_name}.zip"'
+        return response
+        
+    except Exception as e:
+        logger.error(f"Export error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 def run_server(port=5001):
     """Run the Flask server"""
+    from werkzeug.serving import make_server
+    
+    ensure_folders()
+    reference_registry.load()
+    sidecar_store.load()
+    
     logger.info("=" * 50)
     logger.info("🚀 Photexx Backend Server Starting...")
     logger.info(f"📍 Server running on http://localhost:{port}")
@@ -694,8 +1842,17 @@ def run_server(port=5001):
     logger.info(f"📁 Presets folder: {PRESETS_FOLDER}")
     logger.info("=" * 50)
     
-    # Disable Flask development server warning
-    app.run(host='127.0.0.1', port=port, debug=False, use_reloader=False)
+    # Binding happens here, so the socket accepts connections after this line
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    
+    startup_times['listening'] = time.perf_counter() - PROCESS_START
+    metrics.set_gauge('photexx_startup_listening_seconds', round(startup_times['listening'], 4),
+                      'Seconds from process start until the server socket was listening')
+    logger.info(f"Listening {startup_times['listening']:.2f}s after start")
+    
+    announce_ready(port)
+    start_background_tasks()
+    server.serve_forever()
 
 if __name__ == '__main__':
     run_server()
@@ -0,0 +1,97 @@
+"""
+Persisted edit sidecars
+Each edited image keeps its current adjustments in
+processed/sidecars/<stored name>.json, next to their content hash (the same
+short hash tile URLs use) and the time of the last change:
+
+    {"adjustments": {...}, "hash": "<16 hex>", "editedAt": 1760000000.0}
+
+Stored names are content digests, so a sidecar follows the pixels, not the
+project or the original file name. The editor restores the adjustments when
+it opens an image, exports fall back to them, and on startup the most
+recently edited images are warmed into the caches.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from tiles import adjustment_hash
+
+logger = logging.getLogger(__name__)
+
+SIDECAR_DIR = 'sidecars'
+SIDECAR_EXTENSION = '.json'
+
+
+class SidecarStore:
+    """stored name -> last saved adjustments, mirrored to one JSON file per image"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.folder, f'{name}{SIDECAR_EXTENSION}')
+
+    def load(self):
+        """Read every sidecar in the folder (unreadable ones are skipped)"""
+        if not os.path.isdir(self.folder):
+            return
+        records = {}
+        for entry in os.listdir(self.folder):
+            if not entry.endswith(SIDECAR_EXTENSION) or entry.startswith('.'):
+                continue
+            try:
+                with open(os.path.join(self.folder, entry), 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+                records[entry[:-len(SIDECAR_EXTENSION)]] = record
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable sidecar {entry}: {str(e)}")
+        with self._lock:
+            self._records = records
+        logger.info(f"Loaded {len(records)} edit sidecars")
+
+    def get(self, name):
+        with self._lock:
+            return self._records.get(name)
+
+    def adjustments(self, name):
+        """Saved adjustments of an image, or None when it was never edited"""
+        record = self.get(name)
+        return dict(record['adjustments']) if record is not None else None
+
+    def save(self, name, adjustments):
+        """
+        Persist an image's adjustments (a no-op when they did not change)
+
+        Returns:
+            the sidecar record
+        """
+        digest = adjustment_hash(adjustments)
+        with self._lock:
+            record = self._records.get(name)
+            if record is not None and record['hash'] == digest:
+                return record
+            record = {'adjustments': dict(adjustments), 'hash': digest, 'editedAt': time.time()}
+            self._records[name] = record
+
+            os.makedirs(self.folder, exist_ok=True)
+            tmp_path = f'{self._path(name)}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(record, f)
+            os.replace(tmp_path, self._path(name))
+        return record
+
+    def remove(self, name):
+        with self._lock:
+            self._records.pop(name, None)
+            if os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+
+    def recent(self):
+        """Stored names, most recently edited first"""
+        with self._lock:
+            return sorted(self._records, key=lambda name: self._records[name]['editedAt'], reverse=True)
@@ -0,0 +1,104 @@
+"""
+Smart previews - compact editing proxies, in the spirit of Lightroom's
+One flat (unadjusted, demosaiced, orientation-applied) ~2560px JPEG per
+image is generated once at ingest. Interactive rendering reads the proxy;
+only exports go back to the full original.
+"""
+import os
+import threading
+import logging
+
+from PIL import Image
+
+import metrics
+from lazy_imports import lazy_import
+from metadata import apply_orientation, TAG_ORIENTATION
+
+rawpy = lazy_import('rawpy')
+
+logger = logging.getLogger(__name__)
+
+SMART_PREVIEW_SIZE = 2560
+SMART_PREVIEW_QUALITY = 95
+SMART_PREVIEW_DIR = 'smart_previews'
+
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+
+def smart_preview_path(processed_folder, filename):
+    """Location of the proxy for an uploaded file"""
+    return os.path.join(processed_folder, SMART_PREVIEW_DIR, f'{filename}.jpg')
+
+
+def decode_scaled(source_path, is_raw, min_size, orientation=None):
+    """
+    Decode an image at the smallest scale whose long edge is still >= min_size
+
+    RAWs use LibRaw's half-size demosaic when that is large enough, JPEGs
+    use PIL's DCT-domain draft scaling. min_size=None decodes at full
+    resolution. The result is orientation-corrected; pass the indexed EXIF
+    orientation to skip reading it again (LibRaw already rotates RAWs).
+    """
+    if is_raw:
+        with rawpy.imread(source_path) as raw:
+            half_size = min_size is not None and max(raw.sizes.width, raw.sizes.height) // 2 >= min_size
+            rgb = raw.postprocess(
+                use_camera_wb=True,
+                half_size=half_size,
+                no_auto_bright=True,
+                output_bps=8
+            )
+        img = Image.fromarray(rgb)
+    else:
+        img = Image.open(source_path)
+        if min_size is not None:
+            img.draft('RGB', (min_size, min_size))
+        if orientation is None:
+            orientation = img.getexif().get(TAG_ORIENTATION)
+        img = apply_orientation(img, orientation)
+        # Upright images are not transposed; decode now (and release the file)
+        img.load()
+
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return img
+
+
+def build_smart_preview(source_path, preview_path, is_raw, size=SMART_PREVIEW_SIZE, orientation=None):
+    """Decode source_path and write its proxy to preview_path"""
+    with metrics.stage('smart_preview'):
+        img = decode_scaled(source_path, is_raw, size, orientation)
+        if max(img.size) > size:
+            img.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+        os.makedirs(os.path.dirname(preview_path), exist_ok=True)
+        tmp_path = f'{preview_path}.tmp'
+        img.save(tmp_path, format='JPEG', quality=SMART_PREVIEW_QUALITY, subsampling=0)
+        os.replace(tmp_path, preview_path)
+
+    logger.info(f"Smart preview built: {os.path.basename(preview_path)} {img.size}")
+    return img
+
+
+def ensure_smart_preview(source_path, preview_path, is_raw, orientation=None):
+    """Build the proxy unless it already exists; concurrent callers share one build"""
+    if os.path.exists(preview_path):
+        return preview_path
+
+    with _build_locks_guard:
+        lock = _build_locks.setdefault(preview_path, threading.Lock())
+    with lock:
+        if not os.path.exists(preview_path):
+            build_smart_preview(source_path, preview_path, is_raw, orientation=orientation)
+    with _build_locks_guard:
+        _build_locks.pop(preview_path, None)
+    return preview_path
+
+
+def open_smart_preview(preview_path):
+    """Load a proxy fully into memory"""
+    with metrics.stage('decode_proxy'):
+        img = Image.open(preview_path)
+        img.load()
+    return img
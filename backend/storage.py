@@ -0,0 +1,91 @@
+"""
+Content-addressed storage for uploaded originals
+Files are stored as <blake2b digest>.<ext>, so identical content is written,
+decoded and previewed once, and two cameras' DSC01235.ARW can't overwrite
+each other. Projects keep their own original-name -> stored-name mapping.
+"""
+import hashlib
+import os
+import uuid
+
+HASH_DIGEST_SIZE = 16
+CHUNK_SIZE = 1024 * 1024
+
+
+def new_hasher():
+    return hashlib.blake2b(digest_size=HASH_DIGEST_SIZE)
+
+
+def stored_name_for(digest, extension):
+    return f'{digest}.{extension.lower()}'
+
+
+def save_content_addressed(stream, folder, extension):
+    """
+    Stream an upload to disk, hashing it on the way
+
+    Args:
+        stream: readable binary file object
+        folder: destination folder
+        extension: file extension to keep (RAW decoders rely on it)
+
+    Returns:
+        (stored_name, digest, created) - created is False when identical
+        content was already stored and the new copy was discarded
+    """
+    hasher = new_hasher()
+    tmp_path = os.path.join(folder, f'.upload-{uuid.uuid4().hex}.tmp')
+
+    try:
+        with open(tmp_path, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                out.write(chunk)
+
+        digest = hasher.hexdigest()
+        stored_name = stored_name_for(digest, extension)
+        target = os.path.join(folder, stored_name)
+
+        if os.path.exists(target):
+            os.remove(tmp_path)
+            return stored_name, digest, False
+
+        os.replace(tmp_path, target)
+        return stored_name, digest, True
+
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def register_project_file(project, original_name, stored_name):
+    """
+    Record original_name -> stored_name in the project's file map
+
+    Returns:
+        (display_name, is_new) - is_new is False when the project already
+        holds this content. A different file with a name already in use gets
+        a numbered display name instead of replacing the first one.
+    """
+    files = project.setdefault('files', {})
+
+    for name, existing in files.items():
+        if existing == stored_name:
+            return name, False
+
+    display_name = original_name
+    if display_name in files:
+        stem, dot, ext = original_name.rpartition('.')
+        if not dot:
+            stem, ext = original_name, ''
+        counter = 2
+        while display_name in files:
+            display_name = f'{stem}_{counter}.{ext}' if ext else f'{stem}_{counter}'
+            counter += 1
+
+    files[display_name] = stored_name
+    return display_name, True
@@ -0,0 +1,199 @@
+"""
+Thumbnail tier and per-project thumbnail atlases
+Thumbnails come from PIL draft() DCT scaling for JPEGs and the embedded
+preview for RAWs, so no file is ever decoded at full resolution here.
+Atlases pack the square grid cells of a whole project into a few sprite
+sheets plus a JSON index, so a large project grid loads in a few requests.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+
+from PIL import Image, ImageOps
+
+import metrics
+from lazy_imports import lazy_import
+from metadata import apply_orientation, TAG_ORIENTATION
+
+rawpy = lazy_import('rawpy')
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = 256
+THUMBNAIL_QUALITY = 85
+THUMBNAIL_DIR = 'thumbnails'
+
+ATLAS_DIR = 'atlases'
+ATLAS_CELL = 192
+ATLAS_COLUMNS = 16
+ATLAS_ROWS = 16
+ATLAS_QUALITY = 80
+
+# LibRaw flip codes -> PIL transpose
+_RAW_FLIP = {
+    3: Image.Transpose.ROTATE_180,
+    5: Image.Transpose.ROTATE_90,
+    6: Image.Transpose.ROTATE_270,
+}
+
+
+def thumbnail_path(processed_folder, filename):
+    """Location of the cached thumbnail for an uploaded file"""
+    return os.path.join(processed_folder, THUMBNAIL_DIR, f'{filename}.jpg')
+
+
+def _raw_thumbnail(source_path, size):
+    with rawpy.imread(source_path) as raw:
+        flip = raw.sizes.flip
+        try:
+            thumb = raw.extract_thumb()
+        except (rawpy.LibRawNoThumbnailError, rawpy.LibRawUnsupportedThumbnailError):
+            thumb = None
+
+        if thumb is not None and thumb.format == rawpy.ThumbFormat.JPEG:
+            img = Image.open(io.BytesIO(thumb.data))
+            img.draft('RGB', (size, size))
+            # A rotating orientation tag on the embedded JPEG wins; "1" (or none) often
+            # just means the camera left it to the RAW's flip
+            orientation = img.getexif().get(TAG_ORIENTATION) or 1
+            if orientation > 1:
+                return apply_orientation(img, orientation)
+        elif thumb is not None:
+            img = Image.fromarray(thumb.data)
+        else:
+            # No usable embedded preview: fall back to a half-size demosaic
+            img = Image.fromarray(raw.postprocess(use_camera_wb=True, half_size=True,
+                                                  no_auto_bright=True, output_bps=8))
+            return img
+
+    if flip in _RAW_FLIP:
+        img = img.transpose(_RAW_FLIP[flip])
+    return img
+
+
+def make_thumbnail(source_path, is_raw, size=THUMBNAIL_SIZE, orientation=None):
+    """Decode a small, orientation-corrected RGB thumbnail of source_path"""
+    if is_raw:
+        img = _raw_thumbnail(source_path, size)
+    else:
+        img = Image.open(source_path)
+        img.draft('RGB', (size, size))
+        if orientation is None:
+            orientation = img.getexif().get(TAG_ORIENTATION)
+        img = apply_orientation(img, orientation)
+
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    img.thumbnail((size, size), Image.Resampling.LANCZOS)
+    return img
+
+
+def ensure_thumbnail(source_path, thumb_path, is_raw, orientation=None):
+    """Return thumb_path, generating the thumbnail first if needed"""
+    if os.path.exists(thumb_path):
+        return thumb_path
+
+    with metrics.stage('thumbnail'):
+        img = make_thumbnail(source_path, is_raw, orientation=orientation)
+        os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+        tmp_path = f'{thumb_path}.tmp'
+        img.save(tmp_path, format='JPEG', quality=THUMBNAIL_QUALITY)
+        os.replace(tmp_path, thumb_path)
+    return thumb_path
+
+
+def generate_thumbnails(jobs, executor):
+    """
+    Build thumbnails in parallel
+
+    Args:
+        jobs: list of (key, source_path, thumb_path, is_raw)
+        executor: concurrent.futures executor to run on
+
+    Returns:
+        dict key -> thumb_path for every thumbnail that exists afterwards
+    """
+    futures = {
+        key: executor.submit(ensure_thumbnail, source_path, thumb_path, is_raw)
+        for key, source_path, thumb_path, is_raw in jobs
+    }
+    results = {}
+    for key, future in futures.items():
+        try:
+            results[key] = future.result()
+        except Exception as e:
+            logger.error(f"Thumbnail failed for {key}: {str(e)}")
+    return results
+
+
+def _cover_cell(img, cell):
+    """Center-crop img to a square cell (like CSS object-fit: cover)"""
+    return ImageOps.fit(img, (cell, cell), Image.Resampling.LANCZOS)
+
+
+def atlas_version(keys):
+    """Stable id for an ordered list of image keys"""
+    digest = hashlib.blake2b('\n'.join(keys).encode('utf-8'), digest_size=8)
+    return digest.hexdigest()
+
+
+def build_atlas(project_id, entries, processed_folder):
+    """
+    Pack thumbnails into sprite sheets
+
+    Args:
+        project_id: owning project
+        entries: ordered list of (key, thumb_path)
+        processed_folder: root of the processed folder
+
+    Returns:
+        index dict describing sheets and each key's cell
+    """
+    keys = [key for key, _ in entries]
+    version = atlas_version(keys)
+    atlas_folder = os.path.join(processed_folder, ATLAS_DIR)
+    index_path = os.path.join(atlas_folder, f'{project_id}_{version}.json')
+
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    os.makedirs(atlas_folder, exist_ok=True)
+    per_sheet = ATLAS_COLUMNS * ATLAS_ROWS
+    index = {
+        'version': version,
+        'cell': ATLAS_CELL,
+        'columns': ATLAS_COLUMNS,
+        'rows': ATLAS_ROWS,
+        'sheets': [],
+        'images': {}
+    }
+
+    with metrics.stage('atlas'):
+        for sheet_number, start in enumerate(range(0, len(entries), per_sheet)):
+            chunk = entries[start:start + per_sheet]
+            rows = (len(chunk) + ATLAS_COLUMNS - 1) // ATLAS_COLUMNS
+            sheet = Image.new('RGB', (ATLAS_COLUMNS * ATLAS_CELL, rows * ATLAS_CELL), (51, 51, 51))
+
+            for slot, (key, thumb_path) in enumerate(chunk):
+                column, row = slot % ATLAS_COLUMNS, slot // ATLAS_COLUMNS
+                try:
+                    with Image.open(thumb_path) as thumb:
+                        sheet.paste(_cover_cell(thumb.convert('RGB'), ATLAS_CELL),
+                                    (column * ATLAS_CELL, row * ATLAS_CELL))
+                except Exception as e:
+                    logger.error(f"Atlas cell failed for {key}: {str(e)}")
+                index['images'][key] = {'sheet': sheet_number, 'column': column, 'row': row}
+
+            sheet_name = f'{project_id}_{version}_{sheet_number}.jpg'
+            sheet.save(os.path.join(atlas_folder, sheet_name), format='JPEG',
+                       quality=ATLAS_QUALITY, optimize=True, progressive=True)
+            index['sheets'].append({'name': sheet_name, 'rows': rows})
+
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+
+    logger.info(f"Atlas built for {project_id}: {len(entries)} images, {len(index['sheets'])} sheets")
+    return index
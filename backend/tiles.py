@@ -0,0 +1,135 @@
+"""
+Deep-zoom tiles for 100% and loupe views
+Level 0 is the full-resolution original; each level above halves it, up to
+the level that fits in a single tile. A tile request renders only its own
+region (plus a margin for the blur kernels in apply_adjustments), so
+panning a zoomed 45 MP image costs only the visible tiles.
+
+Adjustments are referenced by a short content hash, which keeps tile URLs
+immutable and lets the browser cache them forever.
+"""
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+from lazy_imports import lazy_import
+
+rawpy = lazy_import('rawpy')
+
+TILE_SIZE = 512
+TILE_QUALITY = 90
+# Largest reach of the adjustment kernels (clarity blur, sigma 10) at full size
+TILE_MARGIN = 48
+ADJUSTMENT_REGISTRY_SIZE = 256
+
+# EXIF orientations / LibRaw flips that swap width and height
+_SWAPPING_ORIENTATIONS = {5, 6, 7, 8}
+_SWAPPING_FLIPS = {5, 6}
+
+
+def adjustment_hash(adjustments):
+    """Stable short hash of an adjustments dict"""
+    canonical = json.dumps(adjustments or {}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+class AdjustmentRegistry:
+    """Bounded hash -> adjustments map, most recently used kept"""
+
+    def __init__(self, max_entries=ADJUSTMENT_REGISTRY_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.register({})
+
+    def register(self, adjustments):
+        key = adjustment_hash(adjustments)
+        with self._lock:
+            self._entries[key] = dict(adjustments or {})
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return key
+
+    def get(self, key):
+        with self._lock:
+            adjustments = self._entries.get(key)
+            if adjustments is not None:
+                self._entries.move_to_end(key)
+            return adjustments
+
+
+def oriented_size(source_path, is_raw, size=None, orientation=None):
+    """
+    Size of the decoded, orientation-corrected original, read from the header
+
+    A JPEG whose size and orientation are already indexed is not opened.
+    """
+    if is_raw:
+        with rawpy.imread(source_path) as raw:
+            width, height, flip = raw.sizes.width, raw.sizes.height, raw.sizes.flip
+        return (height, width) if flip in _SWAPPING_FLIPS else (width, height)
+
+    if size is not None and orientation is not None:
+        width, height = size
+    else:
+        with Image.open(source_path) as img:
+            width, height = img.size
+            orientation = img.getexif().get(0x0112)
+    return (height, width) if orientation in _SWAPPING_ORIENTATIONS else (width, height)
+
+
+def level_count(width, height, tile_size=TILE_SIZE):
+    """Number of levels, the last one fitting in a single tile"""
+    longest = max(width, height)
+    return max(1, math.ceil(math.log2(longest / tile_size)) + 1) if longest > tile_size else 1
+
+
+def level_size(width, height, level):
+    """Size of a level (level 0 is full resolution)"""
+    scale = 2 ** level
+    return max(1, math.ceil(width / scale)), max(1, math.ceil(height / scale))
+
+
+def tile_grid(width, height, tile_size=TILE_SIZE):
+    """Describe every level for the client"""
+    levels = []
+    for level in range(level_count(width, height, tile_size)):
+        level_width, level_height = level_size(width, height, level)
+        levels.append({
+            'level': level,
+            'width': level_width,
+            'height': level_height,
+            'columns': math.ceil(level_width / tile_size),
+            'rows': math.ceil(level_height / tile_size)
+        })
+    return levels
+
+
+def tile_box(level_width, level_height, x, y, tile_size=TILE_SIZE):
+    """Pixel box of tile (x, y) in a level, or None when it lies outside"""
+    left, top = x * tile_size, y * tile_size
+    if x < 0 or y < 0 or left >= level_width or top >= level_height:
+        return None
+    return left, top, min(left + tile_size, level_width), min(top + tile_size, level_height)
+
+
+def render_tile(level_img, box, render, margin=TILE_MARGIN):
+    """
+    Render one tile of level_img
+
+    The region is rendered with a margin so neighbourhood filters see the
+    same pixels they would in a full render, then cropped back to the tile.
+    render(region, offset) also gets the region's top-left corner in the level.
+    """
+    left, top, right, bottom = box
+    padded = (max(0, left - margin), max(0, top - margin),
+              min(level_img.width, right + margin), min(level_img.height, bottom + margin))
+
+    rendered = render(level_img.crop(padded), (padded[0], padded[1]))
+    inner = (left - padded[0], top - padded[1], right - padded[0], bottom - padded[1])
+    return rendered.crop(inner)
@@ -41,7 +41,8 @@ if (projectId) {
 let currentProject = null;
 let currentImageIndex = 0;
 let images = [];
-let adjustments = {
+// Every image starts from these; saved edits are applied on top
+const DEFAULT_ADJUSTMENTS = {
     exposure: 0,
     contrast: 0,
     highlights: 0,
@@ -54,6 +55,7 @@ let adjustments = {
     tint: 0,
     sharpness: 40
 };
+let adjustments = { ...DEFAULT_ADJUSTMENTS };
 
 // Window controls
 window.minimizeWindow = () => {
@@ -121,25 +123,48 @@ async function loadProject() {
 }
 
 // Load thumbnails
-function loadThumbnails() {
+async function loadThumbnails() {
     const container = document.getElementById('thumbnailsContainer');
     container.innerHTML = '';
     
     console.log('Loading thumbnails for', images.length, 'images');
     
+    // One atlas index + a few sprite sheets instead of one request per image
+    let atlas = null;
+    try {
+        const response = await fetch(`${API_URL}/project/${projectId}/thumbnails`);
+        if (response.ok) atlas = await response.json();
+    } catch (error) {
+        console.error('Thumbnail atlas unavailable:', error);
+    }
+    
     images.forEach((img, index) => {
-        const thumb = document.createElement('img');
+        const cell = atlas && atlas.images ? atlas.images[img.filename] : null;
+        let thumb;
+        
+        if (cell) {
+            const sheet = atlas.sheets[cell.sheet];
+            thumb = document.createElement('div');
+            thumb.style.backgroundImage = `url(${API_URL}/atlas/${sheet.name})`;
+            thumb.style.backgroundSize = `${atlas.columns * 100}% ${sheet.rows * 100}%`;
+            const x = atlas.columns > 1 ? cell.column / (atlas.columns - 1) * 100 : 0;
+            const y = sheet.rows > 1 ? cell.row / (sheet.rows - 1) * 100 : 0;
+            thumb.style.backgroundPosition = `${x}% ${y}%`;
+            thumb.title = img.originalName || img.filename;
+        } else {
+            thumb = document.createElement('img');
+            thumb.src = `${API_URL}/thumbnail/${img.filename}`;
+            thumb.alt = img.originalName || img.filename;
+            thumb.onerror = () => {
+                console.error('Failed to load thumbnail:', img.filename);
+                thumb.src = 'data:image/svg+xml,<svg width="90" height="90" xmlns="http://www.w3.org/2000/svg"><rect width="90" height="90" fill="%23333"/><text x="50%" y="50%" text-anchor="middle" fill="white" font-size="12">Error</text></svg>';
+            };
+        }
+        
         thumb.className = 'thumbnail';
-        thumb.src = `${API_URL}${img.previewUrl}`;
-        thumb.alt = img.filename;
         thumb.onclick = () => loadImage(index);
         
-        thumb.onerror = () => {
-            console.error('Failed to load thumbnail:', img.previewUrl);
-            thumb.src = 'data:image/svg+xml,<svg width="90" height="90" xmlns="http://www.w3.org/2000/svg"><rect width="90" height="90" fill="%23333"/><text x="50%" y="50%" text-anchor="middle" fill="white" font-size="12">Error</text></svg>';
-        };
-        
-        if (index === 0) thumb.classList.add('active');
+        if (index === currentImageIndex) thumb.classList.add('active');
         
         container.appendChild(thumb);
     });
@@ -150,6 +175,9 @@ function loadThumbnails() {
 // Load image
 async function loadImage(index) {
     currentImageIndex = index;
+    closeLoupe();
+    // Tiles of the previous image's adjustments must not be requested for this one
+    adjustmentHash = null;
     
     // Update active thumbnail
     const thumbnails = document.querySelectorAll('.thumbnail');
@@ -160,12 +188,15 @@ async function loadImage(index) {
     // Load image
     const img = images[index];
     const mainImage = document.getElementById('mainImage');
-    mainImage.src = `${API_URL}${img.previewUrl}`;
+    // projectId lets the backend prefetch the neighboring images
+    mainImage.src = `${API_URL}${img.previewUrl}?projectId=${encodeURIComponent(projectId)}`;
     
     // Update info
-    document.getElementById('fileName').textContent = img.filename;
+    document.getElementById('fileName').textContent = img.originalName || img.filename;
     document.getElementById('fileType').textContent = img.type.toUpperCase();
     
+    loadPresetPreviews();
+    
     // Don't reset adjustments here - it causes infinite loop
     // Only reset sliders to default values
     if (!adjustments.brightness) {
@@ -184,10 +215,141 @@ async function loadImage(index) {
         document.getElementById('tint').value = 0;
         document.getElementById('tintValue').textContent = '0';
     }
+    
+    restoreSavedEdits(img.filename);
+}
+
+// Show the slider values of the current adjustments
+function syncSliders() {
+    Object.entries(adjustments).forEach(([key, value]) => {
+        const element = document.getElementById(key);
+        const valueElement = document.getElementById(`${key}Value`);
+        if (!element || !valueElement || typeof value !== 'number') return;
+        element.value = value;
+        valueElement.textContent = (key === 'exposure' || key === 'temperature' || key === 'tint')
+            ? parseInt(value)
+            : value.toFixed(2);
+    });
+}
+
+// Restore the adjustments the backend saved for this image on its last settled render
+async function restoreSavedEdits(filename) {
+    // Nothing of the previous image may leak into this one (or into its saved edits)
+    adjustments = { ...DEFAULT_ADJUSTMENTS };
+    syncSliders();
+    
+    try {
+        const response = await fetch(`${API_URL}/edits/${encodeURIComponent(filename)}`);
+        if (!response.ok) return;
+        
+        const data = await response.json();
+        if (!data.adjustments || images[currentImageIndex].filename !== filename) return;
+        
+        adjustments = { ...DEFAULT_ADJUSTMENTS, ...data.adjustments };
+        syncSliders();
+        
+        // The 1:1 view shows the restored edits even before the first render returns
+        const registered = await fetch(`${API_URL}/tiles/register`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ adjustments: adjustments })
+        });
+        // A render that returned meanwhile already set a newer hash
+        if (registered.ok && adjustmentHash === null && images[currentImageIndex].filename === filename) {
+            adjustmentHash = (await registered.json()).hash;
+            loadVisibleTiles();
+        }
+        
+        // Served from the backend's render cache when the image was warmed on startup
+        processImage(false);
+    } catch (error) {
+        console.error('Error restoring saved edits:', error);
+    }
+}
+
+// 1:1 loupe view built from deep-zoom tiles
+let loupe = null;
+
+window.openLoupe = async function(event) {
+    const img = images[currentImageIndex];
+    const mainImage = document.getElementById('mainImage');
+    const rect = mainImage.getBoundingClientRect();
+    const fx = (event.clientX - rect.left) / rect.width;
+    const fy = (event.clientY - rect.top) / rect.height;
+    
+    try {
+        const response = await fetch(`${API_URL}/tiles/${img.filename}/info`);
+        if (!response.ok) throw new Error('Tile info failed');
+        const info = await response.json();
+        
+        const view = document.getElementById('loupeView');
+        const canvas = document.getElementById('loupeCanvas');
+        const level = info.levels[0];
+        canvas.innerHTML = '';
+        canvas.style.width = `${level.width}px`;
+        canvas.style.height = `${level.height}px`;
+        view.style.display = 'block';
+        
+        loupe = { filename: img.filename, tileSize: info.tileSize, level: level, tiles: new Map() };
+        // Center the double-clicked point
+        view.scrollLeft = fx * level.width - view.clientWidth / 2;
+        view.scrollTop = fy * level.height - view.clientHeight / 2;
+        view.onscroll = loadVisibleTiles;
+        loadVisibleTiles();
+    } catch (error) {
+        console.error('Error opening 1:1 view:', error);
+    }
+};
+
+window.closeLoupe = function() {
+    const view = document.getElementById('loupeView');
+    view.style.display = 'none';
+    view.onscroll = null;
+    document.getElementById('loupeCanvas').innerHTML = '';
+    loupe = null;
+};
+
+// Only tiles intersecting the viewport are requested
+function loadVisibleTiles() {
+    if (!loupe) return;
+    const view = document.getElementById('loupeView');
+    const canvas = document.getElementById('loupeCanvas');
+    const size = loupe.tileSize;
+    const x0 = Math.max(0, Math.floor(view.scrollLeft / size));
+    const y0 = Math.max(0, Math.floor(view.scrollTop / size));
+    const x1 = Math.min(loupe.level.columns - 1, Math.floor((view.scrollLeft + view.clientWidth) / size));
+    const y1 = Math.min(loupe.level.rows - 1, Math.floor((view.scrollTop + view.clientHeight) / size));
+    const query = adjustmentHash ? `?adjustments=${adjustmentHash}` : '';
+    
+    for (let y = y0; y <= y1; y++) {
+        for (let x = x0; x <= x1; x++) {
+            const key = `${x}/${y}`;
+            let tile = loupe.tiles.get(key);
+            if (!tile) {
+                tile = document.createElement('img');
+                tile.style.left = `${x * size}px`;
+                tile.style.top = `${y * size}px`;
+                canvas.appendChild(tile);
+                loupe.tiles.set(key, tile);
+            }
+            const src = `${API_URL}/tiles/${loupe.filename}/0/${key}${query}`;
+            if (tile.getAttribute('src') !== src) tile.src = src;
+        }
+    }
 }
 
 // Update adjustment
+// While dragging, the server renders a reduced pyramid level sized to its
+// latency budget; a full-resolution refinement follows once input settles.
+const SETTLE_DELAY = 250;
 let adjustmentTimeout = null;
+let interactiveInFlight = false;
+let interactivePending = false;
+let renderSequence = 0;
+let shownSequence = 0;
+// Hash of the last rendered adjustments, used by the 1:1 tile view
+let adjustmentHash = null;
+
 window.updateAdjustment = function(key, value) {
     adjustments[key] = parseFloat(value);
     
@@ -197,17 +359,38 @@ window.updateAdjustment = function(key, value) {
         : parseFloat(value).toFixed(2);
     document.getElementById(`${key}Value`).textContent = displayValue;
     
-    // Longer debounce for smoother experience
+    requestInteractiveRender();
+    
     clearTimeout(adjustmentTimeout);
     adjustmentTimeout = setTimeout(() => {
-        processImage();
-    }, 600); // Increased from 300ms to 600ms
+        // A queued drag frame would be sent after the settled render and replace it;
+        // the next input queues a new one
+        interactivePending = false;
+        processImage(false);
+    }, SETTLE_DELAY);
 };
 
+// At most one interactive render in flight; the latest values win
+function requestInteractiveRender() {
+    if (interactiveInFlight) {
+        interactivePending = true;
+        return;
+    }
+    interactiveInFlight = true;
+    processImage(true).finally(() => {
+        interactiveInFlight = false;
+        if (interactivePending) {
+            interactivePending = false;
+            requestInteractiveRender();
+        }
+    });
+}
+
 // Process image with adjustments
-async function processImage() {
+async function processImage(interactive = false) {
+    const sequence = ++renderSequence;
     const loadingOverlay = document.getElementById('loadingOverlay');
-    loadingOverlay.style.display = 'flex';
+    if (!interactive) loadingOverlay.style.display = 'flex';
     
     try {
         const currentImage = images[currentImageIndex];
@@ -217,22 +400,42 @@ async function processImage() {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
                 filename: currentImage.filename,
-                adjustments: adjustments
+                adjustments: adjustments,
+                interactive: interactive
             })
         });
         
+        // Server is out of memory budget: drop drag frames, retry the settled render
+        if (response.status === 503) {
+            if (!interactive) {
+                const retryAfter = parseInt(response.headers.get('Retry-After') || '1', 10);
+                clearTimeout(adjustmentTimeout);
+                adjustmentTimeout = setTimeout(() => processImage(false), retryAfter * 1000);
+            }
+            return;
+        }
+        
         if (!response.ok) throw new Error('Processing failed');
         
         const data = await response.json();
         
+        // Never let an older (or reduced) render replace a newer one
+        if (sequence < shownSequence) return;
+        shownSequence = sequence;
+        
         // Update main image
         document.getElementById('mainImage').src = data.image;
+        if (data.adjustmentHash && data.adjustmentHash !== adjustmentHash) {
+            adjustmentHash = data.adjustmentHash;
+            // Visible tiles switch to the new adjustments, the rest as they scroll in
+            loadVisibleTiles();
+        }
         
     } catch (error) {
         console.error('Error processing image:', error);
-        alert('Resim işlenemedi: ' + error.message);
+        if (!interactive) alert('Resim işlenemedi: ' + error.message);
     } finally {
-        loadingOverlay.style.display = 'none';
+        if (!interactive) loadingOverlay.style.display = 'none';
     }
 }
 
@@ -266,6 +469,7 @@ async function loadPresets() {
             // Create preview
             const previewDiv = document.createElement('div');
             previewDiv.className = 'preset-preview';
+            previewDiv.dataset.preset = presetFile;
             previewDiv.style.background = 'linear-gradient(135deg, #667eea 0%, #764ba2 100%)';
             
             const nameSpan = document.createElement('span');
@@ -284,20 +488,54 @@ async function loadPresets() {
     }
 }
 
+// Fill every preset preview from one batched strip of the current image
+async function loadPresetPreviews() {
+    const img = images[currentImageIndex];
+    const previews = document.querySelectorAll('.preset-preview[data-preset]');
+    if (!img || previews.length === 0) return;
+    
+    try {
+        const response = await fetch(`${API_URL}/presets/preview`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: img.filename })
+        });
+        if (!response.ok) throw new Error('Preset previews failed');
+        const data = await response.json();
+        
+        // Stale response for an image that is no longer shown
+        if (images[currentImageIndex] !== img) return;
+        
+        const count = data.presets.length;
+        const slots = new Map(data.presets.map(p => [p.name, p.slot]));
+        previews.forEach(preview => {
+            const slot = slots.get(preview.dataset.preset);
+            if (slot === undefined) return;
+            const position = count > 1 ? (slot / (count - 1)) * 100 : 0;
+            preview.style.background = `url(${API_URL}${data.url}) ${position}% 0 / ${count * 100}% 100% no-repeat`;
+        });
+    } catch (error) {
+        console.error('Error loading preset previews:', error);
+    }
+}
+
 // Apply preset
 window.applyPreset = async function(presetName) {
+    const sequence = ++renderSequence;
     const loadingOverlay = document.getElementById('loadingOverlay');
     loadingOverlay.style.display = 'flex';
     
     try {
         const currentImage = images[currentImageIndex];
         
+        // Fastest processor first; a better one may follow in the background
         const response = await fetch(`${API_URL}/preset/apply`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
                 filename: currentImage.filename,
-                preset: presetName
+                preset: presetName,
+                intent: 'interactive'
             })
         });
         
@@ -306,8 +544,14 @@ window.applyPreset = async function(presetName) {
         const data = await response.json();
         
         // Update main image
+        if (sequence < shownSequence) return;
+        shownSequence = sequence;
         document.getElementById('mainImage').src = data.image;
         
+        if (data.routing && data.routing.upgrade) {
+            upgradePresetRender(currentImage.filename, presetName, sequence);
+        }
+        
         // Update sliders with preset values
         if (data.adjustments) {
             console.log('Preset adjustments:', data.adjustments);
@@ -357,6 +601,29 @@ window.applyPreset = async function(presetName) {
     }
 };
 
+// Replace the quick preset render with the final one, unless the user moved on
+async function upgradePresetRender(filename, presetName, sequence) {
+    try {
+        const response = await fetch(`${API_URL}/preset/apply`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                filename: filename,
+                preset: presetName,
+                intent: 'final'
+            })
+        });
+        if (!response.ok) return;
+        
+        const data = await response.json();
+        if (sequence !== renderSequence || images[currentImageIndex].filename !== filename) return;
+        document.getElementById('mainImage').src = data.image;
+        console.log(`✅ Preset rendered with ${data.processor}`);
+    } catch (error) {
+        console.error('Error upgrading preset render:', error);
+    }
+}
+
 // Reset adjustments
 window.resetAdjustments = function() {
     adjustments = {
@@ -385,6 +652,10 @@ window.resetAdjustments = function() {
     // Show original image without reloading
     const currentImage = images[currentImageIndex];
     document.getElementById('mainImage').src = `${API_URL}/preview/${currentImage.filename}`;
+    
+    // Forget the saved edits too, so reopening the image starts from the defaults
+    fetch(`${API_URL}/edits/${encodeURIComponent(currentImage.filename)}`, { method: 'DELETE' })
+        .catch(error => console.error('Error clearing saved edits:', error));
 };
 
 // Scroll thumbnails
@@ -394,14 +665,63 @@ window.scrollThumbnails = function(direction) {
     container.scrollLeft += direction * scrollAmount;
 };
 
+// Export full-resolution JPEGs into a chosen folder, or download a ZIP without Electron
+async function exportImages(files) {
+    const loadingOverlay = document.getElementById('loadingOverlay');
+    const currentImage = images[currentImageIndex];
+    const body = {
+        projectId: projectId,
+        files: files,
+        size: 'original',
+        quality: 'high',
+        edits: { [currentImage.filename]: adjustments }
+    };
+    
+    try {
+        if (remote) {
+            const result = await remote.dialog.showOpenDialog(currentWindow, {
+                properties: ['openDirectory', 'createDirectory']
+            });
+            if (result.canceled || result.filePaths.length === 0) return;
+            body.destination = result.filePaths[0];
+        }
+        
+        loadingOverlay.style.display = 'flex';
+        const response = await fetch(`${API_URL}/export`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(body)
+        });
+        if (!response.ok) throw new Error('Export failed');
+        
+        if (body.destination) {
+            const data = await response.json();
+            alert(`${data.exported.length} fotoğraf dışa aktarıldı` +
+                  (data.failed.length ? `, ${data.failed.length} hata` : ''));
+        } else {
+            const blob = await response.blob();
+            const link = document.createElement('a');
+            link.href = URL.createObjectURL(blob);
+            link.download = `${currentProject.albumName || 'export'}.zip`;
+            link.click();
+            URL.revokeObjectURL(link.href);
+        }
+    } catch (error) {
+        console.error('Error exporting:', error);
+        alert('Dışa aktarma başarısız: ' + error.message);
+    } finally {
+        loadingOverlay.style.display = 'none';
+    }
+}
+
 // Export current
 window.exportCurrent = async function() {
-    alert('Dışa aktarma özelliği yakında eklenecek!');
+    await exportImages([images[currentImageIndex].filename]);
 };
 
 // Export all
 window.exportAll = async function() {
-    alert('Toplu dışa aktarma özelliği yakında eklenecek!');
+    await exportImages(null);
 };
 
 // Initialize
@@ -3,12 +3,15 @@ const path = require('path');
 const remoteMain = require('@electron/remote/main');
 const { spawn } = require('child_process');
 const net = require('net');
+const http = require('http');
 
 remoteMain.initialize();
 
 let mainWindow;
 let backendProcess = null;
 const BACKEND_PORT = 5001;
+const BACKEND_READY_TIMEOUT = 30000;
+const READY_MARKER = 'PHOTEXX_READY';
 
 /**
  * Check if port is available
@@ -34,6 +37,72 @@ function isPortAvailable(port) {
   });
 }
 
+/**
+ * Single GET /health probe
+ */
+function probeHealth(port) {
+  return new Promise((resolve) => {
+    const req = http.get({ host: '127.0.0.1', port, path: '/health', timeout: 1000 }, (res) => {
+      res.resume();
+      resolve(res.statusCode === 200);
+    });
+    req.on('error', () => resolve(false));
+    req.on('timeout', () => {
+      req.destroy();
+      resolve(false);
+    });
+  });
+}
+
+/**
+ * Wait until the backend is ready: either the stdout handshake line
+ * or a successful /health probe, whichever comes first
+ */
+function waitForBackend(child, port, timeout) {
+  const startedAt = Date.now();
+  
+  return new Promise((resolve) => {
+    let done = false;
+    let pollTimer = null;
+    
+    const finish = (ready, via) => {
+      if (done) return;
+      done = true;
+      clearTimeout(pollTimer);
+      resolve({ ready, via, elapsed: Date.now() - startedAt });
+    };
+    
+    if (child && child.stdout) {
+      child.stdout.on('data', (chunk) => {
+        process.stdout.write(chunk);
+        if (chunk.toString().includes(READY_MARKER)) {
+          finish(true, 'handshake');
+        }
+      });
+    }
+    if (child) {
+      child.once('exit', () => finish(false, 'exit'));
+    }
+    
+    // Polling backs up the handshake (windowed builds have no stdout)
+    let delay = 50;
+    const poll = async () => {
+      if (done) return;
+      if (await probeHealth(port)) {
+        finish(true, 'health');
+        return;
+      }
+      if (Date.now() - startedAt > timeout) {
+        finish(false, 'timeout');
+        return;
+      }
+      delay = Math.min(delay * 2, 500);
+      pollTimer = setTimeout(poll, delay);
+    };
+    pollTimer = setTimeout(poll, delay);
+  });
+}
+
 /**
  * Get backend executable path based on platform and packaging
  */
@@ -76,9 +145,9 @@ async function startBackend() {
     const backendPath = getBackendPath();
     console.log(`🚀 Starting backend from: ${backendPath}`);
     
-    // Spawn backend process
+    // Spawn backend process (stdout is piped to catch the ready handshake)
     backendProcess = spawn(backendPath, [], {
-      stdio: 'inherit', // Inherit stdio for logging
+      stdio: ['ignore', 'pipe', 'inherit'],
       detached: false
     });
     
@@ -93,9 +162,15 @@ async function startBackend() {
     
     // Wait for backend to be ready
     console.log('⏳ Waiting for backend to start...');
-    await new Promise((resolve) => setTimeout(resolve, 2000));
+    const result = await waitForBackend(backendProcess, BACKEND_PORT, BACKEND_READY_TIMEOUT);
+    
+    if (!result.ready) {
+      console.error(`❌ Backend not ready after ${result.elapsed}ms (${result.via})`);
+      return false;
+    }
     
-    console.log('✅ Backend server started successfully');
+    // Time-to-ready as seen from Electron, logged for startup tracking
+    console.log(`✅ Backend server ready in ${result.elapsed}ms (via ${result.via})`);
     return true;
     
   } catch (error) {
@@ -258,18 +258,35 @@ async function createProject() {
         
         console.log('✅ Proje backend\'de oluşturuldu');
         
-        // Upload files
-        console.log('Dosyalar yükleniyor...');
-        const formData = new FormData();
-        wizardData.files.forEach(file => {
-            formData.append('files', file);
-        });
-        formData.append('projectId', wizardData.projectId);
+        // In Electron every File has its local path: register the originals in place
+        // instead of copying them into ~/.photexx/uploads
+        const localPaths = wizardData.files.map(file => file.path).filter(Boolean);
+        let uploadResponse;
         
-        const uploadResponse = await fetch(`${API_URL}/upload`, {
-            method: 'POST',
-            body: formData
-        });
+        if (localPaths.length === wizardData.files.length) {
+            console.log('Dosyalar yerinde içe aktarılıyor...');
+            uploadResponse = await fetch(`${API_URL}/import/reference`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    projectId: wizardData.projectId,
+                    paths: localPaths
+                })
+            });
+        } else {
+            // Upload files
+            console.log('Dosyalar yükleniyor...');
+            const formData = new FormData();
+            wizardData.files.forEach(file => {
+                formData.append('files', file);
+            });
+            formData.append('projectId', wizardData.projectId);
+            
+            uploadResponse = await fetch(`${API_URL}/upload`, {
+                method: 'POST',
+                body: formData
+            });
+        }
         
         console.log('Upload response status:', uploadResponse.status);
         